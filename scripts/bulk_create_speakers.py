@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import pathlib
+import sys
+
+# Allow importing the app modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.realpath(__file__)), "..", "src"))
+
+from services.bulk_speaker_service import BulkSpeakerService  # noqa: E402
+from services.model_manager_service import ModelManagerService  # noqa: E402
+from services.speaker_manager_service import SpeakerManagerService  # noqa: E402
+
+
+def print_progress(done: int, total: int, speaker_name: str):
+    if speaker_name:
+        print(f"[{done}/{total}] {speaker_name}")
+
+
+def bulk_create_speakers(args):
+    model_service = ModelManagerService()
+    model_service.set_file_paths(
+        args.checkpoint_dir, args.vocab_file, args.config_file)
+    model_service.set_conditioning_cache(
+        os.path.join(args.cache_dir, "conditioning"),
+        args.conditioning_cache_size * 1024 * 1024
+    )
+    model_service.set_reference_audio_cache(
+        os.path.join(args.cache_dir, "reference_audio"),
+        args.reference_audio_cache_size * 1024 * 1024
+    )
+    model_service.set_preprocess_references(not args.no_preprocess_references)
+    model_service.set_max_audio_length(args.max_audio_length)
+    model_service.set_worker_pool(args.workers, args.threads_per_worker)
+
+    speaker_service = SpeakerManagerService()
+    speaker_service.set_speaker_file(args.speaker_file)
+
+    result = BulkSpeakerService(model_service, speaker_service, args.cache_dir).create_speakers(
+        args.input_dir,
+        skip_existing=not args.overwrite,
+        num_threads=args.threads,
+        checkpoint_dir=args.resume_dir,
+        on_progress=print_progress
+    )
+
+    print(
+        f"Created {len(result['created'])} speakers, skipped {len(result['skipped'])} existing")
+
+    for speaker_name, error in result["failed"].items():
+        print(f"Failed {speaker_name}: {error}")
+
+    return 1 if len(result["failed"]) > 0 else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create a speaker for every subfolder of reference clips in a directory")
+    parser.add_argument("--input_dir", type=str, required=True,
+                        help="Directory with one subfolder of clips per speaker, named after the speaker")
+    parser.add_argument("--speaker_file", type=str, default=os.environ.get("SPEAKERS_XTTS_PATH"),
+                        help="Speaker file to add the speakers to. Default: $SPEAKERS_XTTS_PATH")
+    parser.add_argument("--checkpoint_dir", type=str, default=os.environ.get("CHECKPOINT_DIR"),
+                        help="XTTS checkpoint directory. Default: $CHECKPOINT_DIR")
+    parser.add_argument("--vocab_file", type=str, default=os.environ.get("VOCAB_PATH"),
+                        help="XTTS vocab file. Default: $VOCAB_PATH")
+    parser.add_argument("--config_file", type=str, default=os.environ.get("CONFIG_PATH"),
+                        help="XTTS config file. Default: $CONFIG_PATH")
+    parser.add_argument("--cache_dir", type=str, default=os.environ.get(
+        "SPEAKER_FORGE_CACHE_DIR", os.path.join(pathlib.Path.home(), ".cache", "speaker_forge")),
+        help="Cache directory shared with the app. Default: $SPEAKER_FORGE_CACHE_DIR")
+    parser.add_argument("--conditioning_cache_size", type=int, default=128,
+                        help="Max size of the per file conditioning cache in MB, 0 disables it. Default: 128")
+    parser.add_argument("--reference_audio_cache_size", type=int, default=512,
+                        help="Max size of the preprocessed reference audio cache in MB, 0 disables it. Default: 512")
+    parser.add_argument("--no_preprocess_references", action="store_true",
+                        help="Skip trimming silence and normalizing loudness of the clips before extraction")
+    parser.add_argument("--max_audio_length", type=float, default=None,
+                        help="Seconds of each clip used, longer clips keep their best scoring windows. Default: the model's max_ref_len")
+    parser.add_argument("--resume_dir", type=str, default=None,
+                        help="Where finished speakers are checkpointed for resuming. Default: a folder of <cache_dir>/bulk")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Recreate speakers already in the speaker file instead of skipping them")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads decoding and resampling the clips. Default: min(8, cpu count)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of XTTS model worker processes, 1 runs the model in process. Default: 1")
+    parser.add_argument("--threads_per_worker", type=int, default=None,
+                        help="Torch threads (and cores) per model worker. Default: cpu count / workers")
+
+    args = parser.parse_args()
+
+    for name in ["speaker_file", "checkpoint_dir", "vocab_file", "config_file"]:
+        if not getattr(args, name):
+            parser.error(f"--{name} is required")
+
+    sys.exit(bulk_create_speakers(args))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+# Allow importing the app modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.realpath(__file__)), "..", "src"))
+
+import torch  # noqa: E402
+from services.model_manager_service import ModelManagerService  # noqa: E402
+
+# Batched and single encoder calls differ only by float rounding
+DEFAULT_TOLERANCE = 1e-4
+
+
+def compare_latents(single: tuple, batched: tuple) -> float:
+    """
+    Returns the largest absolute difference between two
+    `(gpt_cond_latent, speaker_embedding, num_chunks)` results, or inf
+    when their chunk counts or shapes differ.
+    """
+    if single[2] != batched[2] or (single[0] is None) != (batched[0] is None):
+        return float("inf")
+
+    differences = [(single[1].cpu() - batched[1].cpu()).abs().max().item()]
+
+    if single[0] is not None:
+        if single[0].shape != batched[0].shape:
+            return float("inf")
+
+        differences.append(
+            (single[0].cpu() - batched[0].cpu()).abs().max().item())
+
+    return max(differences)
+
+
+def check_batched_latents(model_service: ModelManagerService, audio_files: list[str], tolerance: float) -> bool:
+    audios = [model_service.load_reference_audio(audio_file)
+              for audio_file in audio_files]
+    batched_latents = model_service.compute_audio_latents_batch(audios)
+    is_matching = True
+
+    for audio_file, audio, batched in zip(audio_files, audios, batched_latents):
+        difference = compare_latents(
+            model_service.compute_audio_latents(audio), batched)
+        is_matching = is_matching and difference <= tolerance
+
+        print(f"{'ok' if difference <= tolerance else 'MISMATCH'} {audio_file}: "
+              f"{batched[2]} chunks, max difference {difference:.2e}")
+
+    return is_matching
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that batched conditioning latent extraction matches extracting each clip on its own")
+    parser.add_argument("audio_files", nargs="+",
+                        help="Reference clips to extract, mix lengths to cover several buckets")
+    parser.add_argument("--checkpoint_dir", type=str, default=os.environ.get("CHECKPOINT_DIR"),
+                        help="XTTS checkpoint directory. Default: $CHECKPOINT_DIR")
+    parser.add_argument("--vocab_file", type=str, default=os.environ.get("VOCAB_PATH"),
+                        help="XTTS vocab file. Default: $VOCAB_PATH")
+    parser.add_argument("--config_file", type=str, default=os.environ.get("CONFIG_PATH"),
+                        help="XTTS config file. Default: $CONFIG_PATH")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Largest absolute difference accepted. Default: {DEFAULT_TOLERANCE}")
+
+    args = parser.parse_args()
+
+    for name in ["checkpoint_dir", "vocab_file", "config_file"]:
+        if not getattr(args, name):
+            parser.error(f"--{name} is required")
+
+    model_service = ModelManagerService()
+    model_service.set_file_paths(
+        args.checkpoint_dir, args.vocab_file, args.config_file)
+    model_service.load_model()
+
+    with torch.inference_mode():
+        is_matching = check_batched_latents(
+            model_service, args.audio_files, args.tolerance)
+
+    sys.exit(0 if is_matching else 1)
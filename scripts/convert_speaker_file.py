@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+# Allow importing the app modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.realpath(__file__)), "..", "src"))
+
+from services.speaker_manager_service import SpeakerManagerService  # noqa: E402
+from services.speaker_storage import PthSpeakerStorage, SafetensorsSpeakerStorage, ShardedSpeakerStorage  # noqa: E402
+
+STORAGE_FORMATS = {
+    "pth": PthSpeakerStorage,
+    "dir": ShardedSpeakerStorage,
+    "safetensors": SafetensorsSpeakerStorage,
+}
+
+
+def convert_speaker_file(input_path: str, output_path: str, output_format: str):
+    speaker_service = SpeakerManagerService()
+    speaker_service.set_speaker_file(input_path)
+
+    storage = STORAGE_FORMATS[output_format](output_path)
+    storage.save(speaker_service.speakers_file_data)
+
+    print(
+        f"Converted {len(speaker_service.get_speaker_names())} speakers to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a speaker library between storage formats")
+    parser.add_argument("--input", type=str, required=True,
+                        help="Speaker file or sharded speaker directory to read")
+    parser.add_argument("--output", type=str, required=True,
+                        help="Path to write the converted library to")
+    parser.add_argument("--format", type=str, choices=list(STORAGE_FORMATS.keys()), default="dir",
+                        help="Output format, use safetensors to convert a legacy .pth file to a memory mapped one. Default: dir")
+
+    args = parser.parse_args()
+
+    convert_speaker_file(args.input, args.output, args.format)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import sys
+
+# Allow importing the app modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.realpath(__file__)), "..", "src"))
+
+from services.model_manager_service import ModelManagerService  # noqa: E402
+from services.speaker_manager_service import SpeakerManagerService  # noqa: E402
+from utils.output_profiles import OUTPUT_PROFILES, get_output_profile  # noqa: E402
+
+# Prompts rendered per `render_batch` call, so progress is reported as they finish
+PROMPTS_PER_BATCH = 16
+
+
+def read_prompts(prompts_file: str) -> list[tuple[str, str]]:
+    """
+    Reads `prompt id,text` rows from a csv file, skipping blank rows.
+    """
+    prompts = []
+
+    with open(prompts_file, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].strip() == "":
+                continue
+
+            prompt_id = row[0].strip()
+
+            if os.path.basename(prompt_id) != prompt_id:
+                raise ValueError(f"Prompt id {prompt_id} must be a plain file name")
+
+            prompts.append((prompt_id, ",".join(row[1:]).strip()))
+
+    return prompts
+
+
+def render_prompts(args):
+    profile = get_output_profile(args.output_profile)
+    suffix = profile.get_encoder().suffix
+
+    speaker_service = SpeakerManagerService()
+    speaker_service.set_speaker_file(args.speaker_file)
+    speaker_data = speaker_service.get_speaker_data(args.speaker)
+
+    if speaker_data is None:
+        print(f"Speaker {args.speaker} is not in {args.speaker_file}")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    prompts = [
+        (prompt_id, text) for prompt_id, text in read_prompts(args.prompts_file)
+        if args.overwrite or not os.path.exists(os.path.join(args.output_dir, f"{prompt_id}{suffix}"))
+    ]
+
+    model_service = ModelManagerService()
+    model_service.set_file_paths(
+        args.checkpoint_dir, args.vocab_file, args.config_file)
+    model_service.set_worker_pool(args.workers, args.threads_per_worker)
+
+    for start in range(0, len(prompts), PROMPTS_PER_BATCH):
+        batch = prompts[start:start + PROMPTS_PER_BATCH]
+
+        model_service.render_batch(
+            args.language,
+            [text for _, text in batch],
+            speaker_data["gpt_cond_latent"],
+            speaker_data["speaker_embedding"],
+            output_paths=[
+                os.path.join(args.output_dir, f"{prompt_id}{suffix}") for prompt_id, _ in batch
+            ],
+            output_profile=profile.name
+        )
+
+        print(f"[{start + len(batch)}/{len(prompts)}] {batch[-1][0]}")
+
+    print(f"Rendered {len(prompts)} prompts to {args.output_dir}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    profile_help = "; ".join(
+        f"{profile.name}: {profile.description}" for profile in OUTPUT_PROFILES.values())
+
+    parser = argparse.ArgumentParser(
+        description="Render a csv of prompts with one speaker, straight to files for an IVR or other delivery target")
+    parser.add_argument("--prompts_file", type=str, required=True,
+                        help="Csv file with a prompt id and text per row, the id names the output file")
+    parser.add_argument("--speaker", type=str, required=True,
+                        help="Name of the speaker to render the prompts with")
+    parser.add_argument("--output_dir", type=str, required=True,
+                        help="Directory the rendered files are written to")
+    parser.add_argument("--output_profile", type=str, default="telephony_ulaw",
+                        choices=list(OUTPUT_PROFILES.keys()),
+                        help=f"Sample rate and encoding of the files. {profile_help}. Default: telephony_ulaw")
+    parser.add_argument("--language", type=str, default="en",
+                        help="Language of the prompts. Default: en")
+    parser.add_argument("--speaker_file", type=str, default=os.environ.get("SPEAKERS_XTTS_PATH"),
+                        help="Speaker file with the speaker. Default: $SPEAKERS_XTTS_PATH")
+    parser.add_argument("--checkpoint_dir", type=str, default=os.environ.get("CHECKPOINT_DIR"),
+                        help="XTTS checkpoint directory. Default: $CHECKPOINT_DIR")
+    parser.add_argument("--vocab_file", type=str, default=os.environ.get("VOCAB_PATH"),
+                        help="XTTS vocab file. Default: $VOCAB_PATH")
+    parser.add_argument("--config_file", type=str, default=os.environ.get("CONFIG_PATH"),
+                        help="XTTS config file. Default: $CONFIG_PATH")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Render prompts whose file already exists again instead of skipping them")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of XTTS model worker processes, 1 runs the model in process. Default: 1")
+    parser.add_argument("--threads_per_worker", type=int, default=None,
+                        help="Torch threads (and cores) per model worker. Default: cpu count / workers")
+
+    args = parser.parse_args()
+
+    for name in ["speaker_file", "checkpoint_dir", "vocab_file", "config_file"]:
+        if not getattr(args, name):
+            parser.error(f"--{name} is required")
+
+    sys.exit(render_prompts(args))
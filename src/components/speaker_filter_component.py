@@ -0,0 +1,32 @@
+import gradio as gr
+from constants.common import METADATA_FIELD_CHOICES, METADATA_FILTER_FIELDS
+from services.speaker_metadata_index import SpeakerFilter
+
+
+def SpeakerFilterComponent(content: dict):
+    with gr.Accordion(label=content.get('speaker_filter_label'), open=False) as speaker_filter_group:
+        filter_dropdowns = []
+
+        with gr.Row():
+            for field, choices in METADATA_FIELD_CHOICES.items():
+                filter_dropdown = gr.Dropdown(
+                    label=content.get(f"{field}_filter_label"),
+                    choices=choices,
+                    value=[],
+                    multiselect=True,
+                    interactive=True,
+                    min_width=160
+                )
+
+                filter_dropdowns.append(filter_dropdown)
+
+    return speaker_filter_group, filter_dropdowns
+
+
+def to_speaker_filter(*filter_values) -> SpeakerFilter:
+    """
+    Maps the values of the filter dropdowns, in component order, to a filter.
+    """
+    return {
+        field: values for field, values in zip(METADATA_FILTER_FIELDS, filter_values) if values
+    }
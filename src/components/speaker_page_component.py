@@ -0,0 +1,104 @@
+import gradio as gr
+from services.speaker_manager_service import SpeakerManagerService
+from services.speaker_metadata_index import SpeakerFilter
+
+SPEAKER_PAGE_SIZE = 100
+
+
+def SpeakerPageComponent(content: dict, label: str | None = None, info: str | None = None, visible: bool = True):
+    """
+    Checkbox list showing one page of speakers at a time. The ticked names
+    of every page are kept in `selection_state` on the server, so selecting
+    all speakers never sends them all to the browser.
+    """
+    selection_state = gr.State(set())
+    offset_state = gr.State(0)
+    page_names_state = gr.State([])
+
+    speaker_checkbox_group = gr.CheckboxGroup(
+        label=label,
+        info=info,
+        choices=[],
+        value=[],
+        interactive=True,
+        visible=visible,
+        elem_classes=["speaker-checkbox-grid"]
+    )
+
+    with gr.Row(visible=visible) as page_controls_row:
+        previous_page_btn = gr.Button(
+            value=content.get('previous_page_btn_label'), scale=1)
+        page_label = gr.Markdown(value="")
+        selection_label = gr.Markdown(value="")
+        next_page_btn = gr.Button(
+            value=content.get('next_page_btn_label'), scale=1)
+
+    speaker_checkbox_group.input(
+        update_page_selection,
+        inputs=[speaker_checkbox_group, page_names_state, selection_state],
+        outputs=[selection_state]
+    )
+
+    selection_state.change(
+        lambda selection: gr.Markdown(value=content.get(
+            'selection_label_template', "{selected} selected").format(selected=len(selection))),
+        inputs=[selection_state],
+        outputs=[selection_label]
+    )
+
+    return (
+        speaker_checkbox_group,
+        page_controls_row,
+        previous_page_btn,
+        next_page_btn,
+        page_label,
+        selection_state,
+        offset_state,
+        page_names_state
+    )
+
+
+def update_page_selection(checked_speakers: list[str], page_names: list[str], selection: set[str]) -> set[str]:
+    return (selection - set(page_names)) | set(checked_speakers or [])
+
+
+def render_speaker_page(
+    content: dict,
+    speaker_service: SpeakerManagerService | None,
+    offset: int,
+    selection: set[str],
+    speaker_filter: SpeakerFilter | None = None,
+    page_size: int = SPEAKER_PAGE_SIZE
+) -> list:
+    """
+    Returns the updates for [checkbox group, page label, offset, page names]
+    showing the page at `offset`, with the selected speakers ticked.
+    """
+    if speaker_service is None:
+        return [gr.CheckboxGroup(choices=[], value=[]), gr.Markdown(value=""), 0, []]
+
+    offset = max(0, offset)
+    page_names, total = speaker_service.list_speakers(
+        offset, page_size, speaker_filter)
+
+    # Step back when the page emptied, e.g. after speakers were removed
+    if len(page_names) == 0 and total > 0:
+        offset = (total - 1) // page_size * page_size
+        page_names, total = speaker_service.list_speakers(
+            offset, page_size, speaker_filter)
+
+    page_label = content.get('page_label_template', "{start}-{end} of {total}").format(
+        start=offset + 1 if total > 0 else 0,
+        end=offset + len(page_names),
+        total=total
+    )
+
+    return [
+        gr.CheckboxGroup(
+            choices=page_names,
+            value=[name for name in page_names if name in selection]
+        ),
+        gr.Markdown(value=page_label),
+        offset,
+        page_names
+    ]
@@ -1,16 +1,23 @@
 import gradio as gr
 from constants.common import LANGUAGE_CHOICES
+from utils.audio_encoders import DEFAULT_AUDIO_ENCODER, PREVIEW_AUDIO_ENCODERS, get_preview_audio_format
 from utils.utils import get_random_speech_text, is_empty_string
 
 
-def SpeechPreviewComponent(content: dict):
+def SpeechPreviewComponent(content: dict, streaming: bool = False, output_format: str = DEFAULT_AUDIO_ENCODER):
+    if output_format not in PREVIEW_AUDIO_ENCODERS:
+        output_format = DEFAULT_AUDIO_ENCODER
+
     with gr.Group(visible=False) as audio_preview_group:
         # Get a random item from the speech_input_
         input_text = get_random_speech_text()
 
         audio_player = gr.Audio(
-            value=None, 
-            format="wav"  # Explicitly set format for Gradio 5 compatibility
+            value=None,
+            # Explicitly set format for Gradio 5 compatibility
+            format=get_preview_audio_format(output_format, streaming),
+            streaming=streaming,
+            autoplay=streaming
         )
 
         with gr.Row():
@@ -22,6 +29,17 @@ def SpeechPreviewComponent(content: dict):
                 interactive=True
             )
 
+            # Streamed chunks are always sent as raw audio. Only formats
+            # browsers can play are offered, mu-law and Opus are for export
+            output_format_select = gr.Dropdown(
+                choices=PREVIEW_AUDIO_ENCODERS,
+                label=content.get('output_format_select_label'),
+                value=output_format,
+                scale=1,
+                interactive=True,
+                visible=not streaming
+            )
+
             speech_input_textbox = gr.Textbox(
                 input_text,
                 label=content.get('speech_input_text_label'),
@@ -45,7 +63,12 @@ def SpeechPreviewComponent(content: dict):
     )
 
     generate_speech_btn.click(
-        lambda: ([gr.Audio(value=None, format="wav"), gr.Button(interactive=False)]),
+        lambda output_format: ([
+            gr.Audio(value=None, format=get_preview_audio_format(
+                output_format, streaming)),
+            gr.Button(interactive=False)
+        ]),
+        inputs=[output_format_select],
         outputs=[
             audio_player,
             generate_speech_btn
@@ -56,5 +79,6 @@ def SpeechPreviewComponent(content: dict):
         audio_player,
         speech_input_textbox,
         language_select,
-        generate_speech_btn
+        generate_speech_btn,
+        output_format_select
     )
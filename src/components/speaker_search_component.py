@@ -0,0 +1,12 @@
+import gradio as gr
+
+
+def SpeakerSearchComponent(content: dict):
+    search_textbox = gr.Textbox(
+        label=content.get('speaker_search_label'),
+        placeholder=content.get('speaker_search_placeholder'),
+        max_lines=1,
+        interactive=True
+    )
+
+    return search_textbox
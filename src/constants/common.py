@@ -1,5 +1,12 @@
 SPEAKER_METADATA_KEY = "__speaker_metadata__"
 
+# Speaker listing sort orders
+SORT_BY_NAME = "name"
+SORT_BY_NAME_DESC = "name_desc"
+
+# Seconds before an idle session's speaker tensors are dropped from memory
+SESSION_STATE_TTL = 60 * 60
+
 GENDER_CHOICES = [
     "Male",
     "Female",
@@ -112,6 +119,19 @@ CHARACTER_TYPE_CHOICES = [
     "Wizard"
 ]
 
+# SpeakerMetadata fields speakers can be filtered by, with their choices
+METADATA_FIELD_CHOICES = {
+    "gender": GENDER_CHOICES,
+    "age_range": AGE_RANGE_CHOICES,
+    "accent": ACCENT_CHOICES,
+    "tonal_quality": TONAL_CHOICES,
+    "style": STYLE_CHOICES,
+    "genre": GENRE_CHOICES,
+    "character_type": CHARACTER_TYPE_CHOICES,
+}
+
+METADATA_FILTER_FIELDS = list(METADATA_FIELD_CHOICES.keys())
+
 
 LANGUAGE_CHOICES = [
     "en",
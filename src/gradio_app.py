@@ -17,92 +17,13 @@ from views.forge_explore_view import ForgeExploreView
 from views.forge_import_view import ForgeImportView
 from views.forge_setup_view import ForgeSetupView
 from views.forge_mix_view import ForgeMixView
+from utils.audio_encoders import AUDIO_ENCODERS
 from utils.utils import get_latest_changelog_version
 
-latest_version = get_latest_changelog_version()
 src_dir = pathlib.Path(__file__).parent.resolve()
 assets_dir = src_dir / "assets"
 content_file_path = src_dir / "content.json"
 
-checkpoint_dir = os.environ.get("CHECKPOINT_DIR")
-config_file = os.environ.get("CONFIG_PATH")
-vocab_file = os.environ.get("VOCAB_PATH")
-speaker_file = os.environ.get("SPEAKERS_XTTS_PATH")
-
-if not checkpoint_dir:
-    raise ValueError("CHECKPOINT_DIR environment variable not set")
-if not config_file:
-    raise ValueError("CONFIG_PATH environment variable not set")
-if not vocab_file:
-    raise ValueError("VOCAB_PATH environment variable not set")
-if not speaker_file:
-    raise ValueError("SPEAKER_PATH environment variable not set")
-
-
-content_service = ContentManagerService(content_file_path)
-speaker_service = SpeakerManagerService()
-
-model_service = ModelManagerService()
-setup_view = ForgeSetupView(
-    speaker_service,
-    model_service,
-    content_service
-)
-setup_view.set_file_paths(
-    checkpoint_dir,
-    vocab_file,
-    config_file,
-    speaker_file
-)
-
-explore_view = ForgeExploreView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-create_view = ForgeCreateView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-mix_view = ForgeMixView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-edit_view = ForgeEditView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-import_view = ForgeImportView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-export_view = ForgeExportView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-changelog_view = ForgeChangelogView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
-about_view = ForgeAboutView(
-    speaker_service,
-    model_service,
-    content_service
-)
-
 
 class Logger:
     def __init__(self, filename="log.out"):
@@ -122,20 +43,6 @@ class Logger:
         return False
 
 
-# redirect stdout and stderr to a file
-sys.stdout = Logger()
-sys.stderr = sys.stdout
-
-# logging.basicConfig(stream=sys.stdout, level=logging.INFO)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
-
 def read_logs():
     sys.stdout.flush()
     with open(sys.stdout.log_file, "r") as f:
@@ -143,6 +50,105 @@ def read_logs():
 
 
 if __name__ == "__main__":
+    # redirect stdout and stderr to a file
+    # (only in the main process, spawned model workers re-import this module)
+    sys.stdout = Logger()
+    sys.stderr = sys.stdout
+
+    # logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    # Services and views are built here, not at import time, so the spawned
+    # model workers importing this module don't construct the whole app
+    latest_version = get_latest_changelog_version()
+
+    checkpoint_dir = os.environ.get("CHECKPOINT_DIR")
+    config_file = os.environ.get("CONFIG_PATH")
+    vocab_file = os.environ.get("VOCAB_PATH")
+    speaker_file = os.environ.get("SPEAKERS_XTTS_PATH")
+    cache_dir = os.environ.get(
+        "SPEAKER_FORGE_CACHE_DIR",
+        os.path.join(pathlib.Path.home(), ".cache", "speaker_forge")
+    )
+
+    if not checkpoint_dir:
+        raise ValueError("CHECKPOINT_DIR environment variable not set")
+    if not config_file:
+        raise ValueError("CONFIG_PATH environment variable not set")
+    if not vocab_file:
+        raise ValueError("VOCAB_PATH environment variable not set")
+    if not speaker_file:
+        raise ValueError("SPEAKER_PATH environment variable not set")
+
+    content_service = ContentManagerService(content_file_path)
+    speaker_service = SpeakerManagerService()
+
+    model_service = ModelManagerService()
+    setup_view = ForgeSetupView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+    setup_view.set_file_paths(
+        checkpoint_dir,
+        vocab_file,
+        config_file,
+        speaker_file
+    )
+
+    explore_view = ForgeExploreView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    create_view = ForgeCreateView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    mix_view = ForgeMixView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    edit_view = ForgeEditView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    import_view = ForgeImportView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    export_view = ForgeExportView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    changelog_view = ForgeChangelogView(
+        speaker_service,
+        model_service,
+        content_service
+    )
+
+    about_view = ForgeAboutView(
+        speaker_service,
+        model_service,
+        content_service
+    )
 
     parser = argparse.ArgumentParser(
         description="""XTTS Speaker Forge\n\n"""
@@ -167,16 +173,115 @@ if __name__ == "__main__":
         default=False,
     )
 
-    # TODO: limit create views audio upload size...
-    # parser.add_argument(
-    #     "--max_audio_length",
-    #     type=int,
-    #     help="Max permitted audio size in seconds. Default: 11",
-    #     default=11,
-    # )
+    parser.add_argument(
+        "--audio_cache_size",
+        type=int,
+        help="Max size of the generated audio cache in MB, 0 disables it. Default: 512",
+        default=512,
+    )
+
+    parser.add_argument(
+        "--output_store_size",
+        type=int,
+        help="Max size of the generated output files kept for download in MB. Default: 256",
+        default=256,
+    )
+
+    parser.add_argument(
+        "--output_max_age",
+        type=int,
+        help="Minutes a generated output file is kept for download. Default: 60",
+        default=60,
+    )
+
+    parser.add_argument(
+        "--conditioning_cache_size",
+        type=int,
+        help="Max size of the per file reference audio conditioning cache in MB, 0 disables it. Default: 128",
+        default=128,
+    )
+
+    parser.add_argument(
+        "--reference_audio_cache_size",
+        type=int,
+        help="Max size of the preprocessed reference audio cache in MB, 0 disables it. Default: 512",
+        default=512,
+    )
+
+    parser.add_argument(
+        "--no_preprocess_references",
+        action="store_true",
+        help="Skip trimming silence and normalizing loudness of reference audio before extraction. Default: False",
+    )
+
+    parser.add_argument(
+        "--output_format",
+        type=str,
+        choices=list(AUDIO_ENCODERS.keys()),
+        help="Default format generated audio is encoded to, the previews can override it. Previews only offer formats browsers play (wav, mp3, flac) and fall back to wav for the others. Default: wav",
+        default="wav",
+    )
+
+    parser.add_argument(
+        "--stream_audio",
+        action="store_true",
+        help="Stream preview audio chunks while they are rendered. Default: False",
+    )
+
+    parser.add_argument(
+        "--bulk_root_dir",
+        type=str,
+        help="Directory Bulk Create may read reference clip folders from, paths entered in the app are resolved below it. Default: $SPEAKER_FORGE_BULK_DIR, unset disables Bulk Create",
+        default=os.environ.get("SPEAKER_FORGE_BULK_DIR"),
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of XTTS model worker processes, 1 runs the model in process. Default: 1",
+        default=1,
+    )
+
+    parser.add_argument(
+        "--threads_per_worker",
+        type=int,
+        help="Torch threads (and cores) per model worker. Default: cpu count / workers",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--max_audio_length",
+        type=float,
+        help="Seconds of each reference upload used to create a speaker. Longer uploads are read in windows and only the best scoring ones kept. Default: the model's max_ref_len",
+        default=None,
+    )
 
     args = parser.parse_args()
 
+    model_service.set_audio_cache(
+        os.path.join(cache_dir, "audio"),
+        args.audio_cache_size * 1024 * 1024
+    )
+    model_service.set_output_store(
+        os.path.join(cache_dir, "outputs"),
+        args.output_store_size * 1024 * 1024,
+        args.output_max_age * 60
+    )
+    model_service.set_conditioning_cache(
+        os.path.join(cache_dir, "conditioning"),
+        args.conditioning_cache_size * 1024 * 1024
+    )
+    model_service.set_reference_audio_cache(
+        os.path.join(cache_dir, "reference_audio"),
+        args.reference_audio_cache_size * 1024 * 1024
+    )
+    model_service.set_preprocess_references(not args.no_preprocess_references)
+    model_service.set_max_audio_length(args.max_audio_length)
+    model_service.set_output_format(args.output_format)
+    model_service.set_stream_audio(args.stream_audio)
+    model_service.set_worker_pool(args.workers, args.threads_per_worker)
+    create_view.set_bulk_dirs(args.bulk_root_dir, cache_dir)
+
     explore_tab = gr.Tab(
         label="Explore",
         elem_id="tab-explore",
@@ -222,7 +327,11 @@ if __name__ == "__main__":
         export_tab
     )
 
-    with gr.Blocks(css=app_css()) as app:
+    # Gradio writes every returned audio array into its cache, clean it up on
+    # the same schedule as the output store
+    output_max_age_seconds = args.output_max_age * 60
+
+    with gr.Blocks(css=app_css(), delete_cache=(output_max_age_seconds, output_max_age_seconds)) as app:
         # https://i.postimg.cc/dDMzdf2g/speaker-forge-glitter.gif
         # http://www.gigaglitters.com/created/b7VvpETJqS.gif
 
@@ -277,9 +386,14 @@ if __name__ == "__main__":
         explore_tab.select(fn=explore_view.reload_speaker_data, outputs=explore_view.speaker_select)
         create_tab.select(fn=create_view.reload_speaker_data)
         mix_tab.select(fn=mix_view.reload_speaker_data, outputs=mix_view.speaker_select)
-        edit_tab.select(fn=edit_view.reload_speaker_data, outputs=edit_view.speaker_select)
+        edit_tab.select(fn=edit_view.reload_speaker_data, inputs=edit_view.reload_inputs, outputs=edit_view.speaker_select)
         import_tab.select(fn=import_view.reload_speaker_data)
-        export_tab.select(fn=export_view.reload_speaker_data, outputs=export_view.speaker_checkbox_group)
+        export_tab.select(fn=export_view.reload_speaker_data, inputs=export_view.reload_inputs, outputs=export_view.reload_outputs)
+
+    # Sessions keep their own state and the speaker service serializes access
+    # to the shared speaker data, so events can run concurrently up to the
+    # number of model workers (a single in process model isn't thread safe)
+    app.queue(default_concurrency_limit=max(1, args.workers))
 
     app.launch(
         share=args.share,
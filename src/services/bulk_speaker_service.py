@@ -0,0 +1,307 @@
+import hashlib
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from services.model_manager_service import ModelManagerService
+from services.speaker_manager_service import SpeakerManagerService
+from utils.safetensors_utils import load_safetensors, save_safetensors
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+# Folder of the cache dir finished speakers are written to as they complete,
+# so a run can resume
+CHECKPOINT_DIR_NAME = "bulk"
+# Speakers decoded ahead of the model, per loader thread
+PREFETCH_PER_THREAD = 2
+# Speakers whose clips go through the encoders in the same batched calls
+SPEAKERS_PER_BATCH = 8
+
+# Called with (speakers done, speakers total, current speaker name)
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def resolve_bulk_dir(base_dir: str, path: str) -> str:
+    """
+    Resolves `path`, relative to `base_dir` unless absolute, and raises a
+    ValueError when it falls outside `base_dir` (symlinks included).
+    """
+    base_dir = os.path.realpath(base_dir)
+    resolved_path = os.path.realpath(os.path.join(base_dir, path))
+
+    if os.path.commonpath([base_dir, resolved_path]) != base_dir:
+        raise ValueError(f"Directory {path} is outside of the bulk directory")
+
+    return resolved_path
+
+
+def get_checkpoint_dir(cache_dir: str, root_dir: str) -> str:
+    """
+    The checkpoint folder of a run over `root_dir`, kept in the cache dir
+    instead of next to the clips.
+    """
+    dir_hash = hashlib.sha256(
+        os.path.realpath(root_dir).encode()).hexdigest()[:32]
+
+    return os.path.join(cache_dir, CHECKPOINT_DIR_NAME, dir_hash)
+
+
+def find_speaker_folders(root_dir: str) -> Dict[str, List[str]]:
+    """
+    Maps each subfolder of `root_dir` to the audio files found anywhere
+    below it. The subfolder name is the speaker name.
+    """
+    speaker_folders = {}
+
+    for entry in sorted(os.scandir(root_dir), key=lambda entry: entry.name):
+        if not entry.is_dir() or entry.name.startswith("."):
+            continue
+
+        audio_files = []
+
+        for dir_path, dir_names, file_names in os.walk(entry.path):
+            dir_names.sort()
+
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(AUDIO_EXTENSIONS):
+                    audio_files.append(os.path.join(dir_path, file_name))
+
+        if len(audio_files) > 0:
+            speaker_folders[entry.name] = audio_files
+
+    return speaker_folders
+
+
+class BulkSpeakerService:
+    """
+    Creates a speaker for every subfolder of a directory of reference clips.
+    Clips are hashed, decoded and resampled on a thread pool while the model
+    extracts the speakers already loaded, several speakers per batch. Every finished speaker is written
+    to a checkpoint folder, and the new speakers are added to the library
+    with a single save at the end.
+    """
+
+    def __init__(self, model_service: ModelManagerService, speaker_service: SpeakerManagerService, cache_dir: str):
+        self.model_service = model_service
+        self.speaker_service = speaker_service
+        self.cache_dir = cache_dir
+
+    def get_checkpoint_path(self, checkpoint_dir: str, speaker_name: str) -> str:
+        file_name = hashlib.sha256(speaker_name.encode()).hexdigest()[:32]
+
+        return os.path.join(checkpoint_dir, f"{file_name}.safetensors")
+
+    def load_checkpoint(self, checkpoint_dir: str, speaker_name: str) -> dict | None:
+        checkpoint_path = self.get_checkpoint_path(checkpoint_dir, speaker_name)
+
+        if not os.path.exists(checkpoint_path):
+            return None
+
+        tensors, metadata = load_safetensors(checkpoint_path)
+
+        if metadata.get("speaker_name") != speaker_name or "num_clips" not in metadata:
+            return None
+
+        return {
+            **tensors,
+            "reference_stats": {
+                "num_clips": int(metadata["num_clips"]),
+                "num_chunks": int(metadata["num_chunks"]),
+            },
+        }
+
+    def save_checkpoint(self, checkpoint_dir: str, speaker_name: str, speaker: dict):
+        checkpoint_path = self.get_checkpoint_path(checkpoint_dir, speaker_name)
+        temp_path = f"{checkpoint_path}.tmp"
+
+        save_safetensors(
+            {
+                "gpt_cond_latent": speaker["gpt_cond_latent"],
+                "speaker_embedding": speaker["speaker_embedding"],
+            },
+            temp_path,
+            {
+                "speaker_name": speaker_name,
+                "num_clips": str(speaker["reference_stats"]["num_clips"]),
+                "num_chunks": str(speaker["reference_stats"]["num_chunks"]),
+            }
+        )
+        os.replace(temp_path, checkpoint_path)
+
+    def prepare_references(self, audio_files: List[str]) -> List[dict]:
+        """
+        Runs on the loader threads: looks every clip up in the conditioning
+        cache, and decodes the ones missing from it.
+        """
+        return [self.model_service.prepare_reference(audio_file) for audio_file in audio_files]
+
+    def extract_speakers(self, reference_groups: Dict[str, List[dict]]) -> Dict[str, tuple | Exception]:
+        """
+        Extracts a batch of prepared speakers with batched encoder calls,
+        returning their latents and reference stats. If the batch fails, its
+        speakers are retried one by one so a single bad speaker doesn't fail
+        the others.
+        """
+        try:
+            filled_groups = self.model_service.fill_reference_latents(
+                list(reference_groups.values()))
+        except Exception:
+            if len(reference_groups) == 1:
+                raise
+
+            results = {}
+
+            for speaker_name, references in reference_groups.items():
+                try:
+                    results.update(self.extract_speakers(
+                        {speaker_name: references}))
+                except Exception as e:
+                    results[speaker_name] = e
+
+            return results
+
+        results = {}
+
+        for speaker_name, references in zip(reference_groups.keys(), filled_groups):
+            try:
+                results[speaker_name] = (
+                    *self.model_service.combine_reference_latents(references),
+                    self.model_service.get_reference_stats(references)
+                )
+            except Exception as e:
+                results[speaker_name] = e
+
+        return results
+
+    def create_speakers(
+        self,
+        root_dir: str,
+        skip_existing: bool = True,
+        num_threads: int | None = None,
+        checkpoint_dir: str | None = None,
+        on_progress: ProgressCallback | None = None
+    ) -> dict:
+        """
+        Creates the speakers of `root_dir` and saves them to the speaker
+        file. Speakers already in the checkpoint folder from an interrupted
+        run are not extracted again. Returns the created, skipped and failed
+        speaker names, failures mapped to their error.
+        """
+        if not os.path.isdir(root_dir):
+            raise FileNotFoundError(f"Directory {root_dir} does not exist")
+
+        if not self.model_service.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.model_service.load_model()
+
+        checkpoint_dir = checkpoint_dir or get_checkpoint_dir(
+            self.cache_dir, root_dir)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        speaker_folders = find_speaker_folders(root_dir)
+        skipped = []
+
+        if skip_existing:
+            skipped = [speaker_name for speaker_name in speaker_folders
+                       if self.speaker_service.get_speaker_data(speaker_name) is not None]
+            for speaker_name in skipped:
+                del speaker_folders[speaker_name]
+
+        total = len(speaker_folders)
+        done = 0
+        created: Dict[str, dict] = {}
+        failed: Dict[str, str] = {}
+        pending = deque()
+
+        def report(speaker_name: str):
+            if on_progress is not None:
+                on_progress(done, total, speaker_name)
+
+        for speaker_name in list(speaker_folders.keys()):
+            speaker = self.load_checkpoint(checkpoint_dir, speaker_name)
+
+            if speaker is not None:
+                created[speaker_name] = speaker
+                del speaker_folders[speaker_name]
+                done += 1
+
+        report("")
+
+        num_threads = num_threads or min(8, os.cpu_count() or 1)
+        speaker_items = iter(speaker_folders.items())
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            def submit_next() -> bool:
+                item = next(speaker_items, None)
+
+                if item is None:
+                    return False
+
+                pending.append(
+                    (item[0], executor.submit(self.prepare_references, item[1])))
+                return True
+
+            # Keep a bounded number of decoded speakers ahead of the model
+            for _ in range(num_threads * PREFETCH_PER_THREAD + SPEAKERS_PER_BATCH):
+                if not submit_next():
+                    break
+
+            while len(pending) > 0:
+                reference_groups = {}
+                batch_names = []
+
+                # Wait for the next speakers in order, extracting them together
+                while len(pending) > 0 and len(batch_names) < SPEAKERS_PER_BATCH:
+                    speaker_name, future = pending.popleft()
+                    submit_next()
+                    batch_names.append(speaker_name)
+
+                    try:
+                        reference_groups[speaker_name] = future.result()
+                    except Exception as e:
+                        print(f"Failed to load clips of speaker {speaker_name}: {e}")
+                        failed[speaker_name] = str(e)
+
+                try:
+                    results = self.extract_speakers(reference_groups)
+                except Exception as e:
+                    results = {speaker_name: e for speaker_name in reference_groups}
+
+                for speaker_name in batch_names:
+                    result = results.get(speaker_name)
+
+                    if isinstance(result, Exception):
+                        print(f"Failed to create speaker {speaker_name}: {result}")
+                        failed[speaker_name] = str(result)
+                    elif result is not None:
+                        gpt_cond_latent, speaker_embedding, reference_stats = result
+                        speaker = {
+                            "gpt_cond_latent": gpt_cond_latent.cpu(),
+                            "speaker_embedding": speaker_embedding.cpu(),
+                            "reference_stats": reference_stats,
+                        }
+                        self.save_checkpoint(
+                            checkpoint_dir, speaker_name, speaker)
+                        created[speaker_name] = speaker
+
+                    done += 1
+                    report(speaker_name)
+
+        for speaker_name, speaker in created.items():
+            self.speaker_service.add_speaker(
+                speaker_name, speaker["gpt_cond_latent"], speaker["speaker_embedding"])
+            self.speaker_service.set_reference_stats(
+                speaker_name, speaker["reference_stats"])
+
+        if len(created) > 0:
+            self.speaker_service.save_speaker_file()
+
+        # Keep the checkpoint of a partly failed run, the failures can be fixed and retried
+        if len(failed) == 0:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+        return {
+            "created": sorted(created.keys()),
+            "skipped": skipped,
+            "failed": failed,
+        }
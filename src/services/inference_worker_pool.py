@@ -0,0 +1,172 @@
+import os
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import torch
+
+# Set inside each worker process by `init_worker`
+worker_model_service = None
+
+
+def to_transferable(value):
+    """
+    Converts tensors to numpy arrays so results are pickled by value instead
+    of going through torch's shared memory reductions.
+    """
+    if isinstance(value, torch.Tensor):
+        return value.detach().cpu().numpy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(to_transferable(item) for item in value)
+    if isinstance(value, dict):
+        return {key: to_transferable(item) for key, item in value.items()}
+
+    return value
+
+
+def from_transferable(value):
+    if isinstance(value, np.ndarray):
+        return torch.from_numpy(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(from_transferable(item) for item in value)
+    if isinstance(value, dict):
+        return {key: from_transferable(item) for key, item in value.items()}
+
+    return value
+
+
+def init_worker(checkpoint_dir: str, vocab_file: str, config_file: str, threads_per_worker: int, worker_counter):
+    global worker_model_service
+
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+
+    # Pin the worker to its own slice of cores so replicas don't fight over them
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        start = (worker_index * threads_per_worker) % len(cores)
+        core_slice = cores[start:start + threads_per_worker]
+
+        if len(core_slice) > 0:
+            os.sched_setaffinity(0, core_slice)
+
+    torch.set_num_threads(threads_per_worker)
+    torch.set_num_interop_threads(1)
+
+    # Imported here to avoid a circular import with the model manager
+    from services.model_manager_service import ModelManagerService
+
+    worker_model_service = ModelManagerService()
+    worker_model_service.set_file_paths(checkpoint_dir, vocab_file, config_file)
+    worker_model_service.load_model()
+
+    print(f"Inference worker {worker_index} ready (pid {os.getpid()}, {threads_per_worker} threads)")
+
+
+def call_worker(method_name: str, args: tuple, kwargs: dict):
+    method = getattr(worker_model_service, method_name)
+    result = method(*from_transferable(args), **from_transferable(kwargs))
+
+    return to_transferable(result)
+
+
+def worker_ready():
+    return os.getpid()
+
+
+class InferenceWorkerPool:
+    """
+    Pool of model worker processes, each holding its own Xtts replica and a
+    slice of the CPU cores. Calls are queued and picked up by the next idle
+    worker. When a worker dies (e.g. killed for running out of memory) the
+    pool is broken, calls in flight fail and the next call restarts it.
+    """
+    executor: ProcessPoolExecutor | None = None
+    start_args: tuple | None = None
+
+    def __init__(self, num_workers: int, threads_per_worker: int | None = None):
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(
+            1, (os.cpu_count() or 1) // num_workers)
+        self.restart_lock = threading.Lock()
+
+    def is_started(self):
+        return self.executor is not None
+
+    def start(self, checkpoint_dir: str, vocab_file: str, config_file: str):
+        if self.executor is not None:
+            print("Worker pool already started")
+            return
+
+        self.start_args = (checkpoint_dir, vocab_file, config_file)
+        mp_context = multiprocessing.get_context("spawn")
+        worker_counter = mp_context.Value("i", 0)
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=mp_context,
+            initializer=init_worker,
+            initargs=(
+                checkpoint_dir,
+                vocab_file,
+                config_file,
+                self.threads_per_worker,
+                worker_counter
+            )
+        )
+
+        # Spin up every worker now, so the model load isn't paid on the first click
+        warmups = [self.executor.submit(worker_ready)
+                   for _ in range(self.num_workers)]
+
+        for warmup in warmups:
+            warmup.result()
+
+    def restart(self, broken_executor: ProcessPoolExecutor):
+        with self.restart_lock:
+            # Another thread may have restarted it already
+            if self.executor is not broken_executor:
+                return
+
+            print("Worker pool is broken, restarting it")
+            broken_executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.start(*self.start_args)
+
+    def submit(self, method_name: str, *args, **kwargs) -> Future:
+        if self.executor is None:
+            raise RuntimeError("Worker pool has not been started")
+
+        args = to_transferable(args)
+        kwargs = to_transferable(kwargs)
+        executor = self.executor
+
+        try:
+            worker_future = executor.submit(
+                call_worker, method_name, args, kwargs)
+        except BrokenProcessPool:
+            self.restart(executor)
+            worker_future = self.executor.submit(
+                call_worker, method_name, args, kwargs)
+
+        future = Future()
+
+        def on_done(done_future: Future):
+            if done_future.exception() is not None:
+                future.set_exception(done_future.exception())
+            else:
+                future.set_result(from_transferable(done_future.result()))
+
+        worker_future.add_done_callback(on_done)
+
+        return future
+
+    def call(self, method_name: str, *args, **kwargs):
+        return self.submit(method_name, *args, **kwargs).result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
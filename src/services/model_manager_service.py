@@ -1,16 +1,141 @@
+import json
+import hashlib
+import math
 import os
 import time
 import torch
+from concurrent.futures import Future, ThreadPoolExecutor
 from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import Xtts
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+from TTS.tts.models.xtts import Xtts, load_audio, wav_to_mel_cloning
 import tempfile
 import torchaudio
+from typing import Dict, List
+from services.inference_worker_pool import InferenceWorkerPool
+from utils.audio_encoders import AudioEncoder, get_audio_encoder
+from utils.audio_utils import crossfade_concat, load_best_audio, normalize_loudness, resample_audio, trim_silence
+from utils.output_profiles import get_output_profile
+from utils.disk_cache import DiskCache, hash_file, hash_tensors
+from utils.output_store import OutputStore
+from utils.safetensors_utils import load_safetensors, save_safetensors
+from utils.text_utils import DEFAULT_CHAR_LIMIT, segment_text
 from utils.utils import is_valid_file_list
+from types_module import ReferenceStats
+
+SAMPLE_RATE = 24000
+# Bumped when the format of the cached renders changes, invalidating the audio cache
+INFERENCE_CACHE_VERSION = 2
+# Output store defaults when the app doesn't configure one
+DEFAULT_OUTPUT_STORE_BYTES = 256 * 1024 * 1024
+DEFAULT_OUTPUT_MAX_AGE = 60 * 60
+# Threads encoding output files while the model renders the next text
+ENCODER_THREADS = 2
+# Rate XTTS loads reference audio at for conditioning
+REFERENCE_SAMPLE_RATE = 22050
+# Seconds per gpt conditioning chunk, the `get_conditioning_latents` default
+GPT_COND_CHUNK_LEN = 6
+# Chunks shorter than this are skipped by `get_gpt_cond_latents`
+MIN_GPT_COND_CHUNK_LEN = 0.33
+# Bumped when the way per file conditioning latents are computed changes, invalidating the cache
+REFERENCE_LATENTS_VERSION = 2
+# Reference audio preprocessing, silence further than this below the peak
+# frame energy is trimmed, and the speech is normalized to this RMS loudness
+REFERENCE_TRIM_SILENCE_DB = 40.0
+REFERENCE_TARGET_LOUDNESS_DB = -20.0
+# Uploads longer than the max audio length by more than a window are
+# streamed in windows of this many seconds, keeping the best ones
+REFERENCE_WINDOW_SECONDS = 5
+# Rows per batched conditioning encoder call
+ENCODER_BATCH_SIZE = 16
 
 
 class ModelManagerService:
+    audio_cache: DiskCache | None = None
+    output_store: OutputStore | None = None
+    conditioning_cache: DiskCache | None = None
+    reference_audio_cache: DiskCache | None = None
+    preprocess_references: bool = True
+    # Seconds of each reference upload fed to the speaker encoder, None for
+    # the model's max_ref_len. The gpt latent still only sees gpt_cond_len
+    max_audio_length: float | None = None
+    stream_audio: bool = False
+    # Name of the default output encoder, see `AUDIO_ENCODERS`
+    output_format: str = "wav"
+    encode_executor: ThreadPoolExecutor | None = None
+    worker_pool: InferenceWorkerPool | None = None
+
     def __init__(self):
         self.model = None
+        self.config = None
+        self.tokenizer = None
+
+    def set_worker_pool(self, num_workers: int, threads_per_worker: int | None = None):
+        """
+        Runs inference and speaker extraction on `num_workers` model replicas
+        in separate processes instead of on a single in process model.
+        """
+        if num_workers <= 1:
+            self.worker_pool = None
+            return
+
+        self.worker_pool = InferenceWorkerPool(num_workers, threads_per_worker)
+
+    def is_model_loaded(self):
+        if self.worker_pool is not None:
+            return self.worker_pool.is_started()
+
+        return self.model is not None
+
+    def set_stream_audio(self, stream_audio: bool):
+        self.stream_audio = stream_audio
+
+    def set_output_format(self, output_format: str):
+        self.output_format = get_audio_encoder(output_format).name
+
+    def set_audio_cache(self, cache_dir: str, max_bytes: int):
+        if max_bytes <= 0:
+            self.audio_cache = None
+            return
+
+        self.audio_cache = DiskCache(cache_dir, max_bytes, suffix=".wav")
+
+    def set_output_store(self, output_dir: str, max_bytes: int, max_age_seconds: float):
+        self.output_store = OutputStore(output_dir, max_bytes, max_age_seconds)
+
+    def get_output_store(self) -> OutputStore:
+        if self.output_store is None:
+            self.set_output_store(
+                os.path.join(tempfile.gettempdir(), "speaker_forge_outputs"),
+                DEFAULT_OUTPUT_STORE_BYTES,
+                DEFAULT_OUTPUT_MAX_AGE
+            )
+
+        return self.output_store
+
+    def set_conditioning_cache(self, cache_dir: str, max_bytes: int):
+        if max_bytes <= 0:
+            self.conditioning_cache = None
+            return
+
+        self.conditioning_cache = DiskCache(
+            cache_dir, max_bytes, suffix=".safetensors")
+
+    def set_reference_audio_cache(self, cache_dir: str, max_bytes: int):
+        if max_bytes <= 0:
+            self.reference_audio_cache = None
+            return
+
+        self.reference_audio_cache = DiskCache(
+            cache_dir, max_bytes, suffix=".safetensors")
+
+    def set_preprocess_references(self, preprocess_references: bool):
+        self.preprocess_references = preprocess_references
+
+    def set_max_audio_length(self, max_audio_length: float | None):
+        self.max_audio_length = max_audio_length if max_audio_length and max_audio_length > 0 else None
+
+    def get_max_audio_length(self) -> float:
+        return self.max_audio_length or self.config.max_ref_len
 
     def set_file_paths(self, checkpoint_dir: str, vocab_file: str, config_file: str):
         if not is_valid_file_list([checkpoint_dir, vocab_file, config_file]):
@@ -21,10 +146,19 @@ class ModelManagerService:
         self.vocab_file = vocab_file
         self.config_file = config_file
 
+    def get_inference_backend(self) -> Xtts | InferenceWorkerPool | None:
+        """
+        The worker pool when inference runs in workers, otherwise the model.
+        """
+        if self.worker_pool is not None:
+            return self.worker_pool
+
+        return self.model
+
     def load_model(self):
-        if self.model is not None:
+        if self.is_model_loaded():
             print("Model already loaded")
-            return self.model
+            return self.get_inference_backend()
 
         self.clear_gpu_cache()
 
@@ -34,6 +168,18 @@ class ModelManagerService:
 
         config = XttsConfig()
         config.load_json(self.config_file)
+        self.config = config
+
+        if self.worker_pool is not None:
+            # The replicas live in the workers, only the config and tokenizer are needed here
+            print(
+                f"Starting {self.worker_pool.num_workers} XTTS model workers! ")
+
+            self.tokenizer = VoiceBpeTokenizer(self.vocab_file)
+            self.worker_pool.start(
+                self.checkpoint_dir, self.vocab_file, self.config_file)
+
+            return self.worker_pool
 
         self.model = Xtts.init_from_config(config)
 
@@ -48,20 +194,543 @@ class ModelManagerService:
         if torch.cuda.is_available():
             self.model.cuda()
 
+        self.tokenizer = self.model.tokenizer
+
         return self.model
 
     def extract_speaker_embedding(self, speaker_audio_files: str):
-        if self.model is None:
+        if not self.is_model_loaded():
             print("Loading model... Be Patient.")
             self.load_model()
 
+        if self.config.model_args.gpt_use_perceiver_resampler:
+            return self.extract_reference_speaker_embedding(speaker_audio_files)
+
+        if self.worker_pool is not None:
+            return self.worker_pool.call(
+                "extract_speaker_embedding", speaker_audio_files)
+
         gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
             audio_path=speaker_audio_files,
-            gpt_cond_len=self.model.config.gpt_cond_len,
-            max_ref_length=self.model.config.max_ref_len,
-            sound_norm_refs=self.model.config.sound_norm_refs
+            gpt_cond_len=self.config.gpt_cond_len,
+            max_ref_length=self.config.max_ref_len,
+            sound_norm_refs=self.config.sound_norm_refs
+        )
+
+        return gpt_cond_latent, speaker_embedding
+
+    def extract_reference_speaker_embedding(self, speaker_audio_files: str | List[str]):
+        """
+        `extract_speaker_embedding` built from per file conditioning latents
+        of the preprocessed reference audio. Files found in the conditioning
+        cache don't go through the encoders again.
+
+        This is not the same as `get_conditioning_latents` for speakers made
+        from several files. XTTS joins the files and keeps only the first
+        `gpt_cond_len` seconds of the result for the gpt latent, so later
+        files may not count at all, and its chunks can span two files. Here
+        each file contributes its own first `gpt_cond_len` seconds, and the
+        gpt latent is the mean over the chunks of every file. Single file
+        speakers match, apart from the reference preprocessing.
+        """
+        if isinstance(speaker_audio_files, str):
+            speaker_audio_files = [speaker_audio_files]
+
+        return self.extract_speaker_embeddings_batch({"": speaker_audio_files})[""]
+
+    def extract_speaker_embeddings_batch(self, speaker_audio_files: Dict[str, List[str]]) -> Dict[str, tuple]:
+        """
+        Extracts many speakers at once from `{speaker name: audio files}`,
+        running the encoders over the clips of every speaker together.
+        Returns `{speaker name: (gpt_cond_latent, speaker_embedding)}`.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        reference_groups = self.fill_reference_latents([
+            [self.prepare_reference(audio_file) for audio_file in audio_files]
+            for audio_files in speaker_audio_files.values()
+        ])
+
+        return {
+            speaker_name: self.combine_reference_latents(references)
+            for speaker_name, references in zip(speaker_audio_files.keys(), reference_groups)
+        }
+
+    def extract_speaker_references(self, speaker_audio_files: str | List[str]) -> List[dict]:
+        """
+        The per file latents of the reference clips, to combine into a
+        speaker or fold into an existing one.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        if isinstance(speaker_audio_files, str):
+            speaker_audio_files = [speaker_audio_files]
+
+        return self.fill_reference_latents([
+            [self.prepare_reference(audio_file)
+             for audio_file in speaker_audio_files]
+        ])[0]
+
+    def get_reference_stats(self, references: List[dict]) -> ReferenceStats:
+        return {
+            "num_clips": len(references),
+            "num_chunks": sum(reference["num_chunks"] for reference in references),
+        }
+
+    def get_default_reference_stats(self) -> ReferenceStats:
+        """
+        Stats assumed for speakers extracted without recording them, as if
+        made from a single clip of the max reference length.
+        """
+        return {
+            "num_clips": 1,
+            "num_chunks": self.count_gpt_cond_chunks(
+                self.get_gpt_cond_samples(REFERENCE_SAMPLE_RATE * self.config.max_ref_len)),
+        }
+
+    def get_gpt_cond_samples(self, num_samples: int) -> int:
+        """
+        Samples of a reference clip the gpt conditioning encoder sees, as
+        `get_gpt_cond_latents` only keeps the first `gpt_cond_len` seconds.
+        """
+        if self.config.gpt_cond_len > 0:
+            return min(num_samples, REFERENCE_SAMPLE_RATE * self.config.gpt_cond_len)
+
+        return num_samples
+
+    def combine_reference_latents(self, references: List[dict]):
+        """
+        Merges per file reference latents into a speaker, weighting the gpt
+        latents by their number of chunks.
+        """
+        num_chunks = sum(reference["num_chunks"] for reference in references)
+
+        if num_chunks == 0:
+            raise ValueError(
+                "The reference audio is too short to condition a speaker on")
+
+        gpt_cond_latent = sum(
+            reference["gpt_cond_latent"] * reference["num_chunks"]
+            for reference in references if reference["num_chunks"] > 0
+        ) / num_chunks
+        speaker_embedding = torch.stack(
+            [reference["speaker_embedding"] for reference in references]).mean(dim=0)
+
+        return gpt_cond_latent, speaker_embedding
+
+    def get_reference_cache_key(self, audio_file: str, file_hash: str | None = None) -> str:
+        reference = {
+            "version": REFERENCE_LATENTS_VERSION,
+            "audio": file_hash or hash_file(audio_file),
+            "preprocessing": self.get_preprocessing_params(),
+            "max_audio_length": self.get_max_audio_length(),
+            "gpt_cond_len": self.config.gpt_cond_len,
+            "gpt_cond_chunk_len": GPT_COND_CHUNK_LEN,
+            "max_ref_len": self.config.max_ref_len,
+            "sound_norm_refs": self.config.sound_norm_refs,
+            "checkpoint_dir": os.path.abspath(self.checkpoint_dir),
+        }
+
+        return hashlib.sha256(
+            json.dumps(reference, sort_keys=True).encode()).hexdigest()
+
+    def prepare_reference(self, audio_file: str) -> dict:
+        """
+        The cached latents of a reference file, or its decoded audio along
+        with the cache key to store its latents under once computed. Doesn't
+        touch the model, so it can run on any thread.
+        """
+        cache_key = None
+        file_hash = None
+
+        if self.conditioning_cache is not None:
+            file_hash = hash_file(audio_file)
+            cache_key = self.get_reference_cache_key(audio_file, file_hash)
+            reference = self.get_cached_reference_latents(cache_key)
+
+            if reference is not None:
+                return reference
+
+        return {
+            "cache_key": cache_key,
+            "audio": self.load_reference_audio(audio_file, file_hash),
+        }
+
+    def fill_reference_latents(self, reference_groups: List[List[dict]]) -> List[List[dict]]:
+        """
+        Computes the latents of every prepared reference still holding audio,
+        in one batched pass over all the groups, and caches them.
+        """
+        missing = [reference for references in reference_groups
+                   for reference in references if "audio" in reference]
+        latents = iter(self.compute_audio_latents_batch(
+            [reference["audio"] for reference in missing]))
+
+        return [
+            [
+                self.store_reference_latents(
+                    reference["cache_key"], *next(latents))
+                if "audio" in reference else reference
+                for reference in references
+            ]
+            for references in reference_groups
+        ]
+
+    def get_cached_reference_latents(self, cache_key: str) -> dict | None:
+        if self.conditioning_cache is None:
+            return None
+
+        cached_path = self.conditioning_cache.get(cache_key)
+
+        if cached_path is None:
+            return None
+
+        tensors, metadata = load_safetensors(cached_path)
+
+        return {
+            "gpt_cond_latent": tensors.get("gpt_cond_latent"),
+            "speaker_embedding": tensors["speaker_embedding"],
+            "num_chunks": int(metadata["num_chunks"]),
+        }
+
+    def store_reference_latents(
+        self,
+        cache_key: str | None,
+        gpt_cond_latent: torch.Tensor | None,
+        speaker_embedding: torch.Tensor,
+        num_chunks: int
+    ) -> dict:
+        tensors = {"speaker_embedding": speaker_embedding.cpu()}
+
+        if gpt_cond_latent is not None:
+            tensors["gpt_cond_latent"] = gpt_cond_latent.cpu()
+
+        if self.conditioning_cache is not None and cache_key is not None:
+            self.conditioning_cache.put(
+                cache_key,
+                lambda path: save_safetensors(
+                    tensors, path, {"num_chunks": str(num_chunks)})
+            )
+
+        return {
+            "gpt_cond_latent": tensors.get("gpt_cond_latent"),
+            "speaker_embedding": tensors["speaker_embedding"],
+            "num_chunks": num_chunks,
+        }
+
+    def load_reference_audio(self, audio_file: str, file_hash: str | None = None) -> torch.Tensor:
+        """
+        Loads a preprocessed reference file on the CPU, capped at the max
+        audio length and peak normalized like `get_conditioning_latents`.
+        The cap defaults to the model's `max_ref_len`, a longer
+        `max_audio_length` feeds that much more audio to the speaker encoder.
+        Doesn't touch the model, so it can run on any thread.
+        """
+        audio = self.load_preprocessed_audio(audio_file, file_hash)
+        audio = audio[:, :int(REFERENCE_SAMPLE_RATE * self.get_max_audio_length())]
+
+        peak = float(torch.abs(audio).max()) if audio.numel() > 0 else 0.0
+
+        # Silence has nothing to condition on, and would normalize to nans
+        if peak == 0:
+            raise ValueError(
+                f"Reference audio {os.path.basename(audio_file)} is silent or empty")
+
+        if self.config.sound_norm_refs:
+            audio = (audio / peak) * 0.75
+
+        return audio
+
+    def get_preprocessing_params(self) -> dict | None:
+        if not self.preprocess_references:
+            return None
+
+        return {
+            "sample_rate": REFERENCE_SAMPLE_RATE,
+            "trim_silence_db": REFERENCE_TRIM_SILENCE_DB,
+            "target_loudness_db": REFERENCE_TARGET_LOUDNESS_DB,
+        }
+
+    def load_preprocessed_audio(self, audio_file: str, file_hash: str | None = None) -> torch.Tensor:
+        """
+        Decodes a reference file resampled to the model rate, with its
+        leading and trailing silence trimmed and its loudness normalized.
+        The result is kept in the reference audio cache, so a clip is only
+        ever decoded and resampled once.
+        """
+        if not self.preprocess_references:
+            return self.decode_reference_audio(audio_file)
+
+        cache_key = None
+
+        if self.reference_audio_cache is not None:
+            reference = {
+                "audio": file_hash or hash_file(audio_file),
+                "preprocessing": self.get_preprocessing_params(),
+                "max_audio_length": self.get_max_audio_length(),
+            }
+            cache_key = hashlib.sha256(
+                json.dumps(reference, sort_keys=True).encode()).hexdigest()
+            cached_path = self.reference_audio_cache.get(cache_key)
+
+            if cached_path is not None:
+                tensors, _ = load_safetensors(cached_path)
+                return tensors["audio"]
+
+        audio = self.decode_reference_audio(audio_file)
+        audio = trim_silence(audio, REFERENCE_SAMPLE_RATE,
+                             relative_db=REFERENCE_TRIM_SILENCE_DB)
+        audio = normalize_loudness(
+            audio, REFERENCE_SAMPLE_RATE, target_db=REFERENCE_TARGET_LOUDNESS_DB)
+
+        if cache_key is not None:
+            self.reference_audio_cache.put(
+                cache_key,
+                lambda path: save_safetensors(
+                    {"audio": audio.float()}, path, {"sample_rate": str(REFERENCE_SAMPLE_RATE)})
+            )
+
+        return audio
+
+    def decode_reference_audio(self, audio_file: str) -> torch.Tensor:
+        """
+        Decodes a reference file at the model rate. Files longer than the
+        max audio length are streamed in windows, and only the best scoring
+        windows are kept, so memory stays bounded whatever the upload length.
+        """
+        max_seconds = self.get_max_audio_length()
+
+        try:
+            info = torchaudio.info(audio_file)
+            duration = info.num_frames / info.sample_rate
+        except Exception:
+            # No seekable metadata for this format, decode it whole
+            duration = 0
+
+        if duration <= max_seconds + REFERENCE_WINDOW_SECONDS:
+            return load_audio(audio_file, REFERENCE_SAMPLE_RATE)
+
+        return load_best_audio(audio_file, REFERENCE_SAMPLE_RATE, max_seconds, REFERENCE_WINDOW_SECONDS)
+
+    def compute_audio_latents(self, audio: torch.Tensor):
+        """
+        Returns the gpt conditioning latent averaged over the chunks of a
+        single preprocessed reference clip (None when it has no full chunk),
+        its speaker embedding and the number of chunks.
+        """
+        if self.worker_pool is not None:
+            return self.worker_pool.call("compute_audio_latents", audio)
+
+        with torch.inference_mode():
+            audio = audio.to(self.model.device)
+            speaker_embedding = self.model.get_speaker_embedding(
+                audio, REFERENCE_SAMPLE_RATE)
+
+            num_chunks = self.count_gpt_cond_chunks(
+                self.get_gpt_cond_samples(audio.shape[1]))
+            gpt_cond_latent = self.model.get_gpt_cond_latents(
+                audio,
+                REFERENCE_SAMPLE_RATE,
+                length=self.config.gpt_cond_len,
+                chunk_length=GPT_COND_CHUNK_LEN
+            ) if num_chunks > 0 else None
+
+        return gpt_cond_latent, speaker_embedding, num_chunks
+
+    def compute_audio_latents_batch(self, audios: List[torch.Tensor]) -> list:
+        """
+        `compute_audio_latents` for many clips, batching the encoder calls,
+        with the same `gpt_cond_len` cap so both give the same latents (see
+        scripts/check_batched_latents.py). Clips and gpt conditioning chunks
+        are bucketed by exact length, the encoders have no padding mask so
+        padded rows would change their output. Capped clips and full chunks
+        share a length, so most rows land in a few large buckets.
+        """
+        if len(audios) == 0:
+            return []
+
+        if self.worker_pool is not None:
+            # One slice of the clips per worker, each batched in its worker
+            slice_size = math.ceil(len(audios) / self.worker_pool.num_workers)
+            futures = [
+                self.worker_pool.submit(
+                    "compute_audio_latents_batch", audios[start:start + slice_size])
+                for start in range(0, len(audios), slice_size)
+            ]
+
+            return [latents for future in futures for latents in future.result()]
+
+        if not self.config.model_args.gpt_use_perceiver_resampler:
+            return [self.compute_audio_latents(audio) for audio in audios]
+
+        speaker_embeddings: List[torch.Tensor | None] = [None] * len(audios)
+        style_sums: List[torch.Tensor | None] = [None] * len(audios)
+        num_chunks = [0] * len(audios)
+
+        chunk_size = REFERENCE_SAMPLE_RATE * GPT_COND_CHUNK_LEN
+        min_chunk_size = REFERENCE_SAMPLE_RATE * MIN_GPT_COND_CHUNK_LEN
+        chunks = []
+
+        for index, audio in enumerate(audios):
+            audio = audio[:, :self.get_gpt_cond_samples(audio.shape[1])]
+
+            for start in range(0, audio.shape[1], chunk_size):
+                chunk = audio[:, start:start + chunk_size]
+
+                if chunk.shape[1] >= min_chunk_size:
+                    chunks.append((index, chunk))
+
+        with torch.inference_mode():
+            for indices, batch in self.bucket_by_length(list(enumerate(audios))):
+                batch_16k = resample_audio(
+                    batch, REFERENCE_SAMPLE_RATE, 16000)
+                embeddings = self.model.hifigan_decoder.speaker_encoder.forward(
+                    batch_16k.to(self.model.device), l2_norm=True)
+
+                for row, index in enumerate(indices):
+                    speaker_embeddings[index] = embeddings[row:row + 1].unsqueeze(-1)
+
+            for indices, batch in self.bucket_by_length(chunks):
+                mels = wav_to_mel_cloning(
+                    batch,
+                    mel_norms=self.model.mel_stats.cpu(),
+                    n_fft=2048,
+                    hop_length=256,
+                    win_length=1024,
+                    power=2,
+                    normalized=False,
+                    sample_rate=REFERENCE_SAMPLE_RATE,
+                    f_min=0,
+                    f_max=8000,
+                    n_mels=80
+                )
+                # [B, 1024, 32] style embedding per chunk
+                style_embs = self.model.gpt.get_style_emb(
+                    mels.to(self.model.device), None)
+
+                for row, index in enumerate(indices):
+                    style_emb = style_embs[row:row + 1]
+                    style_sums[index] = style_emb if style_sums[index] is None else style_sums[index] + style_emb
+                    num_chunks[index] += 1
+
+        return [
+            (
+                (style_sums[index] / num_chunks[index]).transpose(1, 2)
+                if num_chunks[index] > 0 else None,
+                speaker_embeddings[index],
+                num_chunks[index]
+            )
+            for index in range(len(audios))
+        ]
+
+    def bucket_by_length(self, items: List[tuple], batch_size: int = ENCODER_BATCH_SIZE):
+        """
+        Groups `(index, [1, T] audio)` items of the same length into batches,
+        yielding `(indices, [B, T] batch)`.
+        """
+        buckets: Dict[int, list] = {}
+
+        for index, audio in items:
+            buckets.setdefault(audio.shape[1], []).append((index, audio))
+
+        for bucket in buckets.values():
+            for start in range(0, len(bucket), batch_size):
+                batch = bucket[start:start + batch_size]
+
+                yield [index for index, _ in batch], torch.cat([audio for _, audio in batch])
+
+    def count_gpt_cond_chunks(self, num_samples: int) -> int:
+        chunk_size = REFERENCE_SAMPLE_RATE * GPT_COND_CHUNK_LEN
+
+        return sum(
+            1 for start in range(0, num_samples, chunk_size)
+            if min(chunk_size, num_samples - start) >= REFERENCE_SAMPLE_RATE * MIN_GPT_COND_CHUNK_LEN
         )
 
+    def extract_speaker_embedding_only(self, speaker_audio_files: str | List[str]) -> torch.Tensor:
+        """
+        Runs only the speaker encoder over the reference audio, skipping the
+        gpt conditioning latents. Enough to search for a speaker, not to
+        synthesize with one.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        if isinstance(speaker_audio_files, str):
+            speaker_audio_files = [speaker_audio_files]
+
+        # Same preprocessing as the speakers it's compared against
+        audios = [self.load_reference_audio(audio_file)
+                  for audio_file in speaker_audio_files]
+
+        if self.worker_pool is not None:
+            return self.worker_pool.call("compute_speaker_embedding", audios)
+
+        return self.compute_speaker_embedding(audios)
+
+    def compute_speaker_embedding(self, audios: List[torch.Tensor]) -> torch.Tensor:
+        with torch.inference_mode():
+            speaker_embeddings = [
+                self.model.get_speaker_embedding(
+                    audio.to(self.model.device), REFERENCE_SAMPLE_RATE)
+                for audio in audios
+            ]
+
+        return torch.stack(speaker_embeddings).mean(dim=0)
+
+    def extract_joined_speaker_embedding(self, speaker_audio_files: str | List[str]):
+        """
+        Conditions a new speaker the way `get_conditioning_latents` does: the
+        gpt latent over the files joined together, capped at `gpt_cond_len`,
+        and the speaker embedding averaged over the files, using the
+        preprocessed reference audio. Returns the latents and the reference
+        stats of the audio the gpt latent actually saw, for refining the
+        speaker later.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        if isinstance(speaker_audio_files, str):
+            speaker_audio_files = [speaker_audio_files]
+
+        audios = [self.load_reference_audio(audio_file)
+                  for audio_file in speaker_audio_files]
+        num_chunks = self.count_gpt_cond_chunks(self.get_gpt_cond_samples(
+            sum(audio.shape[1] for audio in audios)))
+
+        if num_chunks == 0:
+            raise ValueError(
+                "The reference audio is too short to condition a speaker on")
+
+        if self.worker_pool is not None:
+            gpt_cond_latent, speaker_embedding = self.worker_pool.call(
+                "compute_joined_latents", audios)
+        else:
+            gpt_cond_latent, speaker_embedding = self.compute_joined_latents(
+                audios)
+
+        return gpt_cond_latent, speaker_embedding, {
+            "num_clips": len(audios),
+            "num_chunks": num_chunks,
+        }
+
+    def compute_joined_latents(self, audios: List[torch.Tensor]):
+        speaker_embedding = self.compute_speaker_embedding(audios)
+
+        with torch.inference_mode():
+            gpt_cond_latent = self.model.get_gpt_cond_latents(
+                torch.cat(audios, dim=1).to(self.model.device),
+                REFERENCE_SAMPLE_RATE,
+                length=self.config.gpt_cond_len,
+                chunk_length=GPT_COND_CHUNK_LEN
+            )
+
         return gpt_cond_latent, speaker_embedding
 
     def run_inference(
@@ -70,23 +739,44 @@ class ModelManagerService:
         tts_text: str,
         gpt_cond_latent: torch.Tensor,
         speaker_embedding: torch.Tensor,
-        file_name=None
+        file_name=None,
+        return_array: bool = False,
+        output_format: str | None = None,
+        output_profile: str | None = None
     ):
-        if self.model is None:
+        """
+        Renders `tts_text` and returns the path of a file encoded in
+        `output_format`, the service default when None, or resampled and
+        encoded for `output_profile`. Model rate wav output with
+        `return_array` is returned as the `(sample_rate, int16 numpy array)`
+        a `gr.Audio` takes directly, skipping the output store. Gradio still
+        writes it to a 16 bit wav in its own cache, which the app cleans up.
+        A cache hit returns the cached file, in the same 16 bit format.
+        """
+        if not self.is_model_loaded():
             print("Loading model... Be Patient.")
             self.load_model()
 
-        out = self.model.inference(
-            text=tts_text,
-            language=lang,
-            gpt_cond_latent=gpt_cond_latent,
-            speaker_embedding=speaker_embedding,
-            temperature=self.model.config.temperature,  # Add custom parameters here
-            length_penalty=self.model.config.length_penalty,
-            repetition_penalty=self.model.config.repetition_penalty,
-            top_k=self.model.config.top_k,
-            top_p=self.model.config.top_p,
-        )
+        encoder, output_sample_rate = self.get_output_target(
+            output_format, output_profile)
+        is_wav = encoder.name == "wav" and output_sample_rate == SAMPLE_RATE
+        cache_key = None
+
+        if self.audio_cache is not None:
+            cache_key = self.get_inference_cache_key(
+                lang, tts_text, gpt_cond_latent, speaker_embedding)
+            cached_path = self.audio_cache.get(cache_key)
+
+            if cached_path is not None:
+                if is_wav:
+                    return cached_path
+
+                wav, sample_rate = torchaudio.load(cached_path)
+                return self.encode_audio(
+                    wav, encoder, sample_rate, output_sample_rate=output_sample_rate).result()
+
+        wav = self.synthesize_text(
+            lang, tts_text, gpt_cond_latent, speaker_embedding)
 
         # if file_name:
         #     with tempfile.TemporaryDirectory() as temp_dir:
@@ -101,15 +791,314 @@ class ModelManagerService:
         #         # so you might want to copy or move the file to another location if you
         #         # want to keep it.
         # else:
-        # Use a temporary file which will be automatically deleted unless delete=False
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            out_path = temp_file.name
-            out["wav"] = torch.tensor(out["wav"]).unsqueeze(0)
-            torchaudio.save(out_path, out["wav"], 24000)
-            # The temp_file is not deleted automatically because delete=False
-            # You can access it using out_path
-
-        return out_path
+        wav = wav.unsqueeze(0)
+
+        if cache_key is not None:
+            cached_path = self.audio_cache.put(
+                cache_key,
+                # 16 bit like fresh renders, so a hit sounds and weighs the same
+                lambda path: get_audio_encoder("wav").encode(path, wav, SAMPLE_RATE)
+            )
+
+            if is_wav and not return_array:
+                return cached_path
+
+        if is_wav and return_array:
+            return self.to_audio_chunk(wav.squeeze(0), SAMPLE_RATE)
+
+        return self.encode_audio(
+            wav, encoder, output_sample_rate=output_sample_rate).result()
+
+    def get_output_target(self, output_format: str | None, output_profile: str | None):
+        """
+        The encoder and sample rate output is written with, a profile
+        taking precedence over a format.
+        """
+        if output_profile is not None:
+            profile = get_output_profile(output_profile)
+            return profile.get_encoder(), profile.sample_rate
+
+        return get_audio_encoder(output_format or self.output_format), SAMPLE_RATE
+
+    def get_encode_executor(self) -> ThreadPoolExecutor:
+        if self.encode_executor is None:
+            self.encode_executor = ThreadPoolExecutor(
+                max_workers=ENCODER_THREADS, thread_name_prefix="audio-encoder")
+
+        return self.encode_executor
+
+    def encode_audio(
+        self,
+        wav: torch.Tensor,
+        encoder: AudioEncoder,
+        sample_rate: int = SAMPLE_RATE,
+        output_path: str | None = None,
+        output_sample_rate: int | None = None
+    ) -> Future:
+        """
+        Encodes `wav`, shaped [channels, samples], on the encoder threads,
+        resampling it to `output_sample_rate` first when given. The future
+        resolves to `output_path`, or when None to a managed file in the
+        output store, evicted by size and age and removed at shutdown.
+        `output_path` is written through a temporary file, so an interrupted
+        encode never leaves a truncated file behind under the final name.
+        """
+        def encode() -> str:
+            nonlocal wav, sample_rate
+
+            if output_sample_rate is not None and output_sample_rate != sample_rate:
+                # The resampling filter can overshoot, keep peaks in range for the integer encodings
+                wav = resample_audio(wav, sample_rate, output_sample_rate).clamp(-1.0, 1.0)
+                sample_rate = output_sample_rate
+
+            if output_path is None:
+                return self.get_output_store().save(
+                    lambda path: encoder.encode(path, wav, sample_rate), encoder.suffix)
+
+            temp_path = f"{output_path}.tmp"
+
+            try:
+                encoder.encode(temp_path, wav, sample_rate)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            return output_path
+
+        return self.get_encode_executor().submit(encode)
+
+    def render_batch(
+        self,
+        lang: str,
+        texts: List[str],
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        output_format: str | None = None,
+        output_paths: List[str] | None = None,
+        output_profile: str | None = None
+    ) -> List[str]:
+        """
+        Renders every text to its own encoded file and returns their paths.
+        Each file is resampled and encoded in the background while the next
+        text renders. With model workers the sentences of every text are
+        queued at once, so the workers render several texts in parallel.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        encoder, output_sample_rate = self.get_output_target(
+            output_format, output_profile)
+        futures = []
+
+        if self.worker_pool is not None:
+            segment_futures = [
+                [
+                    self.worker_pool.submit(
+                        "synthesize", lang, segment, gpt_cond_latent, speaker_embedding)
+                    for segment in self.split_text(lang, text)
+                ]
+                for text in texts
+            ]
+            # Stitched in order as their sentences finish
+            wavs = (
+                crossfade_concat(
+                    [future.result() for future in text_futures], SAMPLE_RATE)
+                for text_futures in segment_futures
+            )
+        else:
+            wavs = (
+                self.synthesize_text(
+                    lang, text, gpt_cond_latent, speaker_embedding)
+                for text in texts
+            )
+
+        for index, wav in enumerate(wavs):
+            futures.append(self.encode_audio(
+                wav.unsqueeze(0),
+                encoder,
+                output_path=output_paths[index] if output_paths is not None else None,
+                output_sample_rate=output_sample_rate
+            ))
+
+        return [future.result() for future in futures]
+
+    def run_inference_stream(
+        self,
+        lang: str,
+        tts_text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        file_name=None
+    ):
+        """
+        Generator version of `run_inference` built on `Xtts.inference_stream`.
+        Yields `(sample_rate, int16 numpy array)` chunks as soon as they are
+        rendered, the full clip is added to the audio cache once finished.
+        """
+        if not self.is_model_loaded():
+            print("Loading model... Be Patient.")
+            self.load_model()
+
+        cache_key = None
+
+        if self.audio_cache is not None:
+            cache_key = self.get_inference_cache_key(
+                lang, tts_text, gpt_cond_latent, speaker_embedding)
+            cached_path = self.audio_cache.get(cache_key)
+
+            if cached_path is not None:
+                wav, sample_rate = torchaudio.load(cached_path)
+                yield self.to_audio_chunk(wav.squeeze(0), sample_rate)
+                return
+
+        chunks = []
+
+        for chunk in self.stream_segments(
+            lang,
+            self.split_text(lang, tts_text),
+            gpt_cond_latent,
+            speaker_embedding
+        ):
+            chunks.append(chunk)
+
+            yield self.to_audio_chunk(chunk, SAMPLE_RATE)
+
+        if cache_key is not None and len(chunks) > 0:
+            wav = torch.cat(chunks).unsqueeze(0)
+            self.audio_cache.put(
+                cache_key,
+                # 16 bit like fresh renders, so a hit sounds and weighs the same
+                lambda path: get_audio_encoder("wav").encode(path, wav, SAMPLE_RATE)
+            )
+
+    def stream_segments(
+        self,
+        lang: str,
+        segments: List[str],
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor
+    ):
+        if self.worker_pool is not None:
+            # Workers can't hand back partial renders, so stream sentence by
+            # sentence, rendering them in parallel and yielding them in order.
+            futures = [
+                self.worker_pool.submit(
+                    "synthesize", lang, segment, gpt_cond_latent, speaker_embedding)
+                for segment in segments
+            ]
+
+            for future in futures:
+                yield future.result()
+
+            return
+
+        for segment in segments:
+            for chunk in self.model.inference_stream(
+                text=segment,
+                language=lang,
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                **self.get_sampling_params()
+            ):
+                yield chunk.detach().cpu()
+
+    def split_text(self, lang: str, tts_text: str) -> List[str]:
+        char_limits = getattr(self.tokenizer, "char_limits", {})
+        max_chars = char_limits.get(lang.split("-")[0], DEFAULT_CHAR_LIMIT)
+
+        return segment_text(tts_text, lang, max_chars)
+
+    def synthesize(
+        self,
+        lang: str,
+        tts_text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor
+    ) -> torch.Tensor:
+        out = self.model.inference(
+            text=tts_text,
+            language=lang,
+            gpt_cond_latent=gpt_cond_latent,
+            speaker_embedding=speaker_embedding,
+            **self.get_sampling_params()  # Add custom parameters here
+        )
+
+        return torch.as_tensor(out["wav"]).cpu()
+
+    def map_segments(
+        self,
+        lang: str,
+        segments: List[str],
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor
+    ) -> List[torch.Tensor]:
+        if self.worker_pool is not None:
+            futures = [
+                self.worker_pool.submit(
+                    "synthesize", lang, segment, gpt_cond_latent, speaker_embedding)
+                for segment in segments
+            ]
+
+            return [future.result() for future in futures]
+
+        # A single Xtts instance keeps per call state on the GPT model,
+        # so without workers segments are rendered one after the other.
+        return [
+            self.synthesize(lang, segment, gpt_cond_latent, speaker_embedding)
+            for segment in segments
+        ]
+
+    def synthesize_text(
+        self,
+        lang: str,
+        tts_text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Renders text of any length by splitting it into sentences, rendering
+        each one and stitching the results back together with short crossfades.
+        """
+        segments = self.split_text(lang, tts_text)
+        wavs = self.map_segments(
+            lang, segments, gpt_cond_latent, speaker_embedding)
+
+        return crossfade_concat(wavs, SAMPLE_RATE)
+
+    def to_audio_chunk(self, wav: torch.Tensor, sample_rate: int):
+        pcm = (wav.clamp(-1.0, 1.0) * 32767).to(torch.int16)
+
+        return sample_rate, pcm.numpy()
+
+    def get_sampling_params(self) -> dict:
+        return {
+            "temperature": self.config.temperature,
+            "length_penalty": self.config.length_penalty,
+            "repetition_penalty": self.config.repetition_penalty,
+            "top_k": self.config.top_k,
+            "top_p": self.config.top_p,
+        }
+
+    def get_inference_cache_key(
+        self,
+        lang: str,
+        tts_text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor
+    ) -> str:
+        request = {
+            "version": INFERENCE_CACHE_VERSION,
+            "speaker": hash_tensors(gpt_cond_latent, speaker_embedding),
+            "text": tts_text,
+            "language": lang,
+            "checkpoint_dir": os.path.abspath(self.checkpoint_dir),
+            "sampling_params": self.get_sampling_params(),
+        }
+
+        return hashlib.sha256(
+            json.dumps(request, sort_keys=True).encode()).hexdigest()
 
     def clear_gpu_cache(self):
         # clear the GPU cache
@@ -0,0 +1,137 @@
+from collections.abc import Mapping
+from typing import List
+import torch
+from constants.common import SPEAKER_METADATA_KEY
+
+INITIAL_CAPACITY = 64
+
+
+def read_speaker_embedding(speakers_file_data: Mapping, speaker_name: str) -> torch.Tensor:
+    # Lazy libraries keep embeddings apart from the shards holding the latents
+    if hasattr(speakers_file_data, "get_speaker_embedding"):
+        return speakers_file_data.get_speaker_embedding(speaker_name)
+
+    return speakers_file_data[speaker_name]["speaker_embedding"]
+
+
+class SpeakerEmbeddingIndex:
+    """
+    Every speaker embedding of a library stacked into one `[N, 512]` matrix,
+    with a name to row lookup, so bulk operations are single tensor ops.
+    Rows are kept dense: removing a speaker moves the last row into its slot.
+
+    Only embeddings are stacked, the gpt latents are 128KB a speaker and
+    nothing scans them. Building the index only reads embeddings, which
+    lazy libraries serve without loading a shard.
+    """
+    is_built = False
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.rows: dict[str, int] = {}
+        self.embeddings: torch.Tensor | None = None
+        self.embedding_shape: torch.Size | None = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, speaker_name: str):
+        return speaker_name in self.rows
+
+    def build(self, speakers_file_data: Mapping):
+        self.names = []
+        self.rows = {}
+        self.embeddings = None
+
+        for speaker_name in speakers_file_data.keys():
+            if speaker_name == SPEAKER_METADATA_KEY:
+                continue
+
+            self.add(speaker_name, read_speaker_embedding(
+                speakers_file_data, speaker_name))
+
+        self.is_built = True
+
+    def get_embedding_matrix(self) -> torch.Tensor:
+        """
+        The `[N, 512]` embedding rows, in the order of `names`.
+        """
+        if self.embeddings is None:
+            return torch.empty(0, 0)
+
+        return self.embeddings[:len(self.names)]
+
+    def get_row(self, speaker_name: str) -> int | None:
+        return self.rows.get(speaker_name)
+
+    def ensure_capacity(self, size: int):
+        capacity = 0 if self.embeddings is None else self.embeddings.shape[0]
+
+        if size <= capacity:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity * 2, size)
+
+        self.embeddings = self.grow(self.embeddings, new_capacity)
+
+    def grow(self, matrix: torch.Tensor, capacity: int) -> torch.Tensor:
+        grown = matrix.new_zeros((capacity, *matrix.shape[1:]))
+        grown[:len(self.names)] = matrix[:len(self.names)]
+
+        return grown
+
+    def add(self, speaker_name: str, speaker_embedding: torch.Tensor):
+        speaker_embedding = speaker_embedding.detach().cpu()
+
+        if self.embeddings is None:
+            self.embedding_shape = speaker_embedding.shape
+            self.embeddings = torch.zeros(
+                (INITIAL_CAPACITY, speaker_embedding.numel()), dtype=speaker_embedding.dtype)
+
+        row = self.rows.get(speaker_name)
+
+        if row is None:
+            row = len(self.names)
+            self.ensure_capacity(row + 1)
+            self.names.append(speaker_name)
+            self.rows[speaker_name] = row
+
+        self.embeddings[row] = speaker_embedding.reshape(-1)
+
+    def remove(self, speaker_name: str):
+        row = self.rows.pop(speaker_name, None)
+
+        if row is None:
+            return
+
+        last_row = len(self.names) - 1
+        last_name = self.names.pop()
+
+        if row != last_row:
+            self.names[row] = last_name
+            self.rows[last_name] = row
+            self.embeddings[row] = self.embeddings[last_row]
+
+    def rename(self, old_speaker_name: str, new_speaker_name: str):
+        if old_speaker_name == new_speaker_name or old_speaker_name not in self.rows:
+            return
+
+        # Renaming onto an existing speaker replaces it, which may move the old row
+        if new_speaker_name in self.rows:
+            self.remove(new_speaker_name)
+
+        row = self.rows.pop(old_speaker_name)
+        self.names[row] = new_speaker_name
+        self.rows[new_speaker_name] = row
+
+    def get_rows(self, speaker_names: List[str]) -> torch.Tensor:
+        return torch.tensor([self.rows[name] for name in speaker_names], dtype=torch.long)
+
+    def gather_embeddings(self, speaker_names: List[str]) -> torch.Tensor:
+        """
+        Returns the `[k, *embedding shape]` embeddings of `speaker_names`.
+        """
+        embeddings = self.embeddings.index_select(
+            0, self.get_rows(speaker_names))
+
+        return embeddings.reshape(len(speaker_names), *self.embedding_shape)
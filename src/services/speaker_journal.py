@@ -0,0 +1,149 @@
+import io
+import os
+import struct
+import zlib
+from typing import List, Tuple
+import torch
+from constants.common import SPEAKER_METADATA_KEY
+from types_module import SpeakerFileData
+
+JOURNAL_MAGIC = b"SFJ1"
+RECORD_HEADER = struct.Struct("<II")  # payload length, crc32
+
+# Operation types recorded in the journal
+OP_ADD = "add"
+OP_RENAME = "rename"
+OP_REMOVE = "remove"
+OP_METADATA = "metadata"
+
+
+def apply_speaker_operation(speakers_file_data: SpeakerFileData, operation: dict):
+    op = operation["op"]
+
+    if op == OP_ADD:
+        speakers_file_data[operation["speaker_name"]] = {
+            "gpt_cond_latent": operation["gpt_cond_latent"],
+            "speaker_embedding": operation["speaker_embedding"],
+        }
+    elif op == OP_RENAME:
+        if operation["old_speaker_name"] in speakers_file_data:
+            speakers_file_data[operation["new_speaker_name"]] = speakers_file_data.pop(
+                operation["old_speaker_name"])
+    elif op == OP_REMOVE:
+        speakers_file_data.pop(operation["speaker_name"], None)
+        speakers_file_data.get(SPEAKER_METADATA_KEY, {}).pop(
+            operation["speaker_name"], None)
+    elif op == OP_METADATA:
+        if SPEAKER_METADATA_KEY not in speakers_file_data:
+            speakers_file_data[SPEAKER_METADATA_KEY] = {}
+        speakers_file_data[SPEAKER_METADATA_KEY][operation["speaker_name"]
+                                                 ] = operation["metadata"]
+    else:
+        raise ValueError(f"Unknown speaker operation: {op}")
+
+
+def get_file_identity(file_path: str) -> list:
+    stat = os.stat(file_path)
+
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def encode_record(record: dict) -> bytes:
+    buffer = io.BytesIO()
+    torch.save(record, buffer)
+    payload = buffer.getvalue()
+
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class SpeakerJournal:
+    """
+    Append only log of speaker operations applied on top of a base speaker
+    file. The first record identifies the base file it belongs to, so a
+    journal left over from a different snapshot is never replayed.
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.journal_path)
+
+    def size(self) -> int:
+        return os.path.getsize(self.journal_path) if self.exists() else 0
+
+    def append(self, operations: List[dict], base_identity: list):
+        if len(operations) == 0:
+            return
+
+        is_new = self.size() == 0
+
+        with open(self.journal_path, "ab") as f:
+            if is_new:
+                f.write(JOURNAL_MAGIC)
+                f.write(encode_record({"base": base_identity}))
+
+            for operation in operations:
+                f.write(encode_record(operation))
+
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self, base_identity: list, end_offset: int | None = None) -> Tuple[List[dict], int]:
+        """
+        Returns the operations recorded for `base_identity` and the offset
+        just past the last complete record. A torn or corrupt tail, left by
+        a crash mid append, ends the replay.
+        """
+        if not self.exists():
+            return [], 0
+
+        with open(self.journal_path, "rb") as f:
+            data = f.read() if end_offset is None else f.read(end_offset)
+
+        if not data.startswith(JOURNAL_MAGIC):
+            print("Speaker journal is invalid, ignoring it")
+            return [], 0
+
+        records = []
+        offset = len(JOURNAL_MAGIC)
+
+        while offset + RECORD_HEADER.size <= len(data):
+            length, crc = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                print("Speaker journal has a torn record, replaying up to it")
+                break
+
+            # Records only hold tensors and plain containers, never unpickle anything else
+            records.append(torch.load(io.BytesIO(payload), weights_only=True))
+            offset = start + length
+
+        if len(records) == 0 or records[0].get("base") != base_identity:
+            print("Speaker journal belongs to a different speaker file, ignoring it")
+            return [], 0
+
+        return records[1:], offset
+
+    def read_tail(self, start_offset: int) -> bytes:
+        with open(self.journal_path, "rb") as f:
+            f.seek(start_offset)
+            return f.read()
+
+    def rewrite(self, base_identity: list, tail: bytes):
+        """
+        Atomically replaces the journal with a fresh one for `base_identity`,
+        followed by the raw `tail` records.
+        """
+        temp_path = f"{self.journal_path}.tmp"
+
+        with open(temp_path, "wb") as f:
+            f.write(JOURNAL_MAGIC)
+            f.write(encode_record({"base": base_identity}))
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.journal_path)
@@ -1,47 +1,355 @@
+import functools
 import os
 import pathlib
+import threading
 import time
 from typing import Dict
 import torch
-from constants.common import SPEAKER_METADATA_KEY
-from types_module import SpeakerData, SpeakerEmbeddingList, SpeakerFileData, SpeakerMetadata, SpeakerWeightsList
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from constants.common import SORT_BY_NAME, SORT_BY_NAME_DESC, SPEAKER_METADATA_KEY
+from services.speaker_embedding_index import SpeakerEmbeddingIndex
+from services.speaker_metadata_index import SpeakerFilter, SpeakerMetadataIndex
+from services.speaker_search_index import SpeakerSearchIndex
+from services.speaker_similarity_index import SimilarSpeakerList, SpeakerSimilarityIndex
+from services.speaker_journal import OP_ADD, OP_METADATA, OP_REMOVE, OP_RENAME
+from services.speaker_storage import SPEAKER_FILE_FORMATS, SpeakerStorage, get_speaker_storage
+from types_module import ReferenceStats, SpeakerData, SpeakerEmbeddingList, SpeakerFileData, SpeakerMetadata, SpeakerWeightsList
+from utils.disk_cache import hash_file
 from utils.utils import is_valid_file
-from utils.embedding_utils import CombineMethod, average_latents_and_embeddings
+from utils.embedding_utils import CombineMethod, average_stacked_latents_and_embeddings, fold_speaker_latents
+
+
+def synchronized(method):
+    """
+    Runs a service method holding the service lock. Gradio runs events
+    concurrently, and the speaker data and its indexes are not safe to read
+    while another thread edits them.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class SpeakerFileChangeHandler(FileSystemEventHandler):
+    def __init__(self, speaker_service: "SpeakerManagerService"):
+        super().__init__()
+        self.speaker_service = speaker_service
+
+    def on_any_event(self, event: FileSystemEvent):
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        watch_paths = self.speaker_service.storage.get_watch_paths()
+
+        if any(os.path.abspath(path) in watch_paths for path in paths if path):
+            self.speaker_service.is_file_dirty = True
 
 
 class SpeakerManagerService:
     speakers_file_data: SpeakerFileData = None
     speakers_file: str = None
-
-    def set_speaker_file(self, speakers_file: str):
+    storage: SpeakerStorage = None
+    # (device, inode, size, mtime) of the speaker file when it was last loaded or saved
+    file_signature: tuple | None = None
+    # Content hash matching `file_signature`, None when not computed
+    file_hash: str | None = None
+    is_file_dirty: bool = True
+    file_observer = None
+    # Edits made since the last save, persisted incrementally by the storage
+    pending_operations: list[dict] = None
+    # Stacked embeddings of every speaker, built on first use
+    embedding_index: SpeakerEmbeddingIndex = None
+    # Nearest neighbour search over the embeddings, built on first use
+    similarity_index: SpeakerSimilarityIndex | None = None
+    # Metadata value bitmaps for filtering, built on first use
+    metadata_index: SpeakerMetadataIndex | None = None
+    # Full text index over names and descriptions, built on first use
+    search_index: SpeakerSearchIndex | None = None
+    # Sorted speaker names, cleared whenever a speaker is added, renamed or removed
+    sorted_speaker_names: list[str] | None = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+
+    @synchronized
+    def set_speaker_file(self, speakers_file: str, is_trusted: bool = True, use_journal: bool = False):
+        """
+        Pass `is_trusted=False` for files from outside, e.g. uploads, so they
+        are never fully unpickled. Pass `use_journal` only for a private
+        working copy, saves then append to a journal instead of rewriting
+        the file, so other readers of the file wouldn't see them.
+        """
         if not is_valid_file(speakers_file):
             raise FileExistsError("Speaker file does not exist")
 
-        self.speakers_file = speakers_file
-        self.speakers_file_data = self.load_speaker_file_data()
-        self.speakers_file_data = self.update_speaker_file_data_format()
+        self.speakers_file = os.path.abspath(speakers_file)
+        self.storage = get_speaker_storage(
+            self.speakers_file, is_trusted, use_journal)
+        self.storage.on_write = self.record_own_write
+        self.load_speakers()
 
         return self.speakers_file
 
+    @synchronized
+    def load_speakers(self):
+        self.is_file_dirty = False
+        self.file_signature = self.get_file_signature()
+        self.file_hash = None
+        self.pending_operations = []
+        self.embedding_index = SpeakerEmbeddingIndex()
+        self.similarity_index = None
+        self.metadata_index = None
+        self.search_index = None
+        self.sorted_speaker_names = None
+        self.speakers_file_data = self.load_speaker_file_data()
+
+        # Sharded libraries are always written in the current format
+        if not self.storage.is_lazy:
+            self.speakers_file_data = self.update_speaker_file_data_format()
+
+    def watch_speaker_file(self):
+        """
+        Watches the speaker file's directory so `reload_if_changed` only has
+        to look at the file after something actually touched it.
+        """
+        self.stop_watching_speaker_file()
+
+        self.file_observer = Observer()
+        self.file_observer.daemon = True
+        self.file_observer.schedule(
+            SpeakerFileChangeHandler(self),
+            path=os.path.dirname(self.storage.get_watch_paths()[0]),
+            recursive=False
+        )
+        self.file_observer.start()
+
+    def stop_watching_speaker_file(self):
+        if self.file_observer is not None:
+            self.file_observer.stop()
+            self.file_observer = None
+
+    def get_file_signature(self) -> tuple | None:
+        if self.storage is None:
+            return None
+
+        signature = []
+
+        for watch_path in self.storage.get_watch_paths():
+            if os.path.exists(watch_path):
+                stat = os.stat(watch_path)
+                signature.append(
+                    (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            else:
+                signature.append(None)
+
+        return tuple(signature)
+
+    def get_file_hash(self) -> str:
+        return "".join(
+            hash_file(watch_path) for watch_path in self.storage.get_watch_paths() if os.path.exists(watch_path)
+        )
+
+    def record_own_write(self):
+        self.file_signature = self.get_file_signature()
+        self.file_hash = None
+
+    def has_file_changed(self) -> bool:
+        if self.file_observer is not None and not self.is_file_dirty:
+            return False
+
+        self.is_file_dirty = False
+        signature = self.get_file_signature()
+
+        if signature == self.file_signature:
+            return False
+
+        # The file was touched, only treat it as changed if the content differs
+        if self.file_hash is not None and signature is not None and self.get_file_hash() == self.file_hash:
+            self.file_signature = signature
+            return False
+
+        return True
+
+    @synchronized
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the speaker file only when it changed on disk since it was
+        last loaded or saved by this service.
+        """
+        if self.speakers_file is None or not self.has_file_changed():
+            return False
+
+        print("Speaker file changed on disk, reloading")
+        self.load_speakers()
+        self.file_hash = self.get_file_hash()
+
+        return True
+
     def get_speaker_file(self):
         return self.speakers_file
 
+    @synchronized
     def get_speaker_names(self):
         if self.speakers_file_data is None:
             return []
 
-        names = list(self.speakers_file_data.keys())
-        names = list(filter(lambda name: name != SPEAKER_METADATA_KEY, names))
+        if self.sorted_speaker_names is None:
+            names = list(self.speakers_file_data.keys())
+            names = list(
+                filter(lambda name: name != SPEAKER_METADATA_KEY, names))
+            names.sort()
+            self.sorted_speaker_names = names
+
+        return list(self.sorted_speaker_names)
+
+    @synchronized
+    def count_speakers(self) -> int:
+        if self.speakers_file_data is None:
+            return 0
+
+        return len(self.speakers_file_data) - (SPEAKER_METADATA_KEY in self.speakers_file_data)
+
+    @synchronized
+    def list_speakers(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        speaker_filter: SpeakerFilter | None = None,
+        sort: str = SORT_BY_NAME
+    ) -> tuple[list[str], int]:
+        """
+        Returns one page of speaker names, sorted by `sort`, and the total
+        number of speakers matching `speaker_filter`.
+        """
+        if self.speakers_file_data is None:
+            return [], 0
+
+        if speaker_filter:
+            names = self.filter_speakers(speaker_filter)
+        else:
+            if self.sorted_speaker_names is None:
+                self.get_speaker_names()
+            names = self.sorted_speaker_names
+
+        if sort == SORT_BY_NAME_DESC:
+            names = names[::-1]
+        elif sort != SORT_BY_NAME:
+            raise ValueError(f"Unknown speaker sort: {sort}")
+
+        return names[offset:offset + limit], len(names)
+
+    @synchronized
+    def get_embedding_index(self) -> SpeakerEmbeddingIndex:
+        """
+        Returns the stacked embedding index, building it on first use. Edits
+        made through the service keep it up to date afterwards.
+        """
+        if not self.embedding_index.is_built:
+            self.embedding_index.build(self.speakers_file_data)
+
+        return self.embedding_index
+
+    @synchronized
+    def get_similarity_index(self) -> SpeakerSimilarityIndex:
+        if self.similarity_index is None:
+            embedding_index = self.get_embedding_index()
+            self.similarity_index = SpeakerSimilarityIndex()
+            self.similarity_index.build(
+                embedding_index.names, embedding_index.get_embedding_matrix())
+
+        return self.similarity_index
+
+    @synchronized
+    def find_similar_speakers(self, speaker_name: str, top_k: int = 10) -> SimilarSpeakerList:
+        """
+        Returns the `top_k` speakers closest to `speaker_name` with their
+        cosine similarity, most similar first.
+        """
+        speaker_data = self.get_speaker_data(speaker_name)
+
+        if speaker_data is None:
+            return []
+
+        return self.get_similarity_index().search(
+            speaker_data["speaker_embedding"], top_k, exclude=[speaker_name])
+
+    @synchronized
+    def find_speakers_by_embedding(self, speaker_embedding: torch.Tensor, top_k: int = 10) -> SimilarSpeakerList:
+        return self.get_similarity_index().search(speaker_embedding, top_k)
+
+    @synchronized
+    def get_metadata_index(self) -> SpeakerMetadataIndex:
+        if self.metadata_index is None:
+            self.metadata_index = SpeakerMetadataIndex()
+            self.metadata_index.build(
+                self.get_speaker_names(), self.get_metadata())
+
+        return self.metadata_index
+
+    @synchronized
+    def filter_speakers(self, speaker_filter: SpeakerFilter | None) -> list[str]:
+        """
+        Returns the sorted names of the speakers matching `speaker_filter`,
+        any of the values within a field and every field.
+        """
+        metadata_index = self.get_metadata_index()
+        names = metadata_index.get_names(metadata_index.filter(speaker_filter))
         names.sort()
 
         return names
 
+    @synchronized
+    def get_search_index(self) -> SpeakerSearchIndex:
+        if self.search_index is None:
+            metadata = self.get_metadata()
+            self.search_index = SpeakerSearchIndex()
+            self.search_index.build({
+                speaker_name: self.get_speaker_description(speaker_name, metadata) for speaker_name in self.get_speaker_names()
+            })
+
+        return self.search_index
+
+    def get_speaker_description(self, speaker_name: str, metadata: Dict[str, SpeakerMetadata] | None = None) -> str | None:
+        speaker_metadata = (metadata if metadata is not None else self.get_metadata()).get(speaker_name)
+
+        return speaker_metadata.get("description") if speaker_metadata else None
+
+    @synchronized
+    def search_speakers(self, query: str, limit: int = 50, speaker_filter: SpeakerFilter | None = None) -> list[str]:
+        """
+        Returns the names of up to `limit` speakers whose name or description
+        match `query`, best match first. Typos and partial words match too.
+        """
+        if speaker_filter:
+            metadata_index = self.get_metadata_index()
+            filter_bits = metadata_index.filter(speaker_filter)
+            # Search past the limit, the filter may reject some of the matches
+            num_results = limit * 4
+
+            while True:
+                results = self.get_search_index().search(query, num_results)
+                speaker_names = [
+                    speaker_name for speaker_name, _ in results if metadata_index.contains(filter_bits, speaker_name)
+                ]
+
+                # Fewer results than asked for means every match was searched
+                if len(speaker_names) >= limit or len(results) < num_results:
+                    return speaker_names[:limit]
+
+                num_results *= 4
+
+        return [speaker_name for speaker_name, _ in self.get_search_index().search(query, limit)]
+
+    @synchronized
     def get_speaker_data(self, speaker_name):
         if speaker_name in self.speakers_file_data:
             return self.speakers_file_data[speaker_name]
 
         return None
 
+    @synchronized
     def add_speaker(
         self,
         speaker_name: str,
@@ -54,16 +362,61 @@ class SpeakerManagerService:
             "speaker_embedding": speaker_embedding,
         }
 
+        if self.embedding_index.is_built:
+            self.embedding_index.add(speaker_name, speaker_embedding)
+
+        if self.similarity_index is not None:
+            self.similarity_index.add(speaker_name, speaker_embedding)
+
+        self.sorted_speaker_names = None
+
+        if self.metadata_index is not None:
+            self.metadata_index.add_speaker(speaker_name)
+
+        if self.search_index is not None:
+            self.search_index.add(
+                speaker_name, self.get_speaker_description(speaker_name))
+
+        self.record_operation({
+            "op": OP_ADD,
+            "speaker_name": speaker_name,
+            "gpt_cond_latent": self.tensor_to_cpu(gpt_cond_latent),
+            "speaker_embedding": self.tensor_to_cpu(speaker_embedding),
+        })
+
         if metadata is not None:
             self.set_speaker_metadata(speaker_name, metadata)
 
+    @synchronized
     def update_speaker_name(self, old_speaker_name: str, new_speaker_name: str):
         if old_speaker_name in self.speakers_file_data:
             self.speakers_file_data[new_speaker_name] = self.speakers_file_data.pop(
                 old_speaker_name)
+            self.embedding_index.rename(old_speaker_name, new_speaker_name)
+            self.sorted_speaker_names = None
+
+            if self.similarity_index is not None:
+                self.similarity_index.rename(
+                    old_speaker_name, new_speaker_name)
+
+            if self.metadata_index is not None:
+                self.metadata_index.rename_speaker(
+                    old_speaker_name, new_speaker_name)
+
+            if self.search_index is not None:
+                self.search_index.remove(old_speaker_name)
+                self.search_index.add(
+                    new_speaker_name, self.get_speaker_description(new_speaker_name))
+
+            self.record_operation({
+                "op": OP_RENAME,
+                "old_speaker_name": old_speaker_name,
+                "new_speaker_name": new_speaker_name,
+            })
         else:
             print(f"Speaker {old_speaker_name} does not exist")
 
+    @synchronized
     def update_speaker_meta(self, speaker_name: str, speaker_metadata: SpeakerMetadata = None):
         if speaker_name in self.speakers_file_data:
             if speaker_metadata is not None:
@@ -75,6 +428,14 @@ class SpeakerManagerService:
                 new_speaker_name = str(new_speaker_name).strip()
 
                 if new_speaker_name != "":
+                    # The edit form doesn't carry the reference stats, keep them
+                    reference_stats = (self.get_speaker_metadata(
+                        speaker_name) or {}).get("reference_stats")
+
+                    if reference_stats is not None and "reference_stats" not in speaker_metadata:
+                        speaker_metadata = {
+                            **speaker_metadata, "reference_stats": reference_stats}
+
                     self.set_speaker_metadata(
                         new_speaker_name, speaker_metadata)
 
@@ -83,56 +444,145 @@ class SpeakerManagerService:
         else:
             print(f"Speaker {speaker_name} does not exist")
 
+    @synchronized
     def get_speaker_metadata(self, speaker_name: str) -> SpeakerMetadata | None:
         if speaker_name in self.get_metadata():
             return self.get_metadata().get(speaker_name)
 
         return None
 
+    @synchronized
     def set_speaker_metadata(self, speaker_name: str, metadata: SpeakerMetadata):
         self.speakers_file_data.setdefault(SPEAKER_METADATA_KEY, {})[
             speaker_name] = metadata
 
+        if self.metadata_index is not None:
+            self.metadata_index.set_speaker_metadata(speaker_name, metadata)
+
+        if self.search_index is not None and speaker_name in self.speakers_file_data:
+            self.search_index.add(speaker_name, (metadata or {}).get("description"))
+
+        self.record_operation({
+            "op": OP_METADATA,
+            "speaker_name": speaker_name,
+            "metadata": metadata,
+        })
+
+    @synchronized
+    def set_reference_stats(self, speaker_name: str, reference_stats: ReferenceStats):
+        """
+        Records the clip and chunk counts a speaker was extracted from, kept
+        along the rest of its metadata.
+        """
+        metadata = dict(self.get_speaker_metadata(speaker_name) or {})
+        metadata["reference_stats"] = reference_stats
+
+        self.set_speaker_metadata(speaker_name, metadata)
+
+    @synchronized
+    def refine_speaker(
+        self,
+        speaker_name: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        reference_stats: ReferenceStats,
+        default_reference_stats: ReferenceStats
+    ) -> ReferenceStats | None:
+        """
+        Folds the latents of new reference clips into an existing speaker as
+        a running weighted average, using the stats kept in its metadata.
+        Speakers without stats, e.g. mixed or imported ones, count as
+        `default_reference_stats`. Returns the updated stats.
+        """
+        speaker_data = self.get_speaker_data(speaker_name)
+
+        if speaker_data is None:
+            print(f"Speaker {speaker_name} does not exist")
+            return None
+
+        current_stats = (self.get_speaker_metadata(speaker_name) or {}).get(
+            "reference_stats") or default_reference_stats
+
+        gpt_cond_latent, speaker_embedding, new_stats = fold_speaker_latents(
+            speaker_data["gpt_cond_latent"],
+            speaker_data["speaker_embedding"],
+            current_stats,
+            gpt_cond_latent,
+            speaker_embedding,
+            reference_stats
+        )
+
+        self.add_speaker(speaker_name, gpt_cond_latent, speaker_embedding)
+        self.set_reference_stats(speaker_name, new_stats)
+
+        return new_stats
+
     def get_metadata(self) -> Dict[str, SpeakerMetadata]:
         return self.speakers_file_data.get(SPEAKER_METADATA_KEY, {})
 
+    @synchronized
     def remove_speaker(self, speaker_name: str):
         if speaker_name in self.speakers_file_data:
             del self.speakers_file_data[speaker_name]
+            self.embedding_index.remove(speaker_name)
+            self.sorted_speaker_names = None
+
+            if self.similarity_index is not None:
+                self.similarity_index.remove(speaker_name)
+
+            if self.metadata_index is not None:
+                self.metadata_index.remove_speaker(speaker_name)
+
+            if self.search_index is not None:
+                self.search_index.remove(speaker_name)
         else:
             print(f"Speaker {speaker_name} does not exist")
 
         if speaker_name in self.get_metadata():
             del self.speakers_file_data[SPEAKER_METADATA_KEY][speaker_name]
 
+        self.record_operation({
+            "op": OP_REMOVE,
+            "speaker_name": speaker_name,
+        })
+
+    def record_operation(self, operation: dict):
+        if self.pending_operations is not None:
+            self.pending_operations.append(operation)
+
+    @synchronized
     def save_speaker_file(self, output_path: str | None = None):
         if output_path is not None:
-            torch.save(self.speakers_file_data, output_path)
+            get_speaker_storage(output_path).save(self.speakers_file_data)
         else:
-            torch.save(self.speakers_file_data, self.speakers_file)
+            self.storage.commit(self.speakers_file_data,
+                                self.pending_operations)
+            self.pending_operations = []
+            # Our own write, no need to reload it
+            self.record_own_write()
 
+    @synchronized
     def create_speaker_embedding_from_mix(self, speaker_weights: SpeakerWeightsList, combine_method: CombineMethod = CombineMethod.MEAN) -> SpeakerData:
-        latent_embedding_pairs = []
-        weights = []
-
-        # print("create_speaker_embedding_from_mix:", self.speaker_weights)
-
         # Map speaker weights for easy lookup
         speaker_weight_map = {
-            sw['speaker']: sw['weight'] for sw in speaker_weights
+            sw['speaker']: sw['weight'] for sw in speaker_weights if self.get_speaker_data(sw['speaker']) is not None
         }
+        speaker_names = list(speaker_weight_map.keys())
+
+        if len(speaker_names) == 0:
+            raise ValueError("None of the mixed speakers are in the speaker file")
 
-        for speaker, embedding_data in self.speakers_file_data.items():
-            if speaker in speaker_weight_map:
-                # Append the (latents, embeddings) tuple
-                latent_embedding_pairs.append(
-                    (embedding_data['gpt_cond_latent'], embedding_data['speaker_embedding']))
-                # Append the corresponding weight
-                weights.append(speaker_weight_map[speaker])
+        # Only the selected speakers are looked up, mixing never loads the rest of the library
+        gpt_cond_latents = torch.stack([
+            self.speakers_file_data[name]["gpt_cond_latent"].detach().cpu() for name in speaker_names
+        ])
+        speaker_embeddings = torch.stack([
+            self.speakers_file_data[name]["speaker_embedding"].detach().cpu() for name in speaker_names
+        ])
+        weights = list(speaker_weight_map.values())
 
-        # Adjustments may be needed if the function's logic for handling weights is different from expected
-        avg_gpt_cond_latents, avg_speaker_embedding = average_latents_and_embeddings(
-            latent_embedding_pairs, combine_method, speaker_weights=weights)
+        avg_gpt_cond_latents, avg_speaker_embedding = average_stacked_latents_and_embeddings(
+            gpt_cond_latents, speaker_embeddings, combine_method, speaker_weights=weights)
 
         return {
             "gpt_cond_latent": avg_gpt_cond_latents,
@@ -141,7 +591,7 @@ class SpeakerManagerService:
 
     def load_speaker_file_data(self) -> SpeakerFileData:
         if self.speakers_file and os.path.exists(self.speakers_file):
-            return torch.load(self.speakers_file)
+            return self.storage.load()
         else:
             print("Speaker file does not exist")
             raise FileExistsError("Speaker file does not exist")
@@ -169,7 +619,8 @@ class SpeakerManagerService:
             raise FileExistsError("Speaker file does not exist")
 
         try:
-            speaker_data = torch.load(file_path)
+            speaker_data = get_speaker_storage(
+                file_path, is_trusted=False).load()
             if type(speaker_data) == dict:
                 return speaker_data
             else:
@@ -185,7 +636,8 @@ class SpeakerManagerService:
 
         return speaker_embedding
 
-    def create_speaker_file_from_selected_speakers(self, selected_speakers: list[str]):
+    @synchronized
+    def create_speaker_file_from_selected_speakers(self, selected_speakers: list[str], file_format: str = "pth"):
         news_speaker_file_data: SpeakerFileData = {
             SPEAKER_METADATA_KEY: {}
         }
@@ -219,11 +671,11 @@ class SpeakerManagerService:
         speaker_file_dir = pathlib.Path(self.speakers_file).parent.resolve()
 
         out_path = os.path.join(
-            speaker_file_dir, 'speaker_forge', f"speakers_xtts_sf_{str(time_seconds)}.pth")
+            speaker_file_dir, 'speaker_forge', f"speakers_xtts_sf_{str(time_seconds)}{SPEAKER_FILE_FORMATS[file_format]}")
 
         if not os.path.exists(os.path.dirname(out_path)):
             os.makedirs(os.path.dirname(out_path), exist_ok=True)
 
-        torch.save(news_speaker_file_data, out_path)
+        get_speaker_storage(out_path).save(news_speaker_file_data)
 
         return out_path
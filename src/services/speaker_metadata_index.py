@@ -0,0 +1,159 @@
+from typing import Dict, List
+from constants.common import METADATA_FILTER_FIELDS
+from types_module import SpeakerMetadata
+
+# {field: [values]}, values OR'd within a field and fields AND'd together
+SpeakerFilter = Dict[str, List[str]]
+
+
+def get_metadata_values(metadata: SpeakerMetadata | None, field: str) -> List[str]:
+    value = (metadata or {}).get(field)
+
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [value]
+
+    return [item for item in value if item is not None and item != ""]
+
+
+class SpeakerMetadataIndex:
+    """
+    Inverted index from metadata field values to the speakers having them.
+    Every speaker owns a bit slot, and each (field, value) keeps a Python int
+    bitmap of its speakers, so filters are a handful of big int AND/ORs.
+    """
+
+    def __init__(self, fields: List[str] = METADATA_FILTER_FIELDS):
+        self.fields = fields
+        self.slots: dict[str, int] = {}
+        self.slot_names: List[str | None] = []
+        self.free_slots: List[int] = []
+        self.all_bits = 0
+        self.bitmaps: dict[str, dict[str, int]] = {
+            field: {} for field in fields}
+        # (field, value) pairs set for each slot, to clear them on update
+        self.slot_values: dict[int, list[tuple[str, str]]] = {}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def build(self, speaker_names: List[str], metadata: Dict[str, SpeakerMetadata]):
+        self.__init__(self.fields)
+
+        for speaker_name in speaker_names:
+            self.set_speaker_metadata(speaker_name, metadata.get(speaker_name))
+
+    def add_speaker(self, speaker_name: str) -> int:
+        slot = self.slots.get(speaker_name)
+
+        if slot is not None:
+            return slot
+
+        if len(self.free_slots) > 0:
+            slot = self.free_slots.pop()
+            self.slot_names[slot] = speaker_name
+        else:
+            slot = len(self.slot_names)
+            self.slot_names.append(speaker_name)
+
+        self.slots[speaker_name] = slot
+        self.all_bits |= 1 << slot
+
+        return slot
+
+    def clear_slot_values(self, slot: int):
+        mask = ~(1 << slot)
+
+        for field, value in self.slot_values.pop(slot, []):
+            bitmap = self.bitmaps[field][value] & mask
+
+            if bitmap == 0:
+                del self.bitmaps[field][value]
+            else:
+                self.bitmaps[field][value] = bitmap
+
+    def set_speaker_metadata(self, speaker_name: str, metadata: SpeakerMetadata | None):
+        slot = self.add_speaker(speaker_name)
+        self.clear_slot_values(slot)
+
+        bit = 1 << slot
+        values = []
+
+        for field in self.fields:
+            for value in get_metadata_values(metadata, field):
+                field_bitmaps = self.bitmaps[field]
+                field_bitmaps[value] = field_bitmaps.get(value, 0) | bit
+                values.append((field, value))
+
+        self.slot_values[slot] = values
+
+    def remove_speaker(self, speaker_name: str):
+        slot = self.slots.pop(speaker_name, None)
+
+        if slot is None:
+            return
+
+        self.clear_slot_values(slot)
+        self.all_bits &= ~(1 << slot)
+        self.slot_names[slot] = None
+        self.free_slots.append(slot)
+
+    def rename_speaker(self, old_speaker_name: str, new_speaker_name: str):
+        if old_speaker_name == new_speaker_name or old_speaker_name not in self.slots:
+            return
+
+        # The new name may already carry its metadata, keep that one
+        if new_speaker_name in self.slots:
+            self.remove_speaker(old_speaker_name)
+            return
+
+        slot = self.slots.pop(old_speaker_name)
+        self.slots[new_speaker_name] = slot
+        self.slot_names[slot] = new_speaker_name
+
+    def filter(self, speaker_filter: SpeakerFilter | None) -> int:
+        """
+        Returns the bitmap of speakers matching any of the values of every
+        field in `speaker_filter`. Fields without values don't filter.
+        """
+        result = self.all_bits
+
+        for field, values in (speaker_filter or {}).items():
+            if not values or field not in self.bitmaps:
+                continue
+
+            field_bits = 0
+
+            for value in values:
+                field_bits |= self.bitmaps[field].get(value, 0)
+
+            result &= field_bits
+
+            if result == 0:
+                break
+
+        return result
+
+    def contains(self, bitmap: int, speaker_name: str) -> bool:
+        slot = self.slots.get(speaker_name)
+
+        return slot is not None and (bitmap >> slot) & 1 == 1
+
+    def get_names(self, bitmap: int) -> List[str]:
+        names = []
+        # Scan the bits as a string, shifting a big int per bit is quadratic
+        bits = bin(bitmap)[:1:-1]
+        slot = bits.find("1")
+
+        while slot != -1:
+            names.append(self.slot_names[slot])
+            slot = bits.find("1", slot + 1)
+
+        return names
+
+    def get_values(self, field: str) -> List[str]:
+        """
+        The values of `field` used by at least one speaker.
+        """
+        return sorted(self.bitmaps.get(field, {}).keys())
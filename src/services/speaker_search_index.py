@@ -0,0 +1,278 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Name terms count this many times over description terms
+NAME_BOOST = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Score multipliers for terms matched by prefix or by a typo
+PREFIX_MATCH_WEIGHT = 0.8
+FUZZY_MATCH_WEIGHT = 0.6
+# Bounds the work for very short prefixes like a single letter
+MAX_PREFIX_TERMS = 64
+# Shorter terms only match exactly or by prefix, a typo changes them too much
+MIN_FUZZY_TERM_LENGTH = 4
+# Terms with more postings than this only re-score speakers matched by rarer
+# terms, so a common word doesn't make a query scan the whole library. A
+# query of only common words scores its rarest term in full and keeps this
+# many of its best matches as the candidates
+MAX_SCORED_POSTINGS = 2000
+
+
+def tokenize(text: str | None) -> List[str]:
+    if not text:
+        return []
+
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def get_deletes(term: str) -> List[str]:
+    return [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+class TermTrie:
+    """
+    Prefix tree of the indexed terms, for typeahead completion.
+    """
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def add(self, term: str):
+        node = self.root
+
+        for char in term:
+            node = node.setdefault(char, {})
+
+        node[""] = True
+
+    def remove(self, term: str):
+        path = []
+        node = self.root
+
+        for char in term:
+            if char not in node:
+                return
+            path.append((node, char))
+            node = node[char]
+
+        node.pop("", None)
+
+        # Prune the branches left empty
+        for parent, char in reversed(path):
+            if len(parent[char]) > 0:
+                break
+            del parent[char]
+
+    def complete(self, prefix: str, limit: int = MAX_PREFIX_TERMS) -> List[str]:
+        """
+        Returns up to `limit` terms starting with `prefix`, shortest first.
+        """
+        node = self.root
+
+        for char in prefix:
+            if char not in node:
+                return []
+            node = node[char]
+
+        terms = []
+        level = [(prefix, node)]
+
+        while len(level) > 0 and len(terms) < limit:
+            next_level = []
+
+            for text, current in level:
+                if "" in current:
+                    terms.append(text)
+                    if len(terms) >= limit:
+                        break
+                for char, child in current.items():
+                    if char != "":
+                        next_level.append((text + char, child))
+
+            level = next_level
+
+        return terms
+
+
+class SpeakerSearchIndex:
+    """
+    BM25 ranked full text search over speaker names and descriptions. The
+    last query term completes as a prefix for typeahead, and terms not in
+    the index match indexed terms one edit away, found through a map of
+    single char deletes.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self.trie = TermTrie()
+        self.deletes: Dict[str, set] = {}
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def build(self, documents: Dict[str, str | None]):
+        """
+        Indexes `{speaker name: description}`.
+        """
+        self.__init__()
+
+        for speaker_name, description in documents.items():
+            self.add(speaker_name, description)
+
+    def add(self, speaker_name: str, description: str | None = None):
+        self.remove(speaker_name)
+
+        terms = Counter(tokenize(speaker_name) * NAME_BOOST)
+        terms.update(tokenize(description))
+
+        self.doc_terms[speaker_name] = terms
+        self.doc_lengths[speaker_name] = sum(terms.values())
+        self.total_length += self.doc_lengths[speaker_name]
+
+        for term, count in terms.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self.add_term(term)
+            self.postings[term][speaker_name] = count
+
+    def remove(self, speaker_name: str):
+        terms = self.doc_terms.pop(speaker_name, None)
+
+        if terms is None:
+            return
+
+        self.total_length -= self.doc_lengths.pop(speaker_name)
+
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(speaker_name, None)
+
+            if len(postings) == 0:
+                del self.postings[term]
+                self.remove_term(term)
+
+    def add_term(self, term: str):
+        self.trie.add(term)
+
+        if len(term) >= MIN_FUZZY_TERM_LENGTH:
+            for delete in get_deletes(term):
+                self.deletes.setdefault(delete, set()).add(term)
+
+    def remove_term(self, term: str):
+        self.trie.remove(term)
+
+        if len(term) >= MIN_FUZZY_TERM_LENGTH:
+            for delete in get_deletes(term):
+                terms = self.deletes.get(delete)
+                if terms is not None:
+                    terms.discard(term)
+                    if len(terms) == 0:
+                        del self.deletes[delete]
+
+    def get_fuzzy_terms(self, term: str) -> List[str]:
+        """
+        Indexed terms one insert, delete, substitution or swap away.
+        """
+        if len(term) < MIN_FUZZY_TERM_LENGTH:
+            return []
+
+        candidates = set(self.deletes.get(term, set()))
+
+        for delete in get_deletes(term):
+            if delete in self.postings:
+                candidates.add(delete)
+            candidates.update(self.deletes.get(delete, set()))
+
+        candidates.discard(term)
+
+        return list(candidates)
+
+    def expand_term(self, term: str, is_prefix: bool) -> List[Tuple[str, float]]:
+        expansions = []
+
+        if term in self.postings:
+            expansions.append((term, 1.0))
+
+        if is_prefix:
+            expansions.extend((completion, PREFIX_MATCH_WEIGHT)
+                              for completion in self.trie.complete(term) if completion != term)
+
+        if len(expansions) == 0:
+            expansions.extend((fuzzy_term, FUZZY_MATCH_WEIGHT)
+                              for fuzzy_term in self.get_fuzzy_terms(term))
+
+        return expansions
+
+    def search(self, query: str, limit: int = 50) -> List[Tuple[str, float]]:
+        """
+        Returns up to `limit` (speaker name, score) pairs, best match first.
+        """
+        query_terms = tokenize(query)
+
+        if len(query_terms) == 0 or len(self.doc_terms) == 0:
+            return []
+
+        num_docs = len(self.doc_terms)
+        average_length = self.total_length / num_docs
+        scores: Dict[str, float] = {}
+
+        expanded_terms = [
+            self.expand_term(query_term, is_prefix=index == len(query_terms) - 1) for index, query_term in enumerate(query_terms)
+        ]
+        # Rarest query terms first, they pick the candidates the common ones re-score
+        expanded_terms.sort(key=lambda expansions: sum(
+            len(self.postings[term]) for term, _ in expansions))
+
+        num_candidates = max(limit, MAX_SCORED_POSTINGS)
+
+        for expansions in expanded_terms:
+            term_scores: Dict[str, float] = {}
+            is_full_scan = False
+
+            # Rarest expansions first, like the query terms
+            for term, weight in sorted(expansions, key=lambda expansion: len(self.postings[expansion[0]])):
+                postings = self.postings[term]
+                idf = math.log(1 + (num_docs - len(postings) +
+                               0.5) / (len(postings) + 0.5))
+
+                if len(postings) <= MAX_SCORED_POSTINGS:
+                    matches = postings.items()
+                elif len(scores) > 0:
+                    matches = [(speaker_name, postings[speaker_name])
+                               for speaker_name in scores if speaker_name in postings]
+                elif not is_full_scan:
+                    # No rarer term picked candidates, rank every posting
+                    # rather than scoring an arbitrary first few
+                    matches = postings.items()
+                    is_full_scan = True
+                else:
+                    # Only the rarest common expansion is ranked in full,
+                    # the others re-score the candidates it kept
+                    matches = [(speaker_name, postings[speaker_name])
+                               for speaker_name in term_scores if speaker_name in postings]
+
+                for speaker_name, frequency in matches:
+                    length_norm = 1 - BM25_B + BM25_B * \
+                        self.doc_lengths[speaker_name] / average_length
+                    score = weight * idf * frequency * \
+                        (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                    # A query term counts once, by its best expansion
+                    if score > term_scores.get(speaker_name, 0):
+                        term_scores[speaker_name] = score
+
+                if is_full_scan and len(term_scores) > num_candidates:
+                    term_scores = dict(heapq.nlargest(
+                        num_candidates, term_scores.items(), key=lambda item: (item[1], item[0])))
+
+            for speaker_name, score in term_scores.items():
+                scores[speaker_name] = scores.get(speaker_name, 0) + score
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,398 @@
+import math
+import threading
+from typing import List, Tuple
+import torch
+
+INITIAL_CAPACITY = 64
+# Below this many speakers an exact search is already a few milliseconds
+APPROXIMATE_MIN_SPEAKERS = 20000
+NUM_SUBQUANTIZERS = 16
+SUBQUANTIZER_CENTROIDS = 256
+DEFAULT_NPROBE = 16
+KMEANS_ITERATIONS = 10
+MAX_TRAINING_SAMPLES = 30000
+
+SimilarSpeakerList = List[Tuple[str, float]]
+
+
+def normalize_rows(matrix: torch.Tensor) -> torch.Tensor:
+    return matrix / matrix.norm(dim=-1, keepdim=True).clamp_min(1e-12)
+
+
+def kmeans(data: torch.Tensor, num_centroids: int, iterations: int = KMEANS_ITERATIONS) -> torch.Tensor:
+    """
+    Plain Lloyd k-means, returns the `[num_centroids, D]` centroids.
+    """
+    generator = torch.Generator().manual_seed(0)
+    centroids = data[torch.randperm(data.shape[0], generator=generator)[
+        :num_centroids]].clone()
+
+    for _ in range(iterations):
+        assignments = torch.cdist(data, centroids).argmin(dim=1)
+        sums = torch.zeros_like(centroids).index_add_(0, assignments, data)
+        counts = torch.bincount(assignments, minlength=num_centroids)
+        # Empty clusters keep their previous centroid
+        is_filled = counts > 0
+        centroids[is_filled] = sums[is_filled] / \
+            counts[is_filled].unsqueeze(1).to(data.dtype)
+
+    return centroids
+
+
+class IvfPqQuantizer:
+    """
+    Inverted file with product quantized residuals. Vectors are assigned to
+    their nearest coarse centroid, and the residual from it is split into
+    `num_subquantizers` chunks, each stored as a one byte codebook index.
+    """
+
+    def __init__(self, coarse_centroids: torch.Tensor, codebooks: torch.Tensor):
+        # [nlist, D] and [M, 256, D / M]
+        self.coarse_centroids = coarse_centroids
+        self.codebooks = codebooks
+
+    @classmethod
+    def train(cls, data: torch.Tensor, num_subquantizers: int = NUM_SUBQUANTIZERS) -> "IvfPqQuantizer":
+        if data.shape[0] > MAX_TRAINING_SAMPLES:
+            generator = torch.Generator().manual_seed(0)
+            data = data[torch.randperm(data.shape[0], generator=generator)[
+                :MAX_TRAINING_SAMPLES]]
+
+        num_lists = max(16, min(4096, int(4 * math.sqrt(data.shape[0]))))
+        coarse_centroids = kmeans(data, num_lists)
+
+        residuals = data - \
+            coarse_centroids[torch.cdist(data, coarse_centroids).argmin(dim=1)]
+        sub_residuals = residuals.reshape(
+            data.shape[0], num_subquantizers, -1)
+        codebooks = torch.stack([
+            kmeans(sub_residuals[:, m], SUBQUANTIZER_CENTROIDS) for m in range(num_subquantizers)
+        ])
+
+        return cls(coarse_centroids, codebooks)
+
+    def assign(self, data: torch.Tensor) -> torch.Tensor:
+        return torch.cdist(data, self.coarse_centroids).argmin(dim=1)
+
+    def encode(self, data: torch.Tensor, list_ids: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the `[N, M]` uint8 codes of the residuals of `data`.
+        """
+        residuals = data - self.coarse_centroids[list_ids]
+        sub_residuals = residuals.reshape(
+            data.shape[0], self.codebooks.shape[0], -1).transpose(0, 1)
+        # [M, N, 256] distances from each chunk to its codebook
+        codes = torch.cdist(sub_residuals, self.codebooks).argmin(dim=2)
+
+        return codes.transpose(0, 1).to(torch.uint8)
+
+    def score(self, query: torch.Tensor, list_ids: torch.Tensor, codes: torch.Tensor) -> torch.Tensor:
+        """
+        Approximate inner products of `query` with the encoded vectors, from
+        one lookup table per sub quantizer.
+        """
+        num_subquantizers = self.codebooks.shape[0]
+        # [M, 256] inner products of each query chunk with its codebook
+        tables = torch.einsum(
+            "md,mkd->mk", query.reshape(num_subquantizers, -1), self.codebooks)
+        coarse_scores = self.coarse_centroids @ query
+        code_scores = tables[torch.arange(num_subquantizers), codes.long()].sum(dim=1)
+
+        return coarse_scores[list_ids] + code_scores
+
+
+class SpeakerSimilarityIndex:
+    """
+    Cosine similarity search over speaker embeddings. Embeddings are stored
+    L2 normalized, so similarity is a single matrix product. Once the
+    library passes `approximate_min_size` speakers, a quantizer is trained on
+    a background thread while queries keep using the exact search. Then
+    queries only scan the rows of the `nprobe` closest IVF lists using
+    product quantized scores, and re-rank the best candidates exactly.
+
+    The index isn't thread safe, the owning service serializes access. Only
+    the training runs outside of it, on a snapshot of the embeddings.
+    """
+    quantizer: IvfPqQuantizer | None = None
+    trained_size = 0
+
+    def __init__(self, approximate_min_size: int = APPROXIMATE_MIN_SPEAKERS, nprobe: int = DEFAULT_NPROBE):
+        self.approximate_min_size = approximate_min_size
+        self.nprobe = nprobe
+        self.names: List[str] = []
+        self.rows: dict[str, int] = {}
+        self.unit_embeddings: torch.Tensor | None = None
+        # Row aligned IVF list, position in that list and PQ codes, only set
+        # once a quantizer is installed
+        self.list_ids: torch.Tensor | None = None
+        self.list_positions: torch.Tensor | None = None
+        self.codes: torch.Tensor | None = None
+        # The rows of every IVF list
+        self.inverted_lists: List[List[int]] = []
+        self.training_thread: threading.Thread | None = None
+        # Set by the training thread, installed by the next search or add
+        self.trained_quantizer: Tuple[int, int, IvfPqQuantizer] | None = None
+        # Bumped by `build`, so a training started before it is discarded
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, speaker_name: str):
+        return speaker_name in self.rows
+
+    def build(self, speaker_names: List[str], embedding_matrix: torch.Tensor):
+        """
+        Builds the index from `[N, D]` embedding rows in `speaker_names` order.
+        """
+        self.names = list(speaker_names)
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.unit_embeddings = normalize_rows(
+            embedding_matrix[:len(self.names)].float()) if len(self.names) > 0 else None
+        self.quantizer = None
+        self.trained_size = 0
+        self.list_ids = None
+        self.list_positions = None
+        self.codes = None
+        self.inverted_lists = []
+        self.trained_quantizer = None
+        self.generation += 1
+
+        self.start_training_if_needed()
+
+    def is_approximate(self) -> bool:
+        return len(self.names) >= self.approximate_min_size
+
+    def is_training(self) -> bool:
+        return self.training_thread is not None and self.training_thread.is_alive()
+
+    def start_training_if_needed(self):
+        """
+        Starts training a quantizer in the background when the library is
+        large enough and has none yet, or doubled since the last one was
+        trained, as the lists drift while speakers are added.
+        """
+        if not self.is_approximate() or self.is_training() or self.trained_quantizer is not None:
+            return
+
+        if self.quantizer is not None and len(self.names) <= 2 * self.trained_size:
+            return
+
+        size = len(self.names)
+        data = self.unit_embeddings[:size].clone()
+        generation = self.generation
+
+        def train():
+            try:
+                quantizer = IvfPqQuantizer.train(data)
+            except Exception as e:
+                print(f"Failed to train the speaker similarity quantizer: {e}")
+                return
+
+            self.trained_quantizer = (generation, size, quantizer)
+
+        self.training_thread = threading.Thread(
+            target=train, name="speaker-similarity-training", daemon=True)
+        self.training_thread.start()
+
+    def wait_for_training(self):
+        if self.training_thread is not None:
+            self.training_thread.join()
+
+        self.install_trained_quantizer()
+
+    def install_trained_quantizer(self):
+        trained = self.trained_quantizer
+
+        if trained is None:
+            return
+
+        self.trained_quantizer = None
+        generation, trained_size, quantizer = trained
+
+        if generation != self.generation:
+            return
+
+        # Assigning and encoding is cheap next to training, so the current
+        # rows are encoded here instead of tracking edits made meanwhile
+        size = len(self.names)
+        capacity = self.unit_embeddings.shape[0]
+        data = self.unit_embeddings[:size]
+
+        self.quantizer = quantizer
+        self.trained_size = trained_size
+        self.list_ids = torch.zeros(capacity, dtype=torch.long)
+        self.list_positions = torch.zeros(capacity, dtype=torch.long)
+        self.codes = torch.zeros(
+            (capacity, quantizer.codebooks.shape[0]), dtype=torch.uint8)
+        self.list_ids[:size] = quantizer.assign(data)
+        self.codes[:size] = quantizer.encode(data, self.list_ids[:size])
+        self.inverted_lists = [
+            [] for _ in range(quantizer.coarse_centroids.shape[0])]
+
+        for row, list_id in enumerate(self.list_ids[:size].tolist()):
+            self.list_positions[row] = len(self.inverted_lists[list_id])
+            self.inverted_lists[list_id].append(row)
+
+        # Still too small for the grown library, train again
+        self.start_training_if_needed()
+
+    def ensure_capacity(self, size: int):
+        capacity = self.unit_embeddings.shape[0]
+
+        if size <= capacity:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity * 2, size)
+
+        def grow(matrix: torch.Tensor) -> torch.Tensor:
+            grown = matrix.new_zeros((new_capacity, *matrix.shape[1:]))
+            grown[:len(self.names)] = matrix[:len(self.names)]
+            return grown
+
+        self.unit_embeddings = grow(self.unit_embeddings)
+
+        if self.quantizer is not None:
+            self.list_ids = grow(self.list_ids)
+            self.list_positions = grow(self.list_positions)
+            self.codes = grow(self.codes)
+
+    def remove_from_list(self, row: int):
+        list_rows = self.inverted_lists[int(self.list_ids[row])]
+        position = int(self.list_positions[row])
+        last_list_row = list_rows.pop()
+
+        if last_list_row != row:
+            list_rows[position] = last_list_row
+            self.list_positions[last_list_row] = position
+
+    def add_to_list(self, row: int, list_id: int):
+        self.list_ids[row] = list_id
+        self.list_positions[row] = len(self.inverted_lists[list_id])
+        self.inverted_lists[list_id].append(row)
+
+    def add(self, speaker_name: str, speaker_embedding: torch.Tensor):
+        unit_embedding = normalize_rows(
+            speaker_embedding.detach().cpu().reshape(1, -1).float())
+
+        if self.unit_embeddings is None:
+            self.unit_embeddings = unit_embedding.new_zeros(
+                (INITIAL_CAPACITY, unit_embedding.shape[1]))
+
+        self.install_trained_quantizer()
+
+        row = self.rows.get(speaker_name)
+
+        if row is None:
+            row = len(self.names)
+            self.ensure_capacity(row + 1)
+            self.names.append(speaker_name)
+            self.rows[speaker_name] = row
+        elif self.quantizer is not None:
+            self.remove_from_list(row)
+
+        self.unit_embeddings[row] = unit_embedding[0]
+
+        if self.quantizer is not None:
+            list_id = self.quantizer.assign(unit_embedding)
+            self.add_to_list(row, int(list_id[0]))
+            self.codes[row] = self.quantizer.encode(unit_embedding, list_id)[0]
+
+        self.start_training_if_needed()
+
+    def remove(self, speaker_name: str):
+        row = self.rows.pop(speaker_name, None)
+
+        if row is None:
+            return
+
+        last_row = len(self.names) - 1
+        last_name = self.names.pop()
+
+        if self.quantizer is not None:
+            self.remove_from_list(row)
+
+        if row != last_row:
+            self.names[row] = last_name
+            self.rows[last_name] = row
+            self.unit_embeddings[row] = self.unit_embeddings[last_row]
+
+            if self.quantizer is not None:
+                # The last row moves into the freed one, in its list too
+                list_id = int(self.list_ids[last_row])
+                position = int(self.list_positions[last_row])
+                self.inverted_lists[list_id][position] = row
+                self.list_ids[row] = list_id
+                self.list_positions[row] = position
+                self.codes[row] = self.codes[last_row]
+
+    def rename(self, old_speaker_name: str, new_speaker_name: str):
+        if old_speaker_name == new_speaker_name or old_speaker_name not in self.rows:
+            return
+
+        if new_speaker_name in self.rows:
+            self.remove(new_speaker_name)
+
+        row = self.rows.pop(old_speaker_name)
+        self.names[row] = new_speaker_name
+        self.rows[new_speaker_name] = row
+
+    def search(self, query_embedding: torch.Tensor, top_k: int = 10, exclude: List[str] | None = None) -> SimilarSpeakerList:
+        """
+        Returns up to `top_k` (speaker name, cosine similarity) pairs, most
+        similar first.
+        """
+        if len(self.names) == 0:
+            return []
+
+        query = normalize_rows(
+            query_embedding.detach().cpu().reshape(1, -1).float())[0]
+        exclude_rows = [self.rows[name]
+                        for name in (exclude or []) if name in self.rows]
+        k = top_k + len(exclude_rows)
+
+        self.install_trained_quantizer()
+        self.start_training_if_needed()
+
+        # Until a quantizer is trained the exact search serves the queries
+        if self.is_approximate() and self.quantizer is not None:
+            candidate_rows = self.get_candidate_rows(query, k)
+        else:
+            candidate_rows = None
+
+        if candidate_rows is None:
+            scores = self.unit_embeddings[:len(self.names)] @ query
+            candidate_rows = torch.arange(len(self.names))
+        else:
+            scores = self.unit_embeddings[candidate_rows] @ query
+
+        if len(exclude_rows) > 0:
+            scores[torch.isin(candidate_rows, torch.tensor(exclude_rows))] = -math.inf
+
+        top_scores, top_indices = torch.topk(scores, min(k, scores.shape[0]))
+
+        return [
+            (self.names[int(candidate_rows[index])], float(score))
+            for score, index in zip(top_scores, top_indices) if score != -math.inf
+        ][:top_k]
+
+    def get_candidate_rows(self, query: torch.Tensor, k: int) -> torch.Tensor:
+        """
+        Rows from the `nprobe` closest IVF lists with the best PQ scores, to
+        be re-ranked exactly.
+        """
+        probe_lists = torch.topk(self.quantizer.coarse_centroids @ query, min(
+            self.nprobe, self.quantizer.coarse_centroids.shape[0])).indices
+        candidate_rows = torch.tensor([
+            row for list_id in probe_lists.tolist() for row in self.inverted_lists[list_id]
+        ], dtype=torch.long)
+
+        num_rerank = max(10 * k, 100)
+
+        if candidate_rows.shape[0] <= num_rerank:
+            return candidate_rows
+
+        approximate_scores = self.quantizer.score(
+            query, self.list_ids[candidate_rows], self.codes[candidate_rows])
+
+        return candidate_rows[torch.topk(approximate_scores, num_rerank).indices]
@@ -0,0 +1,604 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import torch
+from typing import Callable, List
+from constants.common import SPEAKER_METADATA_KEY
+from services.speaker_journal import SpeakerJournal, apply_speaker_operation, get_file_identity
+from types_module import SpeakerData, SpeakerFileData
+from utils.safetensors_utils import load_safetensors, save_safetensors
+
+MANIFEST_FILE_NAME = "manifest.json"
+SHARDS_DIR_NAME = "speakers"
+EMBEDDINGS_DIR_NAME = "embeddings"
+MANIFEST_VERSION = 2
+DEFAULT_TENSOR_CACHE_SIZE = 256
+JOURNAL_SUFFIX = ".journal"
+SAFETENSORS_SUFFIX = ".safetensors"
+SAFETENSORS_FORMAT_NAME = "speaker_forge"
+SAFETENSORS_FORMAT_VERSION = 1
+# Single file formats a speaker file can be exported to, by file suffix
+SPEAKER_FILE_FORMATS = {
+    "pth": ".pth",
+    "safetensors": SAFETENSORS_SUFFIX,
+}
+# Compact once the journal is bigger than this many bytes and this share of the base file
+COMPACT_MIN_BYTES = 8 * 1024 * 1024
+COMPACT_RATIO = 0.25
+
+
+class SpeakerStorage(ABC):
+    """
+    Reads and writes a speaker library at `path`.
+    """
+    is_lazy = False
+    # Called after the storage rewrote files on its own, e.g. a background compaction
+    on_write: Callable[[], None] | None = None
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @abstractmethod
+    def load(self) -> SpeakerFileData:
+        pass
+
+    @abstractmethod
+    def save(self, speakers_file_data: SpeakerFileData):
+        pass
+
+    def commit(self, speakers_file_data: SpeakerFileData, operations: List[dict]):
+        """
+        Persists the changes described by `operations`. Storages without an
+        incremental write path simply save everything.
+        """
+        self.save(speakers_file_data)
+
+    def get_watch_paths(self) -> List[str]:
+        """
+        The files whose changes signal that the library changed on disk.
+        """
+        return [self.path]
+
+
+class JournaledSpeakerStorage(SpeakerStorage):
+    """
+    Single file speaker library, read and written as one snapshot.
+
+    By default every commit rewrites the whole file, so XTTS and any other
+    tool reading it always see every edit.
+
+    With `use_journal`, meant for a private working copy no one else reads,
+    edits are appended to a journal next to the file instead of rewriting
+    it, and a background compaction folds the journal into a new snapshot
+    once it grows too large. Loading replays the journal on top of the
+    snapshot. Journals are only ever read or cleaned up in this mode, a
+    journal found next to any other file is left alone.
+
+    The journal only makes saves cheap. It isn't crash recovery for the
+    user's speaker file: the app journals a temp copy made fresh on every
+    start, and edits only reach the user's file through Export.
+    """
+    compaction_thread: threading.Thread | None = None
+
+    def __init__(self, path: str, use_journal: bool = False):
+        super().__init__(path)
+        self.use_journal = use_journal
+        self.journal = SpeakerJournal(f"{path}{JOURNAL_SUFFIX}")
+        self.lock = threading.Lock()
+
+    @abstractmethod
+    def read_snapshot(self) -> SpeakerFileData:
+        pass
+
+    @abstractmethod
+    def write_snapshot(self, speakers_file_data: SpeakerFileData, file_path: str):
+        pass
+
+    def get_watch_paths(self) -> List[str]:
+        if not self.use_journal:
+            return [self.path]
+
+        return [self.path, self.journal.journal_path]
+
+    def load(self) -> SpeakerFileData:
+        speakers_file_data = self.read_snapshot()
+
+        if not self.use_journal:
+            return speakers_file_data
+
+        with self.lock:
+            operations, end_offset = self.journal.read(
+                get_file_identity(self.path))
+
+            if self.journal.exists() and end_offset == 0:
+                os.remove(self.journal.journal_path)
+            elif end_offset < self.journal.size():
+                # Drop a torn tail so new records aren't appended after it
+                os.truncate(self.journal.journal_path, end_offset)
+
+        for operation in operations:
+            apply_speaker_operation(speakers_file_data, operation)
+
+        return speakers_file_data
+
+    def save(self, speakers_file_data: SpeakerFileData):
+        # Write next to the file first, the data may still be mapped from it
+        temp_path = f"{self.path}.save.tmp"
+        self.write_snapshot(dict(speakers_file_data.items()), temp_path)
+
+        with self.lock:
+            os.replace(temp_path, self.path)
+
+            if self.use_journal and self.journal.exists():
+                os.remove(self.journal.journal_path)
+
+    def commit(self, speakers_file_data: SpeakerFileData, operations: List[dict]):
+        if not self.use_journal:
+            self.save(speakers_file_data)
+            return
+
+        with self.lock:
+            self.journal.append(operations, get_file_identity(self.path))
+
+        if self.should_compact():
+            self.start_compaction()
+
+    def should_compact(self) -> bool:
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return False
+
+        journal_size = self.journal.size()
+
+        return journal_size > COMPACT_MIN_BYTES and journal_size > os.path.getsize(self.path) * COMPACT_RATIO
+
+    def start_compaction(self):
+        self.compaction_thread = threading.Thread(
+            target=self.compact, name="speaker-journal-compaction")
+        self.compaction_thread.start()
+
+    def compact(self):
+        """
+        Writes base file + journal into a new snapshot. The snapshot is built
+        from the files rather than from live memory, so edits journaled while
+        it is written are carried over into the new journal untouched.
+        """
+        with self.lock:
+            base_identity = get_file_identity(self.path)
+            # Appends hold the lock, so the journal size is on a record boundary
+            end_offset = self.journal.size()
+
+        speakers_file_data = self.read_snapshot()
+        operations, _ = self.journal.read(base_identity, end_offset)
+
+        for operation in operations:
+            apply_speaker_operation(speakers_file_data, operation)
+
+        temp_path = f"{self.path}.compact.tmp"
+        self.write_snapshot(speakers_file_data, temp_path)
+
+        # os.replace keeps the inode and mtime, so this is the new base identity
+        new_identity = get_file_identity(temp_path)
+
+        with self.lock:
+            tail = self.journal.read_tail(end_offset)
+            os.replace(temp_path, self.path)
+            self.journal.rewrite(new_identity, tail)
+
+        print(f"Compacted {len(operations)} journaled speaker edits")
+
+        if self.on_write is not None:
+            self.on_write()
+
+
+class PthSpeakerStorage(JournaledSpeakerStorage):
+    """
+    The XTTS `speakers_xtts.pth` format, a single pickled dict of every speaker.
+
+    Pass `weights_only` for files from untrusted sources, so unpickling is
+    restricted to tensors and plain containers.
+    """
+
+    def __init__(self, path: str, weights_only: bool = False, use_journal: bool = False):
+        super().__init__(path, use_journal)
+        self.weights_only = weights_only
+
+    def read_snapshot(self) -> SpeakerFileData:
+        return torch.load(self.path, weights_only=self.weights_only)
+
+    def write_snapshot(self, speakers_file_data: SpeakerFileData, file_path: str):
+        torch.save(speakers_file_data, file_path)
+
+
+class SafetensorsSpeakerStorage(JournaledSpeakerStorage):
+    """
+    Speaker library in the safetensors layout. Tensors are stored as
+    `<index>.gpt_cond_latent` and `<index>.speaker_embedding`, with the
+    speaker names and metadata as JSON in the header. Reading never
+    unpickles anything, so it is safe for untrusted files.
+    """
+    TENSOR_KEYS = ["gpt_cond_latent", "speaker_embedding"]
+
+    def read_snapshot(self) -> SpeakerFileData:
+        tensors, header_metadata = load_safetensors(self.path)
+
+        if header_metadata.get("format") != SAFETENSORS_FORMAT_NAME:
+            raise ValueError(f"{self.path} is not a speaker file")
+
+        speaker_names = json.loads(header_metadata.get("speakers", "[]"))
+        speakers_file_data: SpeakerFileData = {}
+
+        for index, speaker_name in enumerate(speaker_names):
+            speakers_file_data[speaker_name] = {
+                key: tensors[f"{index}.{key}"] for key in self.TENSOR_KEYS
+            }
+
+        speakers_file_data[SPEAKER_METADATA_KEY] = json.loads(
+            header_metadata.get(SPEAKER_METADATA_KEY, "{}"))
+
+        return speakers_file_data
+
+    def write_snapshot(self, speakers_file_data: SpeakerFileData, file_path: str):
+        speaker_names = [
+            name for name in speakers_file_data.keys() if name != SPEAKER_METADATA_KEY
+        ]
+        tensors = {}
+
+        for index, speaker_name in enumerate(speaker_names):
+            for key in self.TENSOR_KEYS:
+                tensors[f"{index}.{key}"] = speakers_file_data[speaker_name][key]
+
+        save_safetensors(tensors, file_path, {
+            "format": SAFETENSORS_FORMAT_NAME,
+            "version": str(SAFETENSORS_FORMAT_VERSION),
+            "speakers": json.dumps(speaker_names),
+            SPEAKER_METADATA_KEY: json.dumps(speakers_file_data.get(SPEAKER_METADATA_KEY, {})),
+        })
+
+
+class LazySpeakerFileData(MutableMapping):
+    """
+    Dict like view over a sharded speaker directory. Names, metadata and
+    the small speaker embeddings are held in memory, the other tensors are
+    loaded on first access and kept in a bounded LRU. Added or changed
+    speakers stay pinned in memory until saved.
+    """
+
+    def __init__(
+        self,
+        storage: "ShardedSpeakerStorage",
+        shard_paths: dict,
+        metadata: dict,
+        cache_size: int,
+        embeddings: dict | None = None,
+        embedding_tables: List[dict] | None = None
+    ):
+        self.storage = storage
+        self.shard_paths = shard_paths
+        self.metadata = metadata
+        self.cache_size = cache_size
+        self.cache: OrderedDict[str, SpeakerData] = OrderedDict()
+        self.pending: dict[str, SpeakerData] = {}
+        self.removed: set[str] = set()
+        # Speaker embeddings of the saved speakers, from the library's embedding tables
+        self.embeddings: dict[str, torch.Tensor] = embeddings or {}
+        # The tables on disk, oldest first, with the speaker names of their rows
+        self.embedding_tables: List[dict] = embedding_tables or []
+
+    def get_speaker_embedding(self, speaker_name: str) -> torch.Tensor:
+        """
+        The speaker embedding alone, without loading the speaker's shard
+        unless the library predates the embedding table.
+        """
+        if speaker_name in self.pending:
+            return self.pending[speaker_name]["speaker_embedding"]
+
+        if speaker_name in self.embeddings:
+            return self.embeddings[speaker_name]
+
+        return self[speaker_name]["speaker_embedding"]
+
+    def __getitem__(self, key: str):
+        if key == SPEAKER_METADATA_KEY:
+            return self.metadata
+
+        if key in self.pending:
+            return self.pending[key]
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        if key not in self.shard_paths:
+            raise KeyError(key)
+
+        speaker_data = self.storage.load_shard(self.shard_paths[key])
+        self.cache[key] = speaker_data
+
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return speaker_data
+
+    def __setitem__(self, key: str, value):
+        if key == SPEAKER_METADATA_KEY:
+            self.metadata = value
+            return
+
+        self.cache.pop(key, None)
+        self.embeddings.pop(key, None)
+        self.pending[key] = value
+
+        if key not in self.shard_paths:
+            self.shard_paths[key] = None
+
+    def __delitem__(self, key: str):
+        if key == SPEAKER_METADATA_KEY:
+            self.metadata = {}
+            return
+
+        if key not in self.shard_paths:
+            raise KeyError(key)
+
+        shard_path = self.shard_paths.pop(key)
+        self.cache.pop(key, None)
+        self.embeddings.pop(key, None)
+        self.pending.pop(key, None)
+
+        if shard_path is not None:
+            self.removed.add(shard_path)
+
+    def __contains__(self, key):
+        return key == SPEAKER_METADATA_KEY or key in self.shard_paths
+
+    def __iter__(self):
+        yield from self.shard_paths.keys()
+        yield SPEAKER_METADATA_KEY
+
+    def __len__(self):
+        return len(self.shard_paths) + 1
+
+
+class ShardedSpeakerStorage(SpeakerStorage):
+    """
+    Directory backed speaker library, one tensor file per speaker plus a
+    JSON manifest holding the speaker names and metadata, and tables of
+    the speaker embeddings so similarity search never loads the shards:
+
+        <path>/manifest.json
+        <path>/speakers/<shard id>.pth
+        <path>/embeddings/<table id>.safetensors
+
+    A save only writes a table of the speakers it changed, later tables
+    override earlier ones. The newest tables are merged while they are at
+    least as big as the one before them, like a binary counter, so there
+    are O(log N) tables and each row is rewritten O(log N) times. Once
+    half the rows are stale the tables are rewritten into one.
+    """
+    is_lazy = True
+
+    def __init__(self, path: str, cache_size: int = DEFAULT_TENSOR_CACHE_SIZE):
+        super().__init__(path)
+        self.cache_size = cache_size
+
+    def get_manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_FILE_NAME)
+
+    def get_watch_paths(self) -> List[str]:
+        return [self.get_manifest_path()]
+
+    def load(self) -> SpeakerFileData:
+        with open(self.get_manifest_path(), "r") as f:
+            manifest = json.load(f)
+
+        shard_paths = dict(manifest.get("speakers", {}))
+        table_paths = manifest.get("embeddings") or []
+
+        # Libraries used to have a single table
+        if isinstance(table_paths, str):
+            table_paths = [table_paths]
+
+        embeddings = {}
+        embedding_tables = []
+
+        for table_path in table_paths:
+            table = self.load_embedding_table(table_path, shard_paths)
+
+            if table is not None:
+                embeddings.update(table.pop("embeddings"))
+                embedding_tables.append(table)
+
+        return LazySpeakerFileData(
+            self,
+            shard_paths,
+            manifest.get(SPEAKER_METADATA_KEY, {}),
+            self.cache_size,
+            embeddings,
+            embedding_tables
+        )
+
+    def load_embedding_table(self, table_path: str, shard_paths: dict) -> dict | None:
+        if not os.path.exists(os.path.join(self.path, table_path)):
+            return None
+
+        tensors, metadata = load_safetensors(
+            os.path.join(self.path, table_path))
+        embeddings = tensors["embeddings"]
+        embedding_shape = json.loads(metadata["embedding_shape"])
+        speaker_names = json.loads(metadata["speakers"])
+
+        return {
+            "path": table_path,
+            "speakers": speaker_names,
+            # Rows of removed speakers are left out, they are stale
+            "embeddings": {
+                speaker_name: embeddings[row].reshape(embedding_shape)
+                for row, speaker_name in enumerate(speaker_names) if speaker_name in shard_paths
+            },
+        }
+
+    def save_embedding_table(self, speakers_file_data: SpeakerFileData, speaker_names: List[str]) -> dict:
+        """
+        Writes the embeddings of `speaker_names` to a new table file and
+        returns the table, its path is relative to the library.
+        """
+
+        if isinstance(speakers_file_data, LazySpeakerFileData):
+            embeddings = [speakers_file_data.get_speaker_embedding(
+                name) for name in speaker_names]
+        else:
+            embeddings = [speakers_file_data[name]["speaker_embedding"]
+                          for name in speaker_names]
+
+        table_path = os.path.join(
+            EMBEDDINGS_DIR_NAME, f"{uuid.uuid4().hex}{SAFETENSORS_SUFFIX}")
+        os.makedirs(os.path.join(self.path, EMBEDDINGS_DIR_NAME), exist_ok=True)
+
+        save_safetensors(
+            {"embeddings": torch.stack([embedding.detach().cpu().reshape(-1)
+                                        for embedding in embeddings])},
+            os.path.join(self.path, table_path),
+            {
+                "speakers": json.dumps(speaker_names),
+                "embedding_shape": json.dumps(list(embeddings[0].shape)),
+            }
+        )
+
+        return {"path": table_path, "speakers": speaker_names}
+
+    def update_embedding_tables(
+        self,
+        speakers_file_data: SpeakerFileData,
+        embedding_tables: List[dict],
+        changed_speaker_names: List[str]
+    ) -> List[dict]:
+        """
+        Returns the tables after writing the embeddings of the changed
+        speakers, only writing the other speakers when merging tables.
+        """
+        speaker_names = [
+            name for name in speakers_file_data.keys() if name != SPEAKER_METADATA_KEY]
+
+        if len(speaker_names) == 0:
+            return []
+
+        tables = list(embedding_tables)
+
+        if len(changed_speaker_names) > 0:
+            tables.append(self.save_embedding_table(
+                speakers_file_data, changed_speaker_names))
+
+        num_rows = sum(len(table["speakers"]) for table in tables)
+        table_speaker_names = {
+            name for table in tables for name in table["speakers"]}
+
+        # Speakers missing from every table predate the tables, or half the rows are stale
+        if num_rows > 2 * len(speaker_names) or any(name not in table_speaker_names for name in speaker_names):
+            return [self.save_embedding_table(speakers_file_data, speaker_names)]
+
+        while len(tables) > 1 and len(tables[-2]["speakers"]) <= len(tables[-1]["speakers"]):
+            newer_table = tables.pop()
+            older_table = tables.pop()
+            merged_speaker_names = list(dict.fromkeys(
+                name for name in older_table["speakers"] + newer_table["speakers"] if name in speakers_file_data))
+            tables.append(self.save_embedding_table(
+                speakers_file_data, merged_speaker_names))
+
+        return tables
+
+    def remove_stale_embedding_tables(self, embedding_tables: List[dict]):
+        embeddings_dir = os.path.join(self.path, EMBEDDINGS_DIR_NAME)
+        table_paths = {table["path"] for table in embedding_tables}
+
+        if not os.path.isdir(embeddings_dir):
+            return
+
+        for file_name in os.listdir(embeddings_dir):
+            if os.path.join(EMBEDDINGS_DIR_NAME, file_name) not in table_paths:
+                try:
+                    os.remove(os.path.join(embeddings_dir, file_name))
+                except OSError:
+                    pass
+
+    def load_shard(self, shard_path: str) -> SpeakerData:
+        return torch.load(os.path.join(self.path, shard_path))
+
+    def get_shard_path(self, speaker_name: str) -> str:
+        shard_id = hashlib.sha1(speaker_name.encode()).hexdigest()[:16]
+
+        return os.path.join(SHARDS_DIR_NAME, f"{shard_id}.pth")
+
+    def save(self, speakers_file_data: SpeakerFileData):
+        os.makedirs(os.path.join(self.path, SHARDS_DIR_NAME), exist_ok=True)
+
+        if isinstance(speakers_file_data, LazySpeakerFileData):
+            shard_paths = speakers_file_data.shard_paths
+            pending = speakers_file_data.pending
+            removed = speakers_file_data.removed
+            embedding_tables = speakers_file_data.embedding_tables
+        else:
+            shard_paths = {}
+            pending = {
+                name: data for name, data in speakers_file_data.items() if name != SPEAKER_METADATA_KEY
+            }
+            removed = set()
+            embedding_tables = []
+
+        for speaker_name, speaker_data in pending.items():
+            shard_path = self.get_shard_path(speaker_name)
+            removed.discard(shard_path)
+
+            torch.save({
+                "gpt_cond_latent": speaker_data["gpt_cond_latent"],
+                "speaker_embedding": speaker_data["speaker_embedding"],
+            }, os.path.join(self.path, shard_path))
+
+            shard_paths[speaker_name] = shard_path
+
+        # Written before the manifest, which only points at them once complete
+        embedding_tables = self.update_embedding_tables(
+            speakers_file_data, embedding_tables, list(pending.keys()))
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "speakers": shard_paths,
+            "embeddings": [table["path"] for table in embedding_tables],
+            SPEAKER_METADATA_KEY: speakers_file_data.get(SPEAKER_METADATA_KEY, {}),
+        }
+
+        # Write the manifest atomically, it is the commit point of the save
+        temp_manifest_path = f"{self.get_manifest_path()}.tmp"
+        with open(temp_manifest_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_manifest_path, self.get_manifest_path())
+
+        for shard_path in removed:
+            if shard_path not in shard_paths.values() and os.path.exists(os.path.join(self.path, shard_path)):
+                os.remove(os.path.join(self.path, shard_path))
+
+        self.remove_stale_embedding_tables(embedding_tables)
+
+        if isinstance(speakers_file_data, LazySpeakerFileData):
+            speakers_file_data.embedding_tables = embedding_tables
+            for speaker_name, speaker_data in pending.items():
+                speakers_file_data.cache[speaker_name] = speaker_data
+                speakers_file_data.embeddings[speaker_name] = speaker_data["speaker_embedding"].detach(
+                ).cpu()
+            while len(speakers_file_data.cache) > speakers_file_data.cache_size:
+                speakers_file_data.cache.popitem(last=False)
+            pending.clear()
+            removed.clear()
+
+
+def get_speaker_storage(path: str, is_trusted: bool = True, use_journal: bool = False) -> SpeakerStorage:
+    if os.path.isdir(path):
+        return ShardedSpeakerStorage(path)
+
+    if path.endswith(SAFETENSORS_SUFFIX):
+        return SafetensorsSpeakerStorage(path, use_journal)
+
+    return PthSpeakerStorage(path, weights_only=not is_trusted, use_journal=use_journal)
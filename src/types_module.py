@@ -4,6 +4,11 @@ import gradio as gr
 import torch
 
 
+class ReferenceStats(TypedDict):
+    num_clips: int
+    num_chunks: int
+
+
 class SpeakerMetadata(TypedDict):
     speaker_name: str | None
     age_range: str | None
@@ -14,6 +19,7 @@ class SpeakerMetadata(TypedDict):
     genre: List[str] | None
     character_type: List[str] | None
     description: str | None
+    reference_stats: ReferenceStats | None
 
 
 class SpeakerWeight(TypedDict):
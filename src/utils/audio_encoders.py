@@ -0,0 +1,115 @@
+from abc import ABC, abstractmethod
+import torch
+import torchaudio
+
+
+class AudioEncoder(ABC):
+    """
+    Writes rendered audio to a file in one output format.
+    """
+    name: str
+    suffix: str
+    # Whether every major browser plays the files, so previews can use it
+    browser_playable = True
+
+    @abstractmethod
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        """
+        Writes `wav`, shaped [channels, samples], to `path`. The format is
+        always passed explicitly, as `path` may be a temporary file name.
+        """
+        pass
+
+
+class WavEncoder(AudioEncoder):
+    """
+    Uncompressed 16 bit PCM, half the size of the float wavs the model renders.
+    """
+    name = "wav"
+    suffix = ".wav"
+
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        torchaudio.save(path, wav.clamp(-1.0, 1.0), sample_rate, format="wav",
+                        encoding="PCM_S", bits_per_sample=16)
+
+
+class UlawEncoder(AudioEncoder):
+    """
+    8 bit mu-law wav, the G.711 encoding telephony and IVR systems expect.
+    """
+    name = "ulaw"
+    suffix = ".wav"
+    browser_playable = False
+
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        torchaudio.save(path, wav.clamp(-1.0, 1.0), sample_rate, format="wav",
+                        encoding="ULAW", bits_per_sample=8)
+
+
+class FlacEncoder(AudioEncoder):
+    name = "flac"
+    suffix = ".flac"
+
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        torchaudio.save(path, wav, sample_rate, format="flac",
+                        bits_per_sample=16)
+
+
+class OpusEncoder(AudioEncoder):
+    """
+    Ogg Opus through ffmpeg. Opus takes 24 kHz audio as is, so the model
+    output needs no resampling.
+    """
+    name = "opus"
+    suffix = ".opus"
+    browser_playable = False
+
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        torchaudio.save(path, wav, sample_rate, format="opus", backend="ffmpeg")
+
+
+class Mp3Encoder(AudioEncoder):
+    name = "mp3"
+    suffix = ".mp3"
+
+    def encode(self, path: str, wav: torch.Tensor, sample_rate: int):
+        torchaudio.save(path, wav, sample_rate, format="mp3", backend="ffmpeg")
+
+
+# Output formats rendered audio can be encoded to, by name
+AUDIO_ENCODERS = {
+    encoder.name: encoder for encoder in [
+        WavEncoder(),
+        UlawEncoder(),
+        FlacEncoder(),
+        OpusEncoder(),
+        Mp3Encoder(),
+    ]
+}
+DEFAULT_AUDIO_ENCODER = WavEncoder.name
+# Formats offered for in app previews, the others are for exported files
+PREVIEW_AUDIO_ENCODERS = [
+    name for name, encoder in AUDIO_ENCODERS.items() if encoder.browser_playable
+]
+
+
+def get_audio_encoder(name: str | None) -> AudioEncoder:
+    encoder = AUDIO_ENCODERS.get(name or DEFAULT_AUDIO_ENCODER)
+
+    if encoder is None:
+        raise ValueError(
+            f"Unknown output format {name}, expected one of {', '.join(AUDIO_ENCODERS)}")
+
+    return encoder
+
+
+def get_preview_audio_format(output_format: str | None, streaming: bool = False) -> str:
+    """
+    The format a preview player is given for audio in `output_format`, so
+    Gradio serves the encoded file instead of converting it. Streamed
+    chunks are always raw wav audio.
+    """
+    if streaming or output_format not in PREVIEW_AUDIO_ENCODERS:
+        return DEFAULT_AUDIO_ENCODER
+
+    return output_format
@@ -0,0 +1,212 @@
+import functools
+import heapq
+import math
+from typing import Iterator, List, Tuple
+import torch
+import torchaudio
+
+
+@functools.lru_cache(maxsize=None)
+def get_resampler(orig_freq: int, new_freq: int) -> torchaudio.transforms.Resample:
+    """
+    Shared resampler per rate pair, so its polyphase filter kernel is only
+    computed once instead of on every `torchaudio.functional.resample` call.
+    """
+    return torchaudio.transforms.Resample(orig_freq, new_freq)
+
+
+def resample_audio(wav: torch.Tensor, orig_freq: int, new_freq: int) -> torch.Tensor:
+    """
+    Resamples the last dimension of `wav`, any batch of rows at once.
+    """
+    if orig_freq == new_freq:
+        return wav
+
+    with torch.inference_mode():
+        return get_resampler(orig_freq, new_freq)(wav)
+
+
+def crossfade_concat(wavs: List[torch.Tensor], sample_rate: int, crossfade_ms: int = 40) -> torch.Tensor:
+    """
+    Joins 1D waveforms end to end, blending each boundary with an
+    equal-power crossfade of `crossfade_ms`.
+    """
+    if len(wavs) == 0:
+        return torch.zeros(0)
+
+    fade_len = int(sample_rate * crossfade_ms / 1000)
+    result = wavs[0]
+
+    for wav in wavs[1:]:
+        overlap = min(fade_len, result.shape[-1], wav.shape[-1])
+
+        if overlap == 0:
+            result = torch.cat([result, wav])
+            continue
+
+        t = torch.linspace(0, 1, overlap, dtype=result.dtype)
+        fade_in = torch.sin(t * torch.pi / 2)
+        fade_out = torch.cos(t * torch.pi / 2)
+
+        blended = result[-overlap:] * fade_out + wav[:overlap] * fade_in
+        result = torch.cat([result[:-overlap], blended, wav[overlap:]])
+
+    return result
+
+
+def get_frame_energies_db(audio: torch.Tensor, sample_rate: int, frame_ms: int = 30, hop_ms: int = 10) -> torch.Tensor:
+    """
+    RMS energy in dBFS of each `frame_ms` frame of a `[1, T]` or 1D
+    waveform, taken every `hop_ms`.
+    """
+    audio = audio.reshape(-1)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    hop_len = max(1, int(sample_rate * hop_ms / 1000))
+
+    if audio.shape[0] < frame_len:
+        audio = torch.nn.functional.pad(audio, (0, frame_len - audio.shape[0]))
+
+    frames = audio.unfold(0, frame_len, hop_len)
+    rms = frames.pow(2).mean(dim=1).sqrt()
+
+    return 20 * torch.log10(rms.clamp_min(1e-10))
+
+
+def get_voiced_frames(energies_db: torch.Tensor, relative_db: float = 40.0, floor_db: float = -60.0) -> torch.Tensor:
+    """
+    Energy VAD, frames within `relative_db` of the loudest frame and above
+    `floor_db` count as voiced.
+    """
+    threshold = max(float(energies_db.max()) - relative_db, floor_db)
+
+    return energies_db > threshold
+
+
+def trim_silence(
+    audio: torch.Tensor,
+    sample_rate: int,
+    relative_db: float = 40.0,
+    floor_db: float = -60.0,
+    padding_ms: int = 100,
+    hop_ms: int = 10
+) -> torch.Tensor:
+    """
+    Cuts the leading and trailing silence of a `[1, T]` waveform, keeping
+    `padding_ms` around the first and last voiced frames. Audio without any
+    voiced frame is returned as is.
+    """
+    voiced = torch.nonzero(get_voiced_frames(get_frame_energies_db(
+        audio, sample_rate, hop_ms=hop_ms), relative_db, floor_db)).squeeze(1)
+
+    if voiced.shape[0] == 0:
+        return audio
+
+    hop_len = max(1, int(sample_rate * hop_ms / 1000))
+    padding = int(sample_rate * padding_ms / 1000)
+    start = max(0, int(voiced[0]) * hop_len - padding)
+    end = min(audio.shape[-1], (int(voiced[-1]) + 1) * hop_len + padding)
+
+    return audio[..., start:end]
+
+
+def normalize_loudness(audio: torch.Tensor, sample_rate: int, target_db: float = -20.0, peak_limit: float = 0.99) -> torch.Tensor:
+    """
+    Scales a waveform so its voiced frames average `target_db` dBFS RMS,
+    without letting the peak go above `peak_limit`.
+    """
+    energies_db = get_frame_energies_db(audio, sample_rate)
+    voiced = get_voiced_frames(energies_db)
+
+    if not voiced.any():
+        return audio
+
+    # Average the voiced frame power, not their dB values
+    voiced_power = torch.pow(10, energies_db[voiced] / 10).mean()
+    loudness_db = 10 * torch.log10(voiced_power.clamp_min(1e-20))
+    gain = 10 ** ((target_db - float(loudness_db)) / 20)
+
+    peak = float(audio.abs().max())
+
+    if peak * gain > peak_limit:
+        gain = peak_limit / peak
+
+    return audio * gain
+
+
+def read_audio_windows(file_path: str, window_seconds: float) -> Iterator[Tuple[int, torch.Tensor, int]]:
+    """
+    Decodes an audio file `window_seconds` at a time, yielding
+    `(window index, [1, T] mono window, sample rate)`, so only one window
+    is ever held in memory.
+    """
+    info = torchaudio.info(file_path)
+    window_frames = max(1, int(info.sample_rate * window_seconds))
+
+    for index, frame_offset in enumerate(range(0, info.num_frames, window_frames)):
+        window, sample_rate = torchaudio.load(
+            file_path, frame_offset=frame_offset, num_frames=window_frames)
+
+        if window.shape[-1] == 0:
+            break
+
+        if window.shape[0] != 1:
+            window = window.mean(dim=0, keepdim=True)
+
+        yield index, window, sample_rate
+
+
+def score_audio_window(window: torch.Tensor, sample_rate: int, clipping_penalty: float = 1000.0) -> float:
+    """
+    How usable a window is as reference audio: the estimated SNR (loud vs
+    quiet frame energy) scaled by the voiced fraction, minus a penalty per
+    clipped sample. Silent windows score -inf.
+    """
+    energies_db = get_frame_energies_db(window, sample_rate)
+
+    if float(energies_db.max()) < -50:
+        return -math.inf
+
+    voiced_fraction = float(get_voiced_frames(energies_db).float().mean())
+    snr_db = float(torch.quantile(energies_db, 0.9) -
+                   torch.quantile(energies_db, 0.1))
+    clipped_fraction = float((window.abs() >= 0.99).float().mean())
+
+    return min(snr_db, 60.0) * voiced_fraction - clipping_penalty * clipped_fraction
+
+
+def load_best_audio(file_path: str, sample_rate: int, max_seconds: float, window_seconds: float = 5.0) -> torch.Tensor:
+    """
+    Streams a long file in windows and keeps the best scoring ones, up to
+    `max_seconds`, resampled to `sample_rate` and joined in their original
+    order. Peak memory stays around `max_seconds` of audio plus one window,
+    whatever the file length.
+    """
+    num_windows = max(1, math.ceil(max_seconds / window_seconds))
+    # Min heap of (score, -index, window), the worst kept window on top
+    best_windows = []
+
+    for index, window, window_sample_rate in read_audio_windows(file_path, window_seconds):
+        score = score_audio_window(window, window_sample_rate)
+        item = (score, -index)
+
+        if len(best_windows) >= num_windows and item <= best_windows[0][:2]:
+            continue
+
+        if window_sample_rate != sample_rate:
+            window = resample_audio(window, window_sample_rate, sample_rate)
+
+        entry = (score, -index, window.clamp(-1, 1))
+
+        if len(best_windows) < num_windows:
+            heapq.heappush(best_windows, entry)
+        else:
+            heapq.heapreplace(best_windows, entry)
+
+    if len(best_windows) == 0:
+        return torch.zeros((1, 0))
+
+    windows = [window[0] for _, _, window in sorted(
+        best_windows, key=lambda entry: -entry[1])]
+    audio = crossfade_concat(windows, sample_rate)
+
+    return audio[:int(sample_rate * max_seconds)].unsqueeze(0)
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import torch
+
+
+def tensor_to_bytes(tensor: torch.Tensor) -> bytes:
+    return tensor.detach().cpu().contiguous().numpy().tobytes()
+
+
+def hash_tensors(*tensors: torch.Tensor) -> str:
+    hasher = hashlib.sha256()
+
+    for tensor in tensors:
+        hasher.update(str(tuple(tensor.shape)).encode())
+        hasher.update(str(tensor.dtype).encode())
+        hasher.update(tensor_to_bytes(tensor))
+
+    return hasher.hexdigest()
+
+
+def hash_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    hasher = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+class DiskCache:
+    """
+    Content addressed file cache bounded by total size in bytes.
+
+    Each entry is a single file named after its key. The file mtime is
+    bumped on every hit, so the LRU order survives a restart.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, suffix: str = ""):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.total_bytes = 0
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.scan()
+
+    def scan(self):
+        files = []
+
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(self.suffix) or file_name.startswith("."):
+                continue
+
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            key = file_name[:len(file_name) - len(self.suffix)]
+            files.append((stat.st_mtime, key, stat.st_size))
+
+        files.sort()
+
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+            for _, key, size in files:
+                self.entries[key] = size
+                self.total_bytes += size
+
+        self.evict()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            if key not in self.entries:
+                return None
+
+            path = self.path_for(key)
+
+            if not os.path.exists(path):
+                self.total_bytes -= self.entries.pop(key)
+                return None
+
+            self.entries.move_to_end(key)
+
+        os.utime(path)
+
+        return path
+
+    def put(self, key: str, write_fn: Callable[[str], None]) -> str:
+        """
+        Stores an entry by calling `write_fn` with a temporary path, which
+        is then atomically moved into place.
+        """
+        path = self.path_for(key)
+        temp_path = os.path.join(
+            self.cache_dir, f".{key}.{threading.get_ident()}.tmp{self.suffix}")
+
+        try:
+            write_fn(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        size = os.path.getsize(path)
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)
+
+            self.entries[key] = size
+            self.total_bytes += size
+
+        self.evict()
+
+        return path
+
+    def remove(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)
+
+        if os.path.exists(self.path_for(key)):
+            os.remove(self.path_for(key))
+
+    def evict(self):
+        evicted = []
+
+        with self.lock:
+            while self.total_bytes > self.max_bytes and len(self.entries) > 0:
+                key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(key)
+
+        for key in evicted:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear(self):
+        with self.lock:
+            keys = list(self.entries.keys())
+
+        for key in keys:
+            self.remove(key)
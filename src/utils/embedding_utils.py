@@ -1,7 +1,7 @@
 import torch
 from enum import Enum
 from typing import List
-from types_module import EmbeddingPairsList
+from types_module import EmbeddingPairsList, ReferenceStats
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -26,80 +26,133 @@ def average_latents_and_embeddings(latent_embedding_pairs, combine_method: Combi
     """
 
     # Separate gpt_cond_latents and speaker_embeddings
-    gpt_cond_latents_list = [pair[0] for pair in latent_embedding_pairs]
-    speaker_embeddings_list = [pair[1] for pair in latent_embedding_pairs]
+    gpt_cond_latents = torch.stack([pair[0] for pair in latent_embedding_pairs])
+    speaker_embeddings = torch.stack([pair[1] for pair in latent_embedding_pairs])
 
-    # Average gpt_cond_latents
-    avg_gpt_cond_latents = combine_embeddings(
-        gpt_cond_latents_list, combine_method, speaker_weights)
+    return average_stacked_latents_and_embeddings(gpt_cond_latents, speaker_embeddings, combine_method, speaker_weights)
 
-    # Average speaker_embeddings
-    avg_speaker_embedding = combine_embeddings(
-        speaker_embeddings_list, combine_method, speaker_weights)
+
+def average_stacked_latents_and_embeddings(gpt_cond_latents: torch.Tensor, speaker_embeddings: torch.Tensor, combine_method: CombineMethod = CombineMethod.MEAN, speaker_weights: List | torch.Tensor | None = None):
+    """
+    Same as `average_latents_and_embeddings`, for latents and embeddings
+    already stacked along the first dim.
+    """
+    avg_gpt_cond_latents = combine_stacked_embeddings(
+        gpt_cond_latents, combine_method, speaker_weights)
+    avg_speaker_embedding = combine_stacked_embeddings(
+        speaker_embeddings, combine_method, speaker_weights)
 
     return avg_gpt_cond_latents, avg_speaker_embedding
 
 
 def combine_embeddings(embeddings: EmbeddingPairsList, method: CombineMethod, weights: List[float] | None = None):
+    return combine_stacked_embeddings(torch.stack(embeddings), method, weights)
+
+
+def combine_stacked_embeddings(embeddings: torch.Tensor, method: CombineMethod, weights: List[float] | torch.Tensor | None = None):
+    """
+    Combines `[K, ...]` stacked embeddings with `[K]` weights into one
+    embedding. Weights can also be a `[S, K]` batch, which returns `[S, ...]`
+    combinations computed in the same pass, e.g. to sweep weight settings.
+
+    MEAN is the weighted mean, MEDIAN the weighted median. MAX and MIN are
+    taken over the weighted embeddings, NORMALIZED_SUM sums the unit length
+    embeddings, so only the sign of a weight counts.
+
+    MEAN and MEDIAN used to reduce the weighted embeddings `w * x`, the mean
+    dividing by the count. They now reduce `x` itself, using the weights
+    only to weigh it, so scaling every weight by the same factor no longer
+    scales the result. Results only match the old ones when every weight is
+    1. MEDIAN ignores negative weights, as a weighted median has no use for
+    them, where it used to take the median of the negated embeddings.
+    """
+    num_embeddings = embeddings.shape[0]
+    embedding_shape = embeddings.shape[1:]
+
     if weights is None:
-        weights = [1 for _ in embeddings]
+        weights = torch.ones(num_embeddings)
 
-    if len(weights) != len(embeddings):
+    weights = torch.as_tensor(weights, dtype=embeddings.dtype)
+    is_batch = weights.dim() == 2
+
+    if weights.shape[-1] != num_embeddings:
         raise ValueError(
             "Weights match the number of embeddings for weighted average.")
 
-    weighted_embeddings = [
-        embedding.to(device) * weight for embedding, weight in zip(embeddings, weights)]
+    # One transfer each, everything below runs on the stacked tensors
+    values = embeddings.to(device).reshape(num_embeddings, -1)
+    weights = weights.to(device).reshape(-1, num_embeddings)
 
     if method == CombineMethod.MEAN:
-        return torch.mean(torch.stack(weighted_embeddings), dim=0)
+        weight_sums = weights.sum(dim=1, keepdim=True).clamp_min(
+            torch.finfo(weights.dtype).tiny)
+        combined = (weights @ values) / weight_sums
     elif method == CombineMethod.SUM:
-        return torch.sum(torch.stack(weighted_embeddings), dim=0)
+        combined = weights @ values
     elif method == CombineMethod.MEDIAN:
-        return torch.median(torch.stack(weighted_embeddings), dim=0).values
+        combined = weighted_median(values, weights)
     elif method == CombineMethod.MAX:
-        return torch.max(torch.stack(weighted_embeddings), dim=0).values
+        combined = (weights.unsqueeze(2) * values).amax(dim=1)
     elif method == CombineMethod.MIN:
-        return torch.min(torch.stack(weighted_embeddings), dim=0).values
+        combined = (weights.unsqueeze(2) * values).amin(dim=1)
     elif method == CombineMethod.NORMALIZED_SUM:
-        normalized = [embedding / torch.norm(embedding)
-                      for embedding in weighted_embeddings]
-        return torch.sum(torch.stack(normalized), dim=0)
+        normalized = values / values.norm(dim=1, keepdim=True)
+        combined = torch.sign(weights) @ normalized
     else:
         raise ValueError("Invalid combine method specified.")
 
+    combined = combined.reshape(-1, *embedding_shape)
+
+    return combined if is_batch else combined[0]
 
-# def combine_embeddings_alt(embeddings: EmbeddingPairsList, method: CombineMethod, weights: List[float] | None = None):
-#     if weights is None:
-#         # Default to equal weighting if none provided
-#         weights = [1.0 for _ in embeddings]
-
-#     if len(weights) != len(embeddings):
-#         raise ValueError(
-#             "Weights must match the number of embeddings for a weighted average.")
-
-#     # Convert embeddings and weights to tensors for efficient computation
-#     # Shape: [num_embeddings, embedding_dim]
-#     embeddings_tensor = torch.stack(embeddings).to(device)
-#     weights_tensor = torch.tensor(weights, dtype=torch.float32).to(
-#         device)  # Shape: [num_embeddings]
-
-#     weighted_embeddings = embeddings_tensor * \
-#         weights_tensor.unsqueeze(1)  # Apply weights
-
-#     if method == CombineMethod.MEAN:
-#         # Calculate the weighted sum of embeddings
-#         weighted_sum = torch.sum(weighted_embeddings, dim=0)
-#         # Calculate the sum of weights
-#         sum_of_weights = torch.sum(weights_tensor)
-#         # Compute the weighted mean
-#         avg_embedding = weighted_sum / sum_of_weights
-#         return avg_embedding
-#     elif method == CombineMethod.SUM:
-#         return torch.sum(weighted_embeddings, dim=0)
-#     # Add other methods as necessary
-#     else:
-#         raise ValueError("Invalid combine method specified.")
+
+def weighted_median(values: torch.Tensor, weights: torch.Tensor) -> torch.Tensor:
+    """
+    Element wise weighted median of `[K, D]` values for `[S, K]` weights:
+    the smallest value whose cumulative weight reaches half the total.
+    """
+    sorted_values, sort_indices = torch.sort(values, dim=0)
+    # [S, K, D] weight of each sorted value
+    sorted_weights = weights.clamp_min(0)[:, sort_indices]
+    cumulative_weights = sorted_weights.cumsum(dim=1)
+    half_totals = cumulative_weights[:, -1:] / 2
+    median_indices = (cumulative_weights >= half_totals).int().argmax(dim=1)
+
+    return sorted_values.gather(0, median_indices).reshape(weights.shape[0], -1)
+
+
+def fold_speaker_latents(
+    gpt_cond_latent: torch.Tensor,
+    speaker_embedding: torch.Tensor,
+    reference_stats: ReferenceStats,
+    new_gpt_cond_latent: torch.Tensor,
+    new_speaker_embedding: torch.Tensor,
+    new_reference_stats: ReferenceStats
+):
+    """
+    Running weighted average of a speaker with the latents of new clips.
+    The gpt latents are weighted by their conditioning chunk counts and the
+    speaker embeddings by their clip counts, the same weights as extracting
+    every clip at once. Returns the folded latents and stats.
+    """
+    num_chunks = reference_stats["num_chunks"] + \
+        new_reference_stats["num_chunks"]
+    num_clips = reference_stats["num_clips"] + new_reference_stats["num_clips"]
+
+    if new_reference_stats["num_chunks"] > 0:
+        gpt_cond_latent = (
+            gpt_cond_latent * reference_stats["num_chunks"] +
+            new_gpt_cond_latent.to(gpt_cond_latent.device) *
+            new_reference_stats["num_chunks"]
+        ) / num_chunks
+
+    speaker_embedding = (
+        speaker_embedding * reference_stats["num_clips"] +
+        new_speaker_embedding.to(speaker_embedding.device) *
+        new_reference_stats["num_clips"]
+    ) / num_clips
+
+    return gpt_cond_latent, speaker_embedding, {"num_clips": num_clips, "num_chunks": num_chunks}
 
 
 def normalize_weights(weights):
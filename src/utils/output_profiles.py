@@ -0,0 +1,45 @@
+from utils.audio_encoders import AudioEncoder, get_audio_encoder
+
+
+class OutputProfile:
+    """
+    Named delivery target for rendered audio, the sample rate it's
+    resampled to and the encoder writing it.
+    """
+
+    def __init__(self, name: str, sample_rate: int, output_format: str, description: str):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.output_format = output_format
+        self.description = description
+
+    def get_encoder(self) -> AudioEncoder:
+        return get_audio_encoder(self.output_format)
+
+
+OUTPUT_PROFILES = {
+    profile.name: profile for profile in [
+        OutputProfile("native", 24000, "wav",
+                      "24 kHz 16 bit wav, the model's own rate"),
+        OutputProfile("telephony_ulaw", 8000, "ulaw",
+                      "8 kHz mu-law wav for PSTN and IVR systems"),
+        OutputProfile("telephony_pcm", 8000, "wav",
+                      "8 kHz 16 bit wav for IVR systems taking linear audio"),
+        OutputProfile("wideband_pcm", 16000, "wav",
+                      "16 kHz 16 bit wav for VoIP and speech pipelines"),
+        OutputProfile("wideband_opus", 16000, "opus",
+                      "16 kHz Opus for low bandwidth links"),
+        OutputProfile("broadcast", 48000, "wav",
+                      "48 kHz 16 bit wav for video and broadcast"),
+    ]
+}
+
+
+def get_output_profile(name: str) -> OutputProfile:
+    profile = OUTPUT_PROFILES.get(name)
+
+    if profile is None:
+        raise ValueError(
+            f"Unknown output profile {name}, expected one of {', '.join(OUTPUT_PROFILES)}")
+
+    return profile
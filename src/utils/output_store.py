@@ -0,0 +1,54 @@
+import atexit
+import os
+import time
+import uuid
+from typing import Callable
+from utils.disk_cache import DiskCache
+
+
+class OutputStore(DiskCache):
+    """
+    Directory for generated files handed to the UI, bounded by total size
+    and by age. Files get random names, the least recently used go first,
+    and every file is removed when the app shuts down.
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int, max_age_seconds: float):
+        # Set before the initial scan, which already evicts
+        self.max_age_seconds = max_age_seconds
+
+        super().__init__(output_dir, max_bytes)
+
+        atexit.register(self.clear)
+
+    def save(self, write_fn: Callable[[str], None], suffix: str = ".wav") -> str:
+        """
+        Stores a new file written by `write_fn`, which must pass the file
+        format explicitly as it's given a temporary path.
+        """
+        return self.put(f"{uuid.uuid4().hex}{suffix}", write_fn)
+
+    def evict(self):
+        expire_before = time.time() - self.max_age_seconds
+        expired = []
+
+        with self.lock:
+            # Entries are in least recently used order, so stop at the first fresh one
+            for key in list(self.entries.keys()):
+                try:
+                    modified_time = os.path.getmtime(self.path_for(key))
+                except OSError:
+                    modified_time = 0
+
+                if modified_time >= expire_before:
+                    break
+
+                self.total_bytes -= self.entries.pop(key)
+                expired.append(key)
+
+        for key in expired:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                os.remove(path)
+
+        super().evict()
@@ -0,0 +1,34 @@
+import os
+from typing import Dict, Tuple
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+
+def save_safetensors(tensors: Dict[str, torch.Tensor], file_path: str, metadata: Dict[str, str] | None = None):
+    """
+    Writes `tensors` to a safetensors file and syncs it to disk, so callers
+    can rename it into place once it is complete.
+    """
+    save_file(
+        {name: tensor.detach().cpu().contiguous()
+         for name, tensor in tensors.items()},
+        file_path,
+        metadata
+    )
+
+    with open(file_path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def load_safetensors(file_path: str) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """
+    Returns the tensors and the string metadata of a safetensors file. The
+    file is memory mapped while reading, the tensors don't keep it open, so
+    it can be replaced or deleted afterwards.
+    """
+    with safe_open(file_path, framework="pt", device="cpu") as f:
+        metadata = f.metadata() or {}
+        tensors = {name: f.get_tensor(name) for name in f.keys()}
+
+    return tensors, metadata
@@ -0,0 +1,69 @@
+import re
+from typing import List
+
+DEFAULT_CHAR_LIMIT = 250
+
+# Languages written without spaces between sentences
+NO_SPACE_LANGUAGES = ["zh-cn", "zh", "ja"]
+
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?…])\s+")
+NO_SPACE_SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?。！？…])(?![.!?。！？…])\s*")
+CLAUSE_END_PATTERN = re.compile(r"(?<=[,;:，、；：])\s*")
+
+
+def split_sentences(text: str, lang: str) -> List[str]:
+    pattern = NO_SPACE_SENTENCE_END_PATTERN if lang in NO_SPACE_LANGUAGES else SENTENCE_END_PATTERN
+    sentences = [sentence.strip() for sentence in pattern.split(text)]
+
+    return [sentence for sentence in sentences if sentence != ""]
+
+
+def split_long_segment(segment: str, max_chars: int) -> List[str]:
+    """
+    Splits a segment that is over the char limit, first on clause punctuation
+    then on whitespace, and as a last resort on the char limit itself.
+    """
+    if len(segment) <= max_chars:
+        return [segment]
+
+    for pattern in [CLAUSE_END_PATTERN, re.compile(r"\s+")]:
+        parts = [part for part in pattern.split(segment) if part.strip() != ""]
+
+        if len(parts) > 1:
+            return pack_segments(parts, max_chars)
+
+    return [segment[i:i + max_chars] for i in range(0, len(segment), max_chars)]
+
+
+def pack_segments(parts: List[str], max_chars: int) -> List[str]:
+    segments = []
+    current = ""
+
+    for part in parts:
+        for piece in split_long_segment(part.strip(), max_chars):
+            candidate = f"{current} {piece}".strip()
+
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                if current != "":
+                    segments.append(current)
+                current = piece
+
+    if current != "":
+        segments.append(current)
+
+    return segments
+
+
+def segment_text(text: str, lang: str, max_chars: int = DEFAULT_CHAR_LIMIT) -> List[str]:
+    """
+    Splits text into sentence sized segments which all fit within the
+    per language char limit of the XTTS tokenizer.
+    """
+    segments = []
+
+    for sentence in split_sentences(text, lang):
+        segments.extend(split_long_segment(sentence, max_chars))
+
+    return segments
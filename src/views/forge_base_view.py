@@ -2,6 +2,12 @@ from services.content_manager_service import ContentManagerService
 from services.model_manager_service import ModelManagerService
 from services.speaker_manager_service import SpeakerManagerService
 from abc import ABC, abstractmethod
+from services.speaker_metadata_index import SpeakerFilter
+from utils.audio_encoders import get_preview_audio_format
+from utils.utils import is_empty_string
+
+# Most speakers sent to a dropdown at once, the search box finds the rest
+SPEAKER_DROPDOWN_LIMIT = 100
 
 
 class ForgeBaseView(ABC):
@@ -14,7 +20,51 @@ class ForgeBaseView(ABC):
     @abstractmethod
     def init_ui(self):
         pass
-        
+
+    def generate_preview_audio(self, output_format: str | None = None, **inference_kwargs):
+        """
+        Yields values for a preview audio player. When audio streaming is enabled
+        every rendered chunk is yielded as soon as it is ready, otherwise the
+        finished audio is yielded once, encoded in `output_format`. Uncached
+        wav audio is yielded as an array, which Gradio writes to its own cache.
+        """
+        if self.model_service.stream_audio:
+            yield from self.model_service.run_inference_stream(**inference_kwargs)
+        else:
+            yield self.model_service.run_inference(
+                return_array=True, output_format=output_format, **inference_kwargs)
+
+    def get_preview_audio_format(self, output_format: str | None) -> str:
+        """
+        The `gr.Audio` format of the audio `generate_preview_audio` yields.
+        """
+        return get_preview_audio_format(output_format, self.model_service.stream_audio)
+
+    def find_speaker_names(self, query: str | None, speaker_filter: SpeakerFilter | None = None) -> list[str]:
+        """
+        Returns the best matches for a search query, or the first page of
+        speakers passing the filter when there is no query.
+        """
+        if is_empty_string(query):
+            speaker_names, _ = self.speaker_service.list_speakers(
+                0, SPEAKER_DROPDOWN_LIMIT, speaker_filter)
+            return speaker_names
+
+        return self.speaker_service.search_speakers(query, SPEAKER_DROPDOWN_LIMIT, speaker_filter)
+
+    def get_dropdown_choices(self, selected_speakers: list[str] | None = None) -> list[str]:
+        """
+        The first page of speakers, with `selected_speakers` added so a
+        dropdown value is always one of its choices.
+        """
+        speaker_names = self.find_speaker_names(None)
+        listed_names = set(speaker_names)
+        selected_speakers = [
+            speaker for speaker in (selected_speakers or []) if speaker not in listed_names
+        ]
+
+        return selected_speakers + speaker_names
+
     def reload_speaker_data(self, *args):
         """
         Reloads speaker data from the speaker file.
@@ -23,7 +73,7 @@ class ForgeBaseView(ABC):
         Accepts *args to handle any arguments Gradio might pass
         """
         if self.speaker_service.get_speaker_file() is not None:
-            # Reload the speaker file data to ensure it's up to date
-            self.speaker_service.speakers_file_data = self.speaker_service.load_speaker_file_data()
+            # Reload the speaker file data only if it changed on disk
+            self.speaker_service.reload_if_changed()
             return True
         return False
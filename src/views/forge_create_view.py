@@ -1,21 +1,25 @@
 import time
 import gradio as gr
+from constants.common import SESSION_STATE_TTL
 from components.notification_component import NotificationComponent
 from components.section_description_component import SectionDescriptionComponent
 from components.speaker_preview_component import SpeechPreviewComponent
 from components.textbox_submit_component import TextboxSubmitComponent
+from services.bulk_speaker_service import BulkSpeakerService, resolve_bulk_dir
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
 from services.speaker_manager_service import SpeakerManagerService
+from types_module import ReferenceStats, SpeakerData
 from utils.utils import format_notification, is_empty_file_list
 
 
 class ForgeCreateView(ForgeBaseView):
-    gpt_cond_latent = None
-    speaker_embedding = None
     section_content: dict
     common_content: dict
+    # Bulk create only reads folders below this directory, None disables it
+    bulk_root_dir: str | None = None
+    cache_dir: str | None = None
 
     def __init__(
         self,
@@ -28,11 +32,19 @@ class ForgeCreateView(ForgeBaseView):
             "create")
         self.common_content = self.content_service.get_common_content()
 
+    def set_bulk_dirs(self, bulk_root_dir: str | None, cache_dir: str):
+        self.bulk_root_dir = bulk_root_dir
+        self.cache_dir = cache_dir
+
     def init_ui(self):
         section_description = SectionDescriptionComponent(
             value=self.section_content.get("section_description"))
 
         with gr.Column() as ui_container:
+            # Per session speaker embedding, so concurrent users don't share it
+            speaker_data_state = gr.State(None, time_to_live=SESSION_STATE_TTL)
+            reference_stats_state = gr.State(None, time_to_live=SESSION_STATE_TTL)
+
             with gr.Group() as speaker_upload_group:
                 file_uploader = gr.File(
                     label=self.section_content.get("file_uploader_label"),
@@ -56,7 +68,12 @@ class ForgeCreateView(ForgeBaseView):
              speaker_audio_player,
              speech_textbox,
              language_select,
-             preview_speaker_btn) = SpeechPreviewComponent(self.content_service.get_common_content())
+             preview_speaker_btn,
+             output_format_select) = SpeechPreviewComponent(
+                self.content_service.get_common_content(),
+                streaming=self.model_service.stream_audio,
+                output_format=self.model_service.output_format
+            )
 
             # SAVE SPEAKER COMPONENT
             (speaker_save_group,
@@ -88,7 +105,9 @@ class ForgeCreateView(ForgeBaseView):
             # Extracts the speaker embedding from the uploaded audio, then displays the audio player group, but hiding the audio player
             create_speaker_embedding_btn.click(
                 lambda: ([
-                    gr.Markdown(visible=True),
+                    # Reset the text, a failed attempt leaves its error in it
+                    gr.Markdown(value=format_notification(self.section_content.get(
+                        "notification_create_embedding")), visible=True),
                     gr.Button(interactive=False),
                     gr.Group(visible=False),
                     gr.Group(visible=False),
@@ -106,7 +125,10 @@ class ForgeCreateView(ForgeBaseView):
                 inputs=[file_uploader],
                 outputs=[
                     speaker_embedding_text,
-                    speaker_preview_group
+                    create_speaker_embedding_btn,
+                    speaker_preview_group,
+                    speaker_data_state,
+                    reference_stats_state
                 ]
             )
 
@@ -121,7 +143,8 @@ class ForgeCreateView(ForgeBaseView):
                 ]
             ).then(
                 self.do_inference,
-                inputs=[speech_textbox, language_select],
+                inputs=[speech_textbox, language_select,
+                        speaker_data_state, output_format_select],
                 outputs=[
                     preview_speaker_btn,
                     speaker_audio_player,
@@ -131,20 +154,63 @@ class ForgeCreateView(ForgeBaseView):
 
             save_speaker_btn.click(
                 self.save_speaker,
-                inputs=[speaker_name_textbox],
+                inputs=[speaker_name_textbox, speaker_data_state,
+                        reference_stats_state],
                 outputs=save_group_messages
             )
 
+        with gr.Accordion(label=self.section_content.get("bulk_create_label"), open=False):
+            bulk_dir_textbox = gr.Textbox(
+                label=self.section_content.get("bulk_dir_label"),
+                info=self.section_content.get("bulk_dir_info"),
+                interactive=True
+            )
+
+            bulk_skip_existing_checkbox = gr.Checkbox(
+                label=self.section_content.get("bulk_skip_existing_label"),
+                value=True,
+                interactive=True
+            )
+
+            bulk_create_btn = gr.Button(
+                value=self.section_content.get("bulk_create_btn_label"))
+
+            bulk_create_messages = gr.Markdown(visible=False)
+
+            bulk_create_btn.click(
+                self.bulk_create_speakers,
+                inputs=[bulk_dir_textbox, bulk_skip_existing_checkbox],
+                outputs=[bulk_create_messages]
+            )
+
     def get_speaker_embedding(self, wav_files):
-        gpt_cond_latent, speaker_embedding = self.model_service.extract_speaker_embedding(
-            wav_files)
+        # Conditioned on the joined files like XTTS, the clip and chunk counts
+        # are kept alongside for refining the speaker later
+        try:
+            gpt_cond_latent, speaker_embedding, reference_stats = self.model_service.extract_joined_speaker_embedding(
+                wav_files)
+        except Exception as e:
+            # Too short or silent uploads, let the user pick other files
+            print(f"Failed to create the speaker embedding: {e}")
+            return [
+                gr.Markdown(value=format_notification(str(e)), visible=True),
+                gr.Button(interactive=True),
+                gr.Group(visible=False),
+                None,
+                None
+            ]
 
-        self.gpt_cond_latent = gpt_cond_latent
-        self.speaker_embedding = speaker_embedding
+        speaker_data: SpeakerData = {
+            "gpt_cond_latent": gpt_cond_latent,
+            "speaker_embedding": speaker_embedding
+        }
 
         return [
             gr.Markdown(visible=False),
+            gr.Button(interactive=True),
             gr.Group(visible=True),
+            speaker_data,
+            reference_stats
         ]
 
     def generate_speech(self):
@@ -155,26 +221,31 @@ class ForgeCreateView(ForgeBaseView):
             gr.Markdown(visible=False)
         ]
 
-    def do_inference(self, speech_text, language="en"):
-        wav_file = None
-
-        if (self.gpt_cond_latent is not None and self.speaker_embedding is not None):
-            wav_file = self.model_service.run_inference(
+    def do_inference(self, speech_text, language, speaker_data: SpeakerData | None, output_format=None):
+        if speaker_data is not None:
+            for audio in self.generate_preview_audio(
                 lang=language,
                 tts_text=speech_text,
-                gpt_cond_latent=self.gpt_cond_latent,
-                speaker_embedding=self.speaker_embedding
-            )
+                gpt_cond_latent=speaker_data["gpt_cond_latent"],
+                speaker_embedding=speaker_data["speaker_embedding"],
+                output_format=output_format
+            ):
+                yield [
+                    gr.update(),
+                    gr.Audio(value=audio, format=self.get_preview_audio_format(
+                        output_format)),
+                    gr.update()
+                ]
         else:
             print("Speaker embeddings are not set")
 
-        return [
+        yield [
             gr.Button(interactive=True),
-            gr.Audio(value=wav_file, format="wav"),
+            gr.update(),
             gr.Group(visible=True)
         ]
 
-    def save_speaker(self, speaker_name):
+    def save_speaker(self, speaker_name, speaker_data: SpeakerData | None, reference_stats: ReferenceStats | None = None):
         if (speaker_name is None):
             return gr.Markdown(
                 value=format_notification(
@@ -182,16 +253,26 @@ class ForgeCreateView(ForgeBaseView):
                 visible=True
             )
 
-        cur_speaker_names = self.speaker_service.get_speaker_names()
-        if speaker_name in cur_speaker_names:
+        if self.speaker_service.get_speaker_data(speaker_name) is not None:
             return gr.Markdown(
                 value=format_notification(
                     "Speak name already exists! Please enter a unique speaker name."),
                 visible=True
             )
 
+        if speaker_data is None:
+            return gr.Markdown(
+                value=format_notification(
+                    "Speaker embedding is missing! Please create the speaker embedding first."),
+                visible=True
+            )
+
         self.speaker_service.add_speaker(
-            speaker_name, self.gpt_cond_latent, self.speaker_embedding)
+            speaker_name, speaker_data["gpt_cond_latent"], speaker_data["speaker_embedding"])
+
+        if reference_stats is not None:
+            self.speaker_service.set_reference_stats(
+                speaker_name, reference_stats)
 
         self.speaker_service.save_speaker_file()
 
@@ -201,6 +282,48 @@ class ForgeCreateView(ForgeBaseView):
             visible=True
         )
 
+    def bulk_create_speakers(self, root_dir, skip_existing, progress=gr.Progress()):
+        if self.bulk_root_dir is None:
+            return gr.Markdown(
+                value=format_notification(
+                    "Bulk create is disabled. Start the app with --bulk_root_dir to enable it."),
+                visible=True
+            )
+
+        if root_dir is None or root_dir.strip() == "":
+            return gr.Markdown(
+                value=format_notification(
+                    "Directory is empty! Please enter the folder of reference clips."),
+                visible=True
+            )
+
+        # Any client can fill the textbox, so never read outside the configured directory
+        try:
+            root_dir = resolve_bulk_dir(self.bulk_root_dir, root_dir.strip())
+        except ValueError as e:
+            return gr.Markdown(value=format_notification(str(e)), visible=True)
+
+        bulk_service = BulkSpeakerService(
+            self.model_service, self.speaker_service, self.cache_dir)
+
+        try:
+            result = bulk_service.create_speakers(
+                root_dir,
+                skip_existing=skip_existing,
+                on_progress=lambda done, total, speaker_name: progress(
+                    (done, total), desc=speaker_name or None, unit="speakers")
+            )
+        except FileNotFoundError as e:
+            return gr.Markdown(value=format_notification(str(e)), visible=True)
+
+        message = f"Created {len(result['created'])} speakers, skipped {len(result['skipped'])} existing."
+
+        if len(result["failed"]) > 0:
+            failed_names = ", ".join(result["failed"].keys())
+            message += f" Failed: {failed_names}. Fix their clips and run again to retry them."
+
+        return gr.Markdown(value=format_notification(message), visible=True)
+
     def reload_speaker_data(self, *args):
         """
         Override the base reload method to update the UI with fresh speaker data
@@ -1,13 +1,14 @@
 import gradio as gr
 from components.notification_component import NotificationComponent
 from components.section_description_component import SectionDescriptionComponent
+from components.speaker_search_component import SpeakerSearchComponent
 from constants.common import ACCENT_CHOICES, AGE_RANGE_CHOICES, CHARACTER_TYPE_CHOICES, GENDER_CHOICES, GENRE_CHOICES, STYLE_CHOICES, TONAL_CHOICES
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
 from services.speaker_manager_service import SpeakerManagerService
 from types_module import SpeakerMetadata
-from utils.utils import is_empty_string
+from utils.utils import is_empty_file_list, is_empty_string
 
 
 class ForgeEditView(ForgeBaseView):
@@ -16,6 +17,8 @@ class ForgeEditView(ForgeBaseView):
     section_content: dict
     common_content: dict
     speaker_select = None
+    # Components `reload_speaker_data` reads, for the tab select event
+    reload_inputs: list = []
 
     def __init__(
         self,
@@ -34,6 +37,9 @@ class ForgeEditView(ForgeBaseView):
 
         with gr.Column() as ui_container:
             with gr.Group(visible=True) as speaker_select_group:
+                speaker_search_textbox = SpeakerSearchComponent(
+                    self.common_content)
+
                 with gr.Row():
                     self.speaker_select = gr.Dropdown(
                         label=self.common_content.get(
@@ -44,6 +50,7 @@ class ForgeEditView(ForgeBaseView):
                         interactive=True,
                         scale=3
                     )
+                    self.reload_inputs = [self.speaker_select]
 
                     speaker_remove_btn = gr.Button(
                         value=self.section_content.get('remove_speaker_btn_label'),
@@ -124,8 +131,29 @@ class ForgeEditView(ForgeBaseView):
                     interactive=False
                 )
 
+                with gr.Accordion(label=self.section_content.get('add_clips_label'), open=False):
+                    add_clips_uploader = gr.File(
+                        label=self.section_content.get('add_clips_uploader_label'),
+                        type="filepath",
+                        file_count="multiple",
+                        file_types=["wav", "mp3"],
+                        interactive=True
+                    )
+
+                    add_clips_btn = gr.Button(
+                        value=self.section_content.get('add_clips_btn_label'),
+                        interactive=False
+                    )
+
             notification_message = NotificationComponent()
 
+        speaker_search_textbox.input(
+            self.search_speaker_select,
+            inputs=[self.speaker_select, speaker_search_textbox],
+            outputs=[self.speaker_select],
+            trigger_mode="always_last"
+        )
+
         self.speaker_select.change(
             self.update_speaker_fields,
             inputs=[self.speaker_select],
@@ -176,6 +204,28 @@ class ForgeEditView(ForgeBaseView):
             outputs=self.speaker_select
         )
 
+        add_clips_uploader.change(
+            lambda file_list: gr.Button(
+                interactive=(not is_empty_file_list(file_list))),
+            inputs=[add_clips_uploader],
+            outputs=[add_clips_btn]
+        )
+
+        add_clips_btn.click(
+            lambda: gr.Button(interactive=False),
+            outputs=[add_clips_btn]
+        ).then(
+            self.add_clips_to_speaker,
+            inputs=[self.speaker_select, add_clips_uploader],
+            outputs=[notification_message, add_clips_uploader]
+        ).then(
+            # Runs even when adding failed, the clips are kept for a retry
+            lambda file_list: gr.Button(
+                interactive=(not is_empty_file_list(file_list))),
+            inputs=[add_clips_uploader],
+            outputs=[add_clips_btn]
+        )
+
         speaker_remove_btn.click(
             self.remove_speaker,
             inputs=[self.speaker_select],
@@ -186,6 +236,14 @@ class ForgeEditView(ForgeBaseView):
             outputs=self.speaker_select
         )
 
+    def search_speaker_select(self, speaker, query):
+        speaker_names = self.find_speaker_names(query)
+
+        if speaker not in speaker_names:
+            speaker = speaker_names[0] if speaker_names else None
+
+        return gr.Dropdown(choices=speaker_names, value=speaker)
+
     def update_speaker_fields(self, selected_speaker):
         speaker_metadata = self.speaker_service.get_speaker_metadata(
             selected_speaker) or {}
@@ -258,6 +316,44 @@ class ForgeEditView(ForgeBaseView):
 
         return gr.Markdown(value=f"Speaker {selected_speaker} Attributes Update!", visible=True)
 
+    def add_clips_to_speaker(self, selected_speaker, clip_files):
+        """
+        Folds new reference clips into the selected speaker, only the new
+        clips go through the encoders.
+        """
+        if not selected_speaker or is_empty_file_list(clip_files):
+            return [gr.Markdown(visible=False), gr.File()]
+
+        try:
+            references = self.model_service.extract_speaker_references(
+                clip_files)
+            gpt_cond_latent, speaker_embedding = self.model_service.combine_reference_latents(
+                references)
+
+            reference_stats = self.speaker_service.refine_speaker(
+                selected_speaker,
+                gpt_cond_latent,
+                speaker_embedding,
+                self.model_service.get_reference_stats(references),
+                self.model_service.get_default_reference_stats()
+            )
+
+            if reference_stats is None:
+                return [gr.Markdown(value=f"Speaker {selected_speaker} does not exist", visible=True), gr.File()]
+
+            self.speaker_service.save_speaker_file()
+        except Exception as e:
+            print(f"Failed to add clips to speaker {selected_speaker}: {e}")
+            return [gr.Markdown(value=f"Failed to add clips to speaker {selected_speaker}: {e}", visible=True), gr.File()]
+
+        return [
+            gr.Markdown(
+                value=f"Added {len(references)} clips to speaker {selected_speaker}, now built from {reference_stats['num_clips']} clips!",
+                visible=True
+            ),
+            gr.File(value=None)
+        ]
+
     def handle_speaker_change(self, speaker):
         if speaker:
             speaker_metadata = self.speaker_service.get_speaker_metadata(
@@ -309,14 +405,18 @@ class ForgeEditView(ForgeBaseView):
         
         # Always update the dropdown with fresh data
         if self.speaker_select is not None:
-            # Get fresh speaker names
-            speaker_names = self.speaker_service.get_speaker_names()
-            
-            # Get current value or default to first speaker
-            current_value = self.speaker_select.value
-            if current_value not in speaker_names:
+            # Keep the selected speaker when it still exists, default to the first one
+            current_value = args[0] if len(args) > 0 else None
+            if current_value is None or self.speaker_service.get_speaker_data(current_value) is None:
+                current_value = None
+
+            # Only the first page of names, plus the selected speaker
+            speaker_names = self.get_dropdown_choices(
+                [current_value] if current_value else None)
+
+            if current_value is None:
                 current_value = speaker_names[0] if speaker_names else None
-                
+
             # Update the dropdown component
             return gr.update(
                 choices=speaker_names,
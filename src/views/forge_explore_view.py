@@ -3,12 +3,17 @@ from components.section_description_component import SectionDescriptionComponent
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
+from components.speaker_filter_component import SpeakerFilterComponent, to_speaker_filter
+from components.speaker_search_component import SpeakerSearchComponent
 from components.speaker_preview_component import SpeechPreviewComponent
 from services.speaker_manager_service import SpeakerManagerService
+from utils.utils import format_notification
+
+DEFAULT_SIMILAR_SPEAKER_COUNT = 5
+MAX_SIMILAR_SPEAKER_COUNT = 25
 
 
 class ForgeExploreView(ForgeBaseView):
-    speaker_data = None
     section_content: dict
     common_content: dict
     speaker_select = None
@@ -30,6 +35,9 @@ class ForgeExploreView(ForgeBaseView):
 
         # Make speaker group visible by default
         with gr.Group(visible=True) as speaker_group:
+            speaker_search_textbox = SpeakerSearchComponent(
+                self.common_content)
+
             with gr.Row():
                 self.speaker_select = gr.Dropdown(
                     label=self.common_content.get(
@@ -40,11 +48,51 @@ class ForgeExploreView(ForgeBaseView):
                     interactive=True
                 )
 
+        speaker_filter_group, filter_dropdowns = SpeakerFilterComponent(
+            self.common_content)
+
+        with gr.Accordion(label=self.section_content.get('similar_speakers_label'), open=False):
+            similar_count_slider = gr.Slider(
+                label=self.section_content.get('similar_speakers_count_label'),
+                minimum=1,
+                maximum=MAX_SIMILAR_SPEAKER_COUNT,
+                step=1,
+                value=DEFAULT_SIMILAR_SPEAKER_COUNT,
+                interactive=True
+            )
+            similar_speakers_table = gr.Dataframe(
+                headers=self.section_content.get('similar_speakers_headers'),
+                datatype=["str", "number"],
+                interactive=False
+            )
+
+        with gr.Accordion(label=self.section_content.get('audio_search_label'), open=False):
+            audio_search_input = gr.Audio(
+                label=self.section_content.get('audio_search_upload_label'),
+                type="filepath",
+                sources=["upload", "microphone"]
+            )
+            audio_search_btn = gr.Button(
+                value=self.section_content.get('audio_search_btn_label'),
+                interactive=True
+            )
+            audio_search_table = gr.Dataframe(
+                headers=self.section_content.get('similar_speakers_headers'),
+                datatype=["str", "number"],
+                interactive=False
+            )
+            audio_search_messages = gr.Markdown(visible=False)
+
         (audio_preview_group,
          audio_player,
          speech_input_textbox,
          language_select,
-         generate_speech_btn) = SpeechPreviewComponent(self.content_service.get_common_content())
+         generate_speech_btn,
+         output_format_select) = SpeechPreviewComponent(
+            self.content_service.get_common_content(),
+            streaming=self.model_service.stream_audio,
+            output_format=self.model_service.output_format
+        )
 
         # Make the audio controls visible by default
         audio_preview_group.visible = True
@@ -56,6 +104,49 @@ class ForgeExploreView(ForgeBaseView):
             outputs=[audio_player]
         )
 
+        gr.on(
+            triggers=[speaker_search_textbox.input] +
+            [dropdown.change for dropdown in filter_dropdowns],
+            fn=self.filter_speaker_select,
+            inputs=[self.speaker_select,
+                    speaker_search_textbox] + filter_dropdowns,
+            outputs=[self.speaker_select],
+            trigger_mode="always_last"
+        )
+
+        gr.on(
+            triggers=[self.speaker_select.change, similar_count_slider.release],
+            fn=self.find_similar_speakers,
+            inputs=[self.speaker_select, similar_count_slider],
+            outputs=[similar_speakers_table]
+        )
+
+        # Clicking a similar speaker selects it for preview
+        similar_speakers_table.select(
+            self.select_similar_speaker,
+            inputs=[similar_speakers_table],
+            outputs=[self.speaker_select]
+        )
+
+        audio_search_btn.click(
+            lambda: gr.Button(interactive=False),
+            outputs=[audio_search_btn]
+        ).then(
+            self.find_speakers_by_audio,
+            inputs=[audio_search_input, similar_count_slider],
+            outputs=[audio_search_table, audio_search_messages]
+        ).then(
+            # Runs even when the search failed
+            lambda: gr.Button(interactive=True),
+            outputs=[audio_search_btn]
+        )
+
+        audio_search_table.select(
+            self.select_similar_speaker,
+            inputs=[audio_search_table],
+            outputs=[self.speaker_select]
+        )
+
         generate_speech_btn.click(
             lambda: gr.Dropdown(interactive=False),
             outputs=self.speaker_select
@@ -64,7 +155,8 @@ class ForgeExploreView(ForgeBaseView):
             inputs=[
                 self.speaker_select,
                 speech_input_textbox,
-                language_select
+                language_select,
+                output_format_select
             ],
             outputs=[
                 self.speaker_select,
@@ -73,28 +165,82 @@ class ForgeExploreView(ForgeBaseView):
             ]
         )
 
-    def do_inference(self, speaker, speech_text, language="en"):
-        self.speaker_data = self.speaker_service.get_speaker_data(speaker)
+    def do_inference(self, speaker, speech_text, language="en", output_format=None):
+        speaker_data = self.speaker_service.get_speaker_data(speaker)
 
-        wav_file = None
+        if speaker_data:
+            gpt_cond_latent = speaker_data['gpt_cond_latent']
+            speaker_embedding = speaker_data['speaker_embedding']
 
-        if self.speaker_data:
-            gpt_cond_latent = self.speaker_data['gpt_cond_latent']
-            speaker_embedding = self.speaker_data['speaker_embedding']
-
-            wav_file = self.model_service.run_inference(
+            for audio in self.generate_preview_audio(
                 lang=language,
                 tts_text=speech_text,
                 gpt_cond_latent=gpt_cond_latent,
-                speaker_embedding=speaker_embedding
-            )
+                speaker_embedding=speaker_embedding,
+                output_format=output_format
+            ):
+                yield [
+                    gr.update(),
+                    gr.update(),
+                    gr.Audio(value=audio, format=self.get_preview_audio_format(
+                        output_format))
+                ]
 
-        return [
+        yield [
             gr.Dropdown(interactive=True),
             gr.Button(interactive=True),
-            gr.Audio(value=wav_file, format="wav")
+            gr.update()
+        ]
+
+    def filter_speaker_select(self, speaker, query, *filter_values):
+        speaker_names = self.find_speaker_names(
+            query, to_speaker_filter(*filter_values))
+
+        if speaker not in speaker_names:
+            speaker = speaker_names[0] if speaker_names else None
+
+        return gr.Dropdown(choices=speaker_names, value=speaker)
+
+    def find_similar_speakers(self, speaker, count=DEFAULT_SIMILAR_SPEAKER_COUNT):
+        if speaker is None:
+            return gr.Dataframe(value=[])
+
+        similar_speakers = self.speaker_service.find_similar_speakers(
+            speaker, int(count))
+
+        return gr.Dataframe(value=[
+            [name, round(score, 3)] for name, score in similar_speakers
+        ])
+
+    def find_speakers_by_audio(self, audio_file, count=DEFAULT_SIMILAR_SPEAKER_COUNT):
+        if audio_file is None:
+            return [gr.Dataframe(value=[]), gr.Markdown(visible=False)]
+
+        try:
+            speaker_embedding = self.model_service.extract_speaker_embedding_only(
+                audio_file)
+            matching_speakers = self.speaker_service.find_speakers_by_embedding(
+                speaker_embedding, int(count))
+        except Exception as e:
+            print(f"Failed to search speakers by audio: {e}")
+            return [
+                gr.Dataframe(value=[]),
+                gr.Markdown(value=format_notification(
+                    f"Could not search with this audio: {e}"), visible=True)
+            ]
+
+        return [
+            gr.Dataframe(value=[
+                [name, round(score, 3)] for name, score in matching_speakers
+            ]),
+            gr.Markdown(visible=False)
         ]
 
+    def select_similar_speaker(self, similar_speakers, evt: gr.SelectData):
+        speaker = similar_speakers.iloc[evt.index[0], 0]
+
+        return gr.Dropdown(choices=self.get_dropdown_choices([speaker]), value=speaker)
+
     def reset_audio_player(self):
         return gr.Audio(value=None, format="wav")
         
@@ -109,7 +255,7 @@ class ForgeExploreView(ForgeBaseView):
         # Always update the dropdown with the latest speaker names
         # regardless of whether the parent reload succeeded
         if self.speaker_select is not None:
-            speaker_names = self.speaker_service.get_speaker_names()
+            speaker_names = self.get_dropdown_choices()
             default_speaker = speaker_names[0] if speaker_names else None
             
             return gr.update(
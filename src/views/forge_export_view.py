@@ -1,15 +1,20 @@
 import gradio as gr
 from components.section_description_component import SectionDescriptionComponent
-from components.textbox_submit_component import TextboxSubmitComponent
+from components.speaker_filter_component import SpeakerFilterComponent, to_speaker_filter
+from components.speaker_page_component import SPEAKER_PAGE_SIZE, SpeakerPageComponent, render_speaker_page
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
 from services.speaker_manager_service import SpeakerManagerService
+from services.speaker_storage import SPEAKER_FILE_FORMATS
 
 
 class ForgeExportView(ForgeBaseView):
     section_content: dict
     speaker_checkbox_group = None
+    # Components `reload_speaker_data` reads and updates, for the tab select event
+    reload_inputs: list = []
+    reload_outputs: list = []
 
     def __init__(
         self,
@@ -26,6 +31,9 @@ class ForgeExportView(ForgeBaseView):
         section_description = SectionDescriptionComponent(
             value=self.section_content.get('section_description'))
 
+        speaker_filter_group, filter_dropdowns = SpeakerFilterComponent(
+            self.common_content)
+
         # Speaker selection group - now visible by default
         with gr.Group(visible=True) as self.speaker_transfer_group:
             gr.Label(value=self.section_content.get('speaker_checkbox_group_label'))
@@ -33,13 +41,14 @@ class ForgeExportView(ForgeBaseView):
             # Create a multi-column layout for the checkbox group
             with gr.Row() as speaker_list_row:
                 with gr.Column(scale=1, min_width=200):
-                    self.speaker_checkbox_group = gr.CheckboxGroup(
-                        label=None,
-                        choices=self.speaker_service.get_speaker_names(),
-                        value=self.speaker_service.get_speaker_names(),
-                        interactive=True,
-                        elem_classes=["speaker-checkbox-grid"]
-                    )
+                    (self.speaker_checkbox_group,
+                     page_controls_row,
+                     previous_page_btn,
+                     next_page_btn,
+                     page_label,
+                     selection_state,
+                     offset_state,
+                     page_names_state) = SpeakerPageComponent(self.common_content)
 
             with gr.Row():
                 select_all_btn = gr.Button(
@@ -48,6 +57,14 @@ class ForgeExportView(ForgeBaseView):
                 deselect_all_btn = gr.Button(
                     value=self.section_content.get('deselect_all_btn_label'))
 
+        file_format_radio = gr.Radio(
+            label=self.section_content.get('file_format_label'),
+            info=self.section_content.get('file_format_info'),
+            choices=list(SPEAKER_FILE_FORMATS.keys()),
+            value="pth",
+            interactive=True
+        )
+
         export_file_btn = gr.Button(
             value=self.section_content.get('export_file_btn_label'),
             visible=True
@@ -58,60 +75,88 @@ class ForgeExportView(ForgeBaseView):
             visible=False
         )
 
-        select_all_btn.click(
-            lambda: gr.CheckboxGroup(
-                choices=self.speaker_service.get_speaker_names(),
-                value=self.speaker_service.get_speaker_names()
-            ),
-            outputs=[self.speaker_checkbox_group]
+        page_outputs = [
+            self.speaker_checkbox_group,
+            page_label,
+            offset_state,
+            page_names_state
+        ]
+
+        self.reload_inputs = filter_dropdowns
+        self.reload_outputs = page_outputs + [selection_state]
+
+        previous_page_btn.click(
+            lambda offset, selection, *filter_values: self.render_page(
+                offset - SPEAKER_PAGE_SIZE, selection, *filter_values),
+            inputs=[offset_state, selection_state] + filter_dropdowns,
+            outputs=page_outputs
+        )
+
+        next_page_btn.click(
+            lambda offset, selection, *filter_values: self.render_page(
+                offset + SPEAKER_PAGE_SIZE, selection, *filter_values),
+            inputs=[offset_state, selection_state] + filter_dropdowns,
+            outputs=page_outputs
+        )
+
+        gr.on(
+            triggers=[select_all_btn.click] +
+            [dropdown.change for dropdown in filter_dropdowns],
+            fn=self.select_all_speakers,
+            inputs=filter_dropdowns,
+            outputs=page_outputs + [selection_state]
         )
 
         deselect_all_btn.click(
-            lambda: gr.CheckboxGroup(
-                choices=self.speaker_service.get_speaker_names(),
-                value=[]
-            ),
-            outputs=[self.speaker_checkbox_group]
+            lambda offset, *filter_values: self.render_page(
+                offset, set(), *filter_values) + [set()],
+            inputs=[offset_state] + filter_dropdowns,
+            outputs=page_outputs + [selection_state]
         )
 
         export_file_btn.click(
             self.export_speaker_file,
-            inputs=[self.speaker_checkbox_group],
+            inputs=[selection_state, file_format_radio],
             outputs=[download_file]
         )
 
         gr.on(
             triggers=[
                 self.speaker_checkbox_group.change,
+                file_format_radio.change,
                 export_file_btn.click
             ],
             fn=lambda: gr.File(value=None, visible=False),
             outputs=[download_file]
         )
 
-    def export_speaker_file(self, selected_speakers):
+    def render_page(self, offset, selection, *filter_values):
+        return render_speaker_page(
+            self.common_content,
+            self.speaker_service,
+            offset,
+            selection,
+            to_speaker_filter(*filter_values)
+        )
+
+    def select_all_speakers(self, *filter_values):
+        selection = set(self.speaker_service.filter_speakers(
+            to_speaker_filter(*filter_values)))
+
+        return self.render_page(0, selection, *filter_values) + [selection]
+
+    def export_speaker_file(self, selection, file_format):
         file_path = self.speaker_service.create_speaker_file_from_selected_speakers(
-            selected_speakers)
+            sorted(selection), file_format)
 
         return gr.File(value=file_path, visible=True)
-    
-    def reload_speaker_data(self, *args):
+
+    def reload_speaker_data(self, *filter_values):
         """
         Override the base reload method to update the UI with fresh speaker data
-        Accepts *args to handle any arguments Gradio might pass
+        Accepts the speaker filter values, and selects every matching speaker
         """
         # First reload the data using the parent method
         super().reload_speaker_data()
-        
-        # If we have a checkbox group component initialized and data was reloaded
-        if self.speaker_checkbox_group is not None:
-            # Get fresh speaker names and update the checkbox component
-            speaker_names = self.speaker_service.get_speaker_names()
-            
-            # This will update the UI on the next render
-            return gr.update(
-                choices=speaker_names,
-                value=speaker_names
-            )
-        
-        return None
+
+        return self.select_all_speakers(*filter_values)
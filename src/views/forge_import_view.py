@@ -1,15 +1,16 @@
 import gradio as gr
 from components.section_description_component import SectionDescriptionComponent
+from components.speaker_page_component import SPEAKER_PAGE_SIZE, SpeakerPageComponent, render_speaker_page
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
 from services.speaker_manager_service import SpeakerManagerService
+from constants.common import SESSION_STATE_TTL
 
 
 class ForgeImportView(ForgeBaseView):
     section_content: dict
     common_content: dict
-    to_speakers: list[str] = []
 
     def __init__(
         self,
@@ -21,7 +22,6 @@ class ForgeImportView(ForgeBaseView):
         self.section_content = self.content_service.get_section_content(
             'import')
         self.common_content = self.content_service.get_common_content()
-        self.from_speaker_manager_service = SpeakerManagerService()
 
     def init_ui(self):
         section_description = SectionDescriptionComponent(
@@ -29,6 +29,10 @@ class ForgeImportView(ForgeBaseView):
         )
 
         with gr.Column() as ui_container:
+            # Per session service holding the uploaded speaker file
+            from_speaker_service_state = gr.State(
+                None, time_to_live=SESSION_STATE_TTL)
+
             load_speakers_btn = gr.Button(
                 value=self.common_content.get('load_speakers_btn_label'))
 
@@ -42,12 +46,18 @@ class ForgeImportView(ForgeBaseView):
                     )
 
                 with gr.Group():
-                    speaker_from_checkbox_group = gr.CheckboxGroup(
+                    (speaker_from_checkbox_group,
+                     page_controls_row,
+                     previous_page_btn,
+                     next_page_btn,
+                     page_label,
+                     selection_state,
+                     offset_state,
+                     page_names_state) = SpeakerPageComponent(
+                        self.common_content,
                         label="From Speaker List",
                         info="Speakers will be imported from this speaker list.",
-                        interactive=True,
-                        visible=False,
-                        elem_classes=["speaker-checkbox-grid"]
+                        visible=False
                     )
 
                     with gr.Group(visible=False) as speaker_from_actions_group:
@@ -60,7 +70,7 @@ class ForgeImportView(ForgeBaseView):
 
                     file_uploader = gr.File(
                         label="Import Speaker File",
-                        file_types=['.pth'],
+                        file_types=['.pth', '.safetensors'],
                         interactive=True)
 
             import_speakers_btn = gr.Button(
@@ -84,10 +94,21 @@ class ForgeImportView(ForgeBaseView):
             ]
         )
 
+        page_outputs = [
+            speaker_from_checkbox_group,
+            page_label,
+            offset_state,
+            page_names_state
+        ]
+
         file_uploader.change(
             self.file_uploader_change,
             inputs=file_uploader,
-            outputs=speaker_from_checkbox_group
+            outputs=page_outputs + [
+                page_controls_row,
+                selection_state,
+                from_speaker_service_state
+            ]
         ).then(
             lambda: [
                 gr.File(value=None, visible=False),
@@ -99,33 +120,53 @@ class ForgeImportView(ForgeBaseView):
             ]
         )
 
-        speaker_from_checkbox_group.change(
-            lambda selected_speakers: gr.Button(
-                interactive=len(selected_speakers) > 0
+        selection_state.change(
+            lambda selection: gr.Button(
+                interactive=len(selection) > 0
             ),
-            inputs=speaker_from_checkbox_group,
+            inputs=selection_state,
             outputs=import_speakers_btn
         )
 
+        previous_page_btn.click(
+            lambda offset, selection, from_speaker_service: render_speaker_page(
+                self.common_content, from_speaker_service, offset - SPEAKER_PAGE_SIZE, selection),
+            inputs=[offset_state, selection_state, from_speaker_service_state],
+            outputs=page_outputs
+        )
+
+        next_page_btn.click(
+            lambda offset, selection, from_speaker_service: render_speaker_page(
+                self.common_content, from_speaker_service, offset + SPEAKER_PAGE_SIZE, selection),
+            inputs=[offset_state, selection_state, from_speaker_service_state],
+            outputs=page_outputs
+        )
+
         select_all_btn.click(
-            lambda: gr.CheckboxGroup(
-                value=self.from_speaker_manager_service.get_speaker_names()),
-            outputs=speaker_from_checkbox_group
+            self.select_all_speakers,
+            inputs=[offset_state, from_speaker_service_state],
+            outputs=page_outputs + [selection_state]
         )
 
         deselect_all_btn.click(
-            lambda: gr.CheckboxGroup(value=[]),
-            outputs=speaker_from_checkbox_group
+            lambda offset, from_speaker_service: render_speaker_page(
+                self.common_content, from_speaker_service, offset, set()) + [set()],
+            inputs=[offset_state, from_speaker_service_state],
+            outputs=page_outputs + [selection_state]
         )
 
         load_new_speaker_file_btn.click(
             lambda: [
                 gr.CheckboxGroup(visible=False, choices=[], value=[]),
+                gr.Row(visible=False),
+                set(),
                 gr.File(visible=True),
                 gr.Group(visible=False)
             ],
             outputs=[
                 speaker_from_checkbox_group,
+                page_controls_row,
+                selection_state,
                 file_uploader,
                 speaker_from_actions_group
             ]
@@ -133,46 +174,64 @@ class ForgeImportView(ForgeBaseView):
 
         import_speakers_btn.click(
             self.import_speakers,
-            inputs=speaker_from_checkbox_group,
+            inputs=[selection_state, from_speaker_service_state],
             outputs=speakers_to_list
         )
 
     def file_uploader_change(self, file):
         if file:
-            self.from_speaker_manager_service.set_speaker_file(file)
-            speaker_names = self.from_speaker_manager_service.get_speaker_names()
-
-            return gr.CheckboxGroup(
-                choices=speaker_names,
-                value=speaker_names,
-                visible=True,
-                elem_classes=["speaker-checkbox-grid"]
-            )
+            from_speaker_service = SpeakerManagerService()
+            from_speaker_service.set_speaker_file(file, is_trusted=False)
+            selection = set(from_speaker_service.get_speaker_names())
+            page_updates = render_speaker_page(
+                self.common_content, from_speaker_service, 0, selection)
+            # Every speaker starts out selected
+            page_names = page_updates[3]
+            page_updates[0] = gr.CheckboxGroup(
+                choices=page_names, value=page_names, visible=True)
+
+            return page_updates + [
+                gr.Row(visible=True),
+                selection,
+                from_speaker_service
+            ]
+
+        return [gr.CheckboxGroup(), gr.Markdown(), 0, [], gr.Row(), set(), None]
+
+    def select_all_speakers(self, offset, from_speaker_service: SpeakerManagerService | None):
+        selection = set(from_speaker_service.get_speaker_names()
+                        ) if from_speaker_service else set()
 
-        return gr.CheckboxGroup()
+        return render_speaker_page(self.common_content, from_speaker_service, offset, selection) + [selection]
 
     def load_speaker_data(self):
-        # Get the current speaker names
-        self.to_speakers = self.speaker_service.get_speaker_names()
-        
+        # Only the first page of names, the library can hold tens of thousands
+        to_speakers, total = self.speaker_service.list_speakers(
+            0, SPEAKER_PAGE_SIZE)
+
         # Create a formatted HTML list with proper structure for CSS styling
-        speaker_text = "### Current Speakers\n\n<ul>"
-        
-        for speaker in self.to_speakers:
+        speaker_text = f"### Current Speakers ({total})\n\n<ul>"
+
+        for speaker in to_speakers:
             speaker_text += f"\n  <li>{speaker}</li>"
-        
+
+        if total > len(to_speakers):
+            speaker_text += f"\n  <li>... and {total - len(to_speakers)} more</li>"
+
         speaker_text += "\n</ul>"
-        
+
         return speaker_text
 
-    def import_speakers(self, from_selected_speaker: list[str] | None):
+    def import_speakers(self, selection: set[str] | None, from_speaker_service: SpeakerManagerService | None):
+        if from_speaker_service is None:
+            return self.load_speaker_data()
 
-        for speaker in from_selected_speaker:
-            speaker_data = self.from_speaker_manager_service.get_speaker_data(
+        for speaker in sorted(selection or []):
+            speaker_data = from_speaker_service.get_speaker_data(
                 speaker)
 
             if speaker_data is not None:
-                speaker_metadata = self.from_speaker_manager_service.get_speaker_metadata(
+                speaker_metadata = from_speaker_service.get_speaker_metadata(
                     speaker)
 
                 gpt_cond_latent = speaker_data.get("gpt_cond_latent")
@@ -196,9 +255,5 @@ class ForgeImportView(ForgeBaseView):
         """
         # First reload the data using the parent method
         super().reload_speaker_data()
-        
-        # Reset the to_speakers list to force the user to select
-        # speakers to import again with fresh data
-        self.to_speakers = []
-        
+
         return None
@@ -1,10 +1,13 @@
 import random
 import gradio as gr
+from constants.common import SESSION_STATE_TTL
 from components.section_description_component import SectionDescriptionComponent
 from components.textbox_submit_component import TextboxSubmitComponent
 from services.content_manager_service import ContentManagerService
 from views.forge_base_view import ForgeBaseView
 from services.model_manager_service import ModelManagerService
+from components.speaker_filter_component import SpeakerFilterComponent, to_speaker_filter
+from components.speaker_search_component import SpeakerSearchComponent
 from components.speaker_preview_component import SpeechPreviewComponent
 from services.speaker_manager_service import SpeakerManagerService
 from random import randrange
@@ -22,9 +25,6 @@ UNASSIGNED = "UNASSIGNED"
 class ForgeMixView(ForgeBaseView):
     speaker_name_list: SpeakerNameList = []
     speaker_control_list: SliderList = []
-    speaker_weights: SpeakerWeightsList = []
-    speaker_embedding: SpeakerData = None
-    is_spicy = False
     section_content: dict
     common_content: dict
     speaker_select = None
@@ -45,8 +45,17 @@ class ForgeMixView(ForgeBaseView):
             value=self.section_content.get("section_description"))
 
         with gr.Column() as ui_container:
+            # Per session state, so concurrent users don't overwrite each other's mix
+            speaker_weights_state = gr.State([])
+            speaker_embedding_state = gr.State(
+                None, time_to_live=SESSION_STATE_TTL)
+            is_spicy_state = gr.State(False)
+
             # Make speaker group visible by default
             with gr.Group(visible=True) as speaker_select_group:
+                speaker_search_textbox = SpeakerSearchComponent(
+                    self.common_content)
+
                 with gr.Row():
                     self.speaker_select = gr.Dropdown(
                         label=self.common_content.get(
@@ -61,6 +70,9 @@ class ForgeMixView(ForgeBaseView):
                     feeling_spicy_btn = gr.Button(
                         value=self.section_content.get("feeling_spicy_btn_label"), scale=1)
 
+            speaker_filter_group, filter_dropdowns = SpeakerFilterComponent(
+                self.common_content)
+
             with gr.Group(visible=False) as speaker_control_group:
                 with gr.Row():
                     for idx in list(range(0, MAX_SPEAKER_CONTROL_COUNT)):
@@ -89,7 +101,12 @@ class ForgeMixView(ForgeBaseView):
              audio_player,
              speech_input_textbox,
              language_select,
-             generate_speech_btn) = SpeechPreviewComponent(self.content_service.get_common_content())
+             generate_speech_btn,
+             output_format_select) = SpeechPreviewComponent(
+                self.content_service.get_common_content(),
+                streaming=self.model_service.stream_audio,
+                output_format=self.model_service.output_format
+            )
 
             # SAVE SPEAKER COMPONENT
             (speaker_save_group,
@@ -109,8 +126,12 @@ class ForgeMixView(ForgeBaseView):
             for speaker_control in self.speaker_control_list:
                 speaker_control.input(
                     self.handle_speaker_slider_change,
-                    inputs=[speaker_control, self.speaker_select],
-                    outputs=[]
+                    inputs=[
+                        speaker_control,
+                        self.speaker_select,
+                        speaker_weights_state
+                    ],
+                    outputs=[speaker_weights_state]
                 ).then(
                     lambda: [gr.Audio(value=None, format="wav"), gr.Group(visible=False)],
                     outputs=[audio_player, speaker_save_group]
@@ -118,8 +139,15 @@ class ForgeMixView(ForgeBaseView):
 
             self.speaker_select.change(
                 self.update_speaker_controls,
-                inputs=[self.speaker_select],
-                outputs=self.speaker_control_list
+                inputs=[
+                    self.speaker_select,
+                    speaker_weights_state,
+                    is_spicy_state
+                ],
+                outputs=self.speaker_control_list + [
+                    speaker_weights_state,
+                    is_spicy_state
+                ]
             ).then(
                 self.handle_speaker_select_change,
                 inputs=[self.speaker_select],
@@ -129,22 +157,32 @@ class ForgeMixView(ForgeBaseView):
                 ]
             )
 
+            gr.on(
+                triggers=[speaker_search_textbox.input] +
+                [dropdown.change for dropdown in filter_dropdowns],
+                fn=self.filter_speaker_select,
+                inputs=[self.speaker_select,
+                        speaker_search_textbox] + filter_dropdowns,
+                outputs=[self.speaker_select],
+                trigger_mode="always_last"
+            )
+
             feeling_spicy_btn.click(
                 self.handle_spicy_click,
-                inputs=[],
-                outputs=self.speaker_select
+                inputs=filter_dropdowns,
+                outputs=[self.speaker_select, is_spicy_state]
             )
 
             randomize_speaker_weights_btn.click(
                 self.handle_randomize_speaker_weights_click,
-                inputs=[self.speaker_select],
-                outputs=self.speaker_control_list
+                inputs=[self.speaker_select, speaker_weights_state],
+                outputs=self.speaker_control_list + [speaker_weights_state]
             )
 
             reset_speaker_weights_btn.click(
                 self.handle_reset_speaker_weights_click,
-                inputs=[self.speaker_select],
-                outputs=self.speaker_control_list
+                inputs=[self.speaker_select, speaker_weights_state],
+                outputs=self.speaker_control_list + [speaker_weights_state]
             )
 
             gr.on(
@@ -161,15 +199,21 @@ class ForgeMixView(ForgeBaseView):
             # TODO: Clean up this mess
             generate_speech_btn.click(
                 self.handle_generate_speech_click,
-                inputs=[],
-                outputs=ui_container
+                inputs=[speaker_weights_state],
+                outputs=[ui_container, speaker_embedding_state]
             ).then(
                 self.disable_control_list,
                 inputs=[self.speaker_select],
                 outputs=self.speaker_control_list
             ).then(
                 self.do_inference,
-                inputs=[speech_input_textbox, language_select],
+                inputs=[
+                    speech_input_textbox,
+                    language_select,
+                    speaker_embedding_state,
+                    speaker_weights_state,
+                    output_format_select
+                ],
                 outputs=[
                     generate_speech_btn,
                     audio_player,
@@ -184,7 +228,7 @@ class ForgeMixView(ForgeBaseView):
 
             save_speaker_btn.click(
                 self.handle_save_speaker_click,
-                inputs=[speaker_name_textbox],
+                inputs=[speaker_name_textbox, speaker_embedding_state],
                 outputs=save_notification_text
             ).then(
                 self.reload_speaker_data,
@@ -192,13 +236,15 @@ class ForgeMixView(ForgeBaseView):
             )
 
     # Helpers
-    def update_speaker_controls(self, selected_speakers):
-        self.speaker_weights = self.filter_speaker_weights(selected_speakers)
+    def update_speaker_controls(self, selected_speakers, speaker_weights: SpeakerWeightsList, is_spicy: bool):
+        speaker_weights = self.filter_speaker_weights(
+            speaker_weights, selected_speakers)
 
         def calculate_value(speaker_name: str) -> float:
-            value = self.get_spicy_value() if self.is_spicy else self.get_speaker_weight(speaker_name)
+            value = self.get_spicy_value() if is_spicy else self.get_speaker_weight(
+                speaker_weights, speaker_name)
             # Side effect: update speaker weights
-            self.update_speaker_weights(speaker_name, value)
+            self.update_speaker_weights(speaker_weights, speaker_name, value)
 
             return value
 
@@ -218,9 +264,7 @@ class ForgeMixView(ForgeBaseView):
             valueFn=calculate_value
         )
 
-        self.is_spicy = False
-
-        return next_sliders
+        return next_sliders + [speaker_weights, False]
 
     def handle_speaker_select_change(self, selected_speakers):
         is_valid_count = len(selected_speakers) > 1
@@ -230,31 +274,48 @@ class ForgeMixView(ForgeBaseView):
             gr.Group(visible=is_valid_count)
         ]
 
-    def handle_spicy_click(self):
-        self.is_spicy = True
+    def filter_speaker_select(self, selected_speakers, query, *filter_values):
+        speaker_names = self.find_speaker_names(
+            query, to_speaker_filter(*filter_values))
+        selected_speakers = selected_speakers or []
+        filtered_names = set(speaker_names)
+
+        # Keep the current selection available even when it is filtered out
+        choices = [speaker for speaker in selected_speakers if speaker not in filtered_names] + speaker_names
+
+        return gr.Dropdown(choices=choices, value=selected_speakers)
+
+    def handle_spicy_click(self, *filter_values):
+        speaker_filter = to_speaker_filter(*filter_values)
+        speaker_names = self.speaker_service.filter_speakers(
+            speaker_filter) if speaker_filter else self.speaker_name_list
         max_speakers = min(
-            len(self.speaker_name_list),
+            len(speaker_names),
             MAX_SPICY_SPEAKER_COUNT
         )
+
+        if max_speakers < 2:
+            return [gr.Dropdown(), False]
+
         speaker_select_count = randrange(2, max_speakers + 1)
-        speakers = random.sample(self.speaker_name_list, speaker_select_count)
+        speakers = random.sample(speaker_names, speaker_select_count)
 
-        return gr.Dropdown(value=speakers)
+        return [gr.Dropdown(choices=self.get_dropdown_choices(speakers), value=speakers), True]
 
-    def handle_speaker_slider_change(self, slider_value, selected_speakers, evt: gr.EventData):
+    def handle_speaker_slider_change(self, slider_value, selected_speakers, speaker_weights: SpeakerWeightsList, evt: gr.EventData):
         slider_index = int(evt.target.elem_id)
         slider_speaker = selected_speakers[slider_index]
 
-        self.update_speaker_weights(slider_speaker, slider_value)
+        return self.update_speaker_weights(speaker_weights, slider_speaker, slider_value)
 
-    def handle_generate_speech_click(self):
-        self.speaker_embedding = self.speaker_service.create_speaker_embedding_from_mix(
-            self.speaker_weights)
+    def handle_generate_speech_click(self, speaker_weights: SpeakerWeightsList):
+        speaker_embedding = self.speaker_service.create_speaker_embedding_from_mix(
+            speaker_weights)
 
-        return gr.Column(elem_classes=["ui-disabled"])
+        return [gr.Column(elem_classes=["ui-disabled"]), speaker_embedding]
 
-    def handle_randomize_speaker_weights_click(self, selected_speakers: SpeakerNameList):
-        self.randomize_speaker_weights()
+    def handle_randomize_speaker_weights_click(self, selected_speakers: SpeakerNameList, speaker_weights: SpeakerWeightsList):
+        self.randomize_speaker_weights(speaker_weights)
 
         active_slider_props = {
             "visible": True,
@@ -270,10 +331,14 @@ class ForgeMixView(ForgeBaseView):
             selected_speakers,
             active_slider_props,
             inactive_slider_props,
-            valueFn=self.get_speaker_weight
-        )
+            valueFn=lambda speaker_name: self.get_speaker_weight(
+                speaker_weights, speaker_name)
+        ) + [speaker_weights]
+
+    def handle_reset_speaker_weights_click(self, selected_speakers: SpeakerNameList, speaker_weights: SpeakerWeightsList):
+        for speaker_weight in speaker_weights:
+            speaker_weight["weight"] = 1
 
-    def handle_reset_speaker_weights_click(self, selected_speakers: SpeakerNameList):
         active_slider_props = {
             "visible": True,
             "value": 1
@@ -288,11 +353,11 @@ class ForgeMixView(ForgeBaseView):
             selected_speakers,
             active_slider_props,
             inactive_slider_props
-        )
+        ) + [speaker_weights]
 
-    def handle_save_speaker_click(self, speaker_name):
-        gpt_cond_latent = self.speaker_embedding["gpt_cond_latent"]
-        speaker_embedding = self.speaker_embedding["speaker_embedding"]
+    def handle_save_speaker_click(self, speaker_name, speaker_data: SpeakerData):
+        gpt_cond_latent = speaker_data["gpt_cond_latent"]
+        speaker_embedding = speaker_data["speaker_embedding"]
 
         self.speaker_service.add_speaker(
             speaker_name=speaker_name,
@@ -307,26 +372,33 @@ class ForgeMixView(ForgeBaseView):
                 f"Speaker \"{speaker_name}\" added successfully!")
         )
 
-    def do_inference(self, speech_input_text, language="en"):
+    def do_inference(self, speech_input_text, language, speaker_data: SpeakerData, speaker_weights: SpeakerWeightsList, output_format=None):
         # Inference
-        wav_file = None
-
-        gpt_cond_latent = self.speaker_embedding.get("gpt_cond_latent", None)
-        speaker_embedding = self.speaker_embedding.get(
+        speaker_data = speaker_data or {}
+        gpt_cond_latent = speaker_data.get("gpt_cond_latent", None)
+        speaker_embedding = speaker_data.get(
             "speaker_embedding", None)
 
         if speaker_embedding is not None and gpt_cond_latent is not None:
-            wav_file = self.model_service.run_inference(
+            for audio in self.generate_preview_audio(
                 lang=language,
                 tts_text=speech_input_text,
-                gpt_cond_latent=self.speaker_embedding["gpt_cond_latent"],
-                speaker_embedding=self.speaker_embedding["speaker_embedding"],
-                file_name=self.speaker_weights_to_file_name()
-            )
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                file_name=self.speaker_weights_to_file_name(speaker_weights),
+                output_format=output_format
+            ):
+                yield [
+                    gr.update(),
+                    gr.Audio(value=audio, format=self.get_preview_audio_format(
+                        output_format)),  # Set format explicitly for Gradio 5
+                    gr.update(),
+                    gr.update()
+                ]
 
-        return [
+        yield [
             gr.Button(interactive=True),
-            gr.Audio(value=wav_file, format="wav"),  # Set format explicitly for Gradio 5
+            gr.update(),
             gr.Column(elem_classes=[]),  # Reset the UI container to remove loading state
             gr.Group(visible=True)
         ]
@@ -364,36 +436,36 @@ class ForgeMixView(ForgeBaseView):
         )
 
     # Converts speaker weights to a file name string
-    def speaker_weights_to_file_name(self):
+    def speaker_weights_to_file_name(self, speaker_weights: SpeakerWeightsList):
         file_name = ""
-        for speaker in self.speaker_weights:
+        for speaker in speaker_weights:
             file_name += f"{speaker['speaker']}_{speaker['weight']}_"
         return file_name
 
-    def get_speaker_weight(self, speaker_name: str) -> float:
-        return next((speaker_weight["weight"] for speaker_weight in self.speaker_weights if speaker_weight["speaker"] == speaker_name), 1.0)
+    def get_speaker_weight(self, speaker_weights: SpeakerWeightsList, speaker_name: str) -> float:
+        return next((speaker_weight["weight"] for speaker_weight in speaker_weights if speaker_weight["speaker"] == speaker_name), 1.0)
 
-    def filter_speaker_weights(self, speaker_list: SpeakerNameList) -> SpeakerWeightsList:
-        return list(filter(lambda speaker_weight: speaker_weight["speaker"] in speaker_list, self.speaker_weights))
+    def filter_speaker_weights(self, speaker_weights: SpeakerWeightsList, speaker_list: SpeakerNameList) -> SpeakerWeightsList:
+        return list(filter(lambda speaker_weight: speaker_weight["speaker"] in speaker_list, speaker_weights))
 
-    def update_speaker_weights(self, speaker_name: str, weight: float):
+    def update_speaker_weights(self, speaker_weights: SpeakerWeightsList, speaker_name: str, weight: float):
         # If speaker already exists, update weight
-        for speaker_weight in self.speaker_weights:
+        for speaker_weight in speaker_weights:
             if speaker_weight["speaker"] == speaker_name:
                 speaker_weight["weight"] = weight
-                return self.speaker_weights
+                return speaker_weights
 
         # Otherwise, add new speaker
-        self.speaker_weights.append(
+        speaker_weights.append(
             {"speaker": speaker_name, "weight": weight})
 
-        return self.speaker_weights
+        return speaker_weights
 
     def get_spicy_value(self):
         return round(random.uniform(max(SLIDER_MIN, 0.1), SLIDER_MAX), 1)
 
-    def randomize_speaker_weights(self):
-        for speaker_weight in self.speaker_weights:
+    def randomize_speaker_weights(self, speaker_weights: SpeakerWeightsList):
+        for speaker_weight in speaker_weights:
             speaker_weight["weight"] = self.get_spicy_value()
 
     def update_slider_props(
@@ -441,7 +513,7 @@ class ForgeMixView(ForgeBaseView):
         # Update the dropdown with the latest speaker names if it exists
         if hasattr(self, 'speaker_select') and self.speaker_select is not None:
             return gr.update(
-                choices=self.speaker_name_list
+                choices=self.get_dropdown_choices()
             )
         
         return None
@@ -134,7 +134,10 @@ class ForgeSetupView(ForgeBaseView):
         try:
             if (self.speaker_service.get_speaker_file() is None):
                 temp_file_path = self.create_temp_speaker_file(speaker_file)
-                self.speaker_service.set_speaker_file(temp_file_path)
+                # The app edits its own temp copy, so saves can be journaled
+                self.speaker_service.set_speaker_file(
+                    temp_file_path, use_journal=True)
+                self.speaker_service.watch_speaker_file()
 
         except Exception as e:
             md_message = format_notification(
@@ -168,8 +171,15 @@ class ForgeSetupView(ForgeBaseView):
             return response(md_message, is_ui_enabled)
 
     def create_temp_speaker_file(self, speaker_file):
+        if os.path.isdir(speaker_file):
+            # Sharded speaker library, copy the whole directory
+            temp_dir = tempfile.mkdtemp(suffix="_speakers")
+            return shutil.copytree(speaker_file, temp_dir, dirs_exist_ok=True)
+
         if os.path.exists(speaker_file):
-            with tempfile.NamedTemporaryFile(suffix=".pth", delete=False) as temp_file:
+            suffix = os.path.splitext(speaker_file)[1] or ".pth"
+
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
                 temp_file_name = temp_file.name
 
                 file_path = shutil.copy(speaker_file, temp_file_name)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules relative to src, the way gradio_app.py runs
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
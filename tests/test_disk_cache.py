@@ -0,0 +1,83 @@
+import os
+from utils.disk_cache import DiskCache
+
+
+def write_bytes(size: int):
+    def write_fn(path: str):
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+
+    return write_fn
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100, suffix=".bin")
+    path = cache.put("a", write_bytes(10))
+
+    assert path == os.path.join(str(tmp_path), "a.bin")
+    assert cache.get("a") == path
+    assert cache.get("missing") is None
+    assert cache.total_bytes == 10
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=30)
+    cache.put("a", write_bytes(10))
+    cache.put("b", write_bytes(10))
+    cache.put("c", write_bytes(10))
+
+    # A hit makes "a" the most recently used, so "b" goes first
+    cache.get("a")
+    cache.put("d", write_bytes(10))
+
+    assert cache.get("b") is None
+    assert not os.path.exists(cache.path_for("b"))
+    assert all(cache.get(key) is not None for key in ["a", "c", "d"])
+    assert cache.total_bytes == 30
+
+
+def test_replacing_an_entry_counts_its_new_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.put("a", write_bytes(10))
+    cache.put("a", write_bytes(25))
+
+    assert cache.total_bytes == 25
+
+
+def test_entry_over_the_limit_is_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("a", write_bytes(20))
+
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
+
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    def write_fn(path: str):
+        write_bytes(10)(path)
+        raise RuntimeError("encoder failed")
+
+    try:
+        cache.put("a", write_fn)
+    except RuntimeError:
+        pass
+
+    assert cache.get("a") is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_scan_restores_lru_order_from_mtimes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=30)
+
+    for mtime, key in enumerate(["a", "b", "c"]):
+        path = cache.put(key, write_bytes(10))
+        os.utime(path, (mtime, mtime))
+
+    # Touch "a" as a hit would, then restart with a smaller limit
+    os.utime(cache.path_for("a"), (10, 10))
+    restarted = DiskCache(str(tmp_path), max_bytes=20)
+
+    assert list(restarted.entries.keys()) == ["c", "a"]
+    assert not os.path.exists(cache.path_for("b"))
@@ -0,0 +1,75 @@
+import pytest
+import torch
+from utils.embedding_utils import CombineMethod, combine_stacked_embeddings, weighted_median
+
+EMBEDDINGS = torch.tensor([[0.0, 10.0], [4.0, 2.0], [8.0, 6.0]])
+
+
+def combine(method: CombineMethod, weights=None) -> torch.Tensor:
+    return combine_stacked_embeddings(EMBEDDINGS, method, weights).cpu()
+
+
+def test_mean_is_the_weighted_mean():
+    # The old combine divided the weighted sum by the count, giving [6.67, 8.0]
+    assert torch.allclose(combine(CombineMethod.MEAN, [1, 1, 2]), torch.tensor([5.0, 6.0]))
+
+
+def test_mean_ignores_the_weight_scale():
+    assert torch.allclose(combine(CombineMethod.MEAN, [1, 2, 3]), combine(CombineMethod.MEAN, [10, 20, 30]))
+
+
+def test_unweighted_mean():
+    assert torch.allclose(combine(CombineMethod.MEAN), EMBEDDINGS.mean(dim=0))
+
+
+def test_sum_is_the_weighted_sum():
+    assert torch.allclose(combine(CombineMethod.SUM, [1, 0.5, 0]), torch.tensor([2.0, 11.0]))
+
+
+def test_median_is_the_weighted_median():
+    assert torch.equal(combine(CombineMethod.MEDIAN), torch.tensor([4.0, 6.0]))
+    assert torch.equal(combine(CombineMethod.MEDIAN, [1, 1, 5]), torch.tensor([8.0, 6.0]))
+
+
+def test_median_ignores_negative_weights():
+    assert torch.equal(combine(CombineMethod.MEDIAN, [-5, 1, 1]), torch.tensor([4.0, 2.0]))
+
+
+def test_max_and_min_of_the_weighted_embeddings():
+    weights = [1, 2, 0.5]
+
+    assert torch.allclose(combine(CombineMethod.MAX, weights), torch.tensor([8.0, 10.0]))
+    assert torch.allclose(combine(CombineMethod.MIN, weights), torch.tensor([0.0, 3.0]))
+
+
+def test_normalized_sum_only_counts_weight_signs():
+    assert torch.allclose(combine(CombineMethod.NORMALIZED_SUM, [1, 1, 1]), combine(
+        CombineMethod.NORMALIZED_SUM, [2, 3, 4]))
+
+
+def test_batched_weights_match_single_combines():
+    weights = torch.tensor([[1.0, 1.0, 2.0], [0.0, 1.0, 0.0]])
+    combined = combine(CombineMethod.MEAN, weights)
+
+    assert combined.shape == (2, 2)
+    assert torch.allclose(combined[0], combine(CombineMethod.MEAN, weights[0]))
+    assert torch.allclose(combined[1], EMBEDDINGS[1])
+
+
+def test_keeps_the_embedding_shape():
+    embeddings = torch.randn(3, 1, 512, 1)
+    combined = combine_stacked_embeddings(embeddings, CombineMethod.MEAN, [1, 2, 3])
+
+    assert combined.shape == (1, 512, 1)
+
+
+def test_rejects_mismatched_weights():
+    with pytest.raises(ValueError):
+        combine(CombineMethod.MEAN, [1, 2])
+
+
+def test_weighted_median_picks_the_half_weight_value():
+    values = torch.tensor([[3.0], [1.0], [2.0]])
+    weights = torch.tensor([[1.0, 1.0, 1.0], [0.0, 0.0, 1.0], [3.0, 1.0, 1.0]])
+
+    assert torch.equal(weighted_median(values, weights), torch.tensor([[2.0], [2.0], [3.0]]))
@@ -0,0 +1,84 @@
+import torch
+from safetensors.torch import load_file, save_file
+from constants.common import SPEAKER_METADATA_KEY
+from services.speaker_storage import SafetensorsSpeakerStorage
+from utils.safetensors_utils import load_safetensors, save_safetensors
+
+
+def make_tensors() -> dict:
+    return {
+        "float": torch.randn(3, 4),
+        "half": torch.randn(5).half(),
+        "bfloat": torch.randn(5).bfloat16(),
+        "long": torch.arange(6),
+        # Not contiguous, saving has to copy it
+        "transposed": torch.randn(2, 3).t(),
+        "empty": torch.empty(0, 3),
+    }
+
+
+def assert_tensors_equal(tensors: dict, expected: dict):
+    assert tensors.keys() == expected.keys()
+
+    for name, tensor in expected.items():
+        assert tensors[name].dtype == tensor.dtype
+        assert torch.equal(tensors[name], tensor)
+
+
+def test_round_trip(tmp_path):
+    file_path = str(tmp_path / "tensors.safetensors")
+    tensors = make_tensors()
+    save_safetensors(tensors, file_path, {"key": "value"})
+
+    loaded, metadata = load_safetensors(file_path)
+
+    assert metadata == {"key": "value"}
+    assert_tensors_equal(loaded, tensors)
+
+
+def test_reads_files_the_library_writes(tmp_path):
+    file_path = str(tmp_path / "tensors.safetensors")
+    tensors = {name: tensor.contiguous() for name, tensor in make_tensors().items()}
+    save_file(tensors, file_path)
+
+    loaded, metadata = load_safetensors(file_path)
+
+    assert metadata == {}
+    assert_tensors_equal(loaded, tensors)
+
+
+def test_library_reads_the_files_it_writes(tmp_path):
+    file_path = str(tmp_path / "tensors.safetensors")
+    tensors = make_tensors()
+    save_safetensors(tensors, file_path)
+
+    assert_tensors_equal(load_file(file_path), tensors)
+
+
+def test_loaded_tensors_outlive_the_file(tmp_path):
+    file_path = tmp_path / "tensors.safetensors"
+    save_safetensors({"a": torch.ones(4)}, str(file_path))
+
+    loaded, _ = load_safetensors(str(file_path))
+    file_path.unlink()
+    loaded["a"] += 1
+
+    assert torch.equal(loaded["a"], torch.full((4,), 2.0))
+
+
+def test_speaker_file_round_trip(tmp_path):
+    file_path = str(tmp_path / "speakers.safetensors")
+    speakers_file_data = {
+        "b": {"gpt_cond_latent": torch.randn(1, 32, 1024), "speaker_embedding": torch.randn(1, 512, 1)},
+        "a": {"gpt_cond_latent": torch.randn(1, 32, 1024), "speaker_embedding": torch.randn(1, 512, 1)},
+        SPEAKER_METADATA_KEY: {"a": {"gender": "female"}},
+    }
+    SafetensorsSpeakerStorage(file_path).save(speakers_file_data)
+
+    loaded = SafetensorsSpeakerStorage(file_path).load()
+
+    assert list(loaded.keys()) == ["b", "a", SPEAKER_METADATA_KEY]
+    assert loaded[SPEAKER_METADATA_KEY] == {"a": {"gender": "female"}}
+
+    for speaker_name in ["a", "b"]:
+        assert_tensors_equal(loaded[speaker_name], speakers_file_data[speaker_name])
@@ -0,0 +1,116 @@
+import os
+import torch
+from constants.common import SPEAKER_METADATA_KEY
+from services.speaker_journal import JOURNAL_MAGIC, OP_ADD, OP_REMOVE, OP_RENAME, SpeakerJournal, apply_speaker_operation
+
+BASE_IDENTITY = [1, 2, 3]
+
+
+def add_operation(speaker_name: str, value: float) -> dict:
+    return {
+        "op": OP_ADD,
+        "speaker_name": speaker_name,
+        "gpt_cond_latent": torch.full((1, 32, 1024), value),
+        "speaker_embedding": torch.full((1, 512, 1), value),
+    }
+
+
+def test_round_trip(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    operations = [add_operation("a", 1.0), {"op": OP_REMOVE, "speaker_name": "a"}]
+    journal.append(operations, BASE_IDENTITY)
+
+    records, offset = journal.read(BASE_IDENTITY)
+
+    assert offset == journal.size()
+    assert [record["op"] for record in records] == [OP_ADD, OP_REMOVE]
+    assert torch.equal(records[0]["speaker_embedding"], operations[0]["speaker_embedding"])
+
+
+def test_appends_write_the_header_once(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    journal.append([add_operation("a", 1.0)], BASE_IDENTITY)
+    journal.append([add_operation("b", 2.0)], BASE_IDENTITY)
+
+    with open(journal.journal_path, "rb") as f:
+        assert f.read().count(JOURNAL_MAGIC) == 1
+
+    records, _ = journal.read(BASE_IDENTITY)
+
+    assert [record["speaker_name"] for record in records] == ["a", "b"]
+
+
+def test_torn_tail_replays_up_to_it(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    journal.append([add_operation("a", 1.0)], BASE_IDENTITY)
+    complete_size = journal.size()
+    journal.append([add_operation("b", 2.0)], BASE_IDENTITY)
+
+    # A crash mid append leaves part of the last record
+    with open(journal.journal_path, "r+b") as f:
+        f.truncate(complete_size + 100)
+
+    records, offset = journal.read(BASE_IDENTITY)
+
+    assert [record["speaker_name"] for record in records] == ["a"]
+    assert offset == complete_size
+
+
+def test_corrupt_record_fails_the_crc(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    journal.append([add_operation("a", 1.0)], BASE_IDENTITY)
+    complete_size = journal.size()
+    journal.append([add_operation("b", 2.0)], BASE_IDENTITY)
+
+    with open(journal.journal_path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last_byte = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last_byte[0] ^ 0xFF]))
+
+    records, offset = journal.read(BASE_IDENTITY)
+
+    assert [record["speaker_name"] for record in records] == ["a"]
+    assert offset == complete_size
+
+
+def test_ignores_a_journal_of_another_base_file(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    journal.append([add_operation("a", 1.0)], BASE_IDENTITY)
+
+    assert journal.read([4, 5, 6]) == ([], 0)
+
+
+def test_ignores_a_file_without_the_magic(tmp_path):
+    journal_path = tmp_path / "speakers.journal"
+    journal_path.write_bytes(b"not a journal")
+
+    assert SpeakerJournal(str(journal_path)).read(BASE_IDENTITY) == ([], 0)
+
+
+def test_rewrite_keeps_the_tail_for_the_new_base(tmp_path):
+    journal = SpeakerJournal(str(tmp_path / "speakers.journal"))
+    journal.append([add_operation("a", 1.0)], BASE_IDENTITY)
+    _, compacted_offset = journal.read(BASE_IDENTITY)
+    journal.append([add_operation("b", 2.0)], BASE_IDENTITY)
+
+    new_identity = [7, 8, 9]
+    journal.rewrite(new_identity, journal.read_tail(compacted_offset))
+    records, _ = journal.read(new_identity)
+
+    assert [record["speaker_name"] for record in records] == ["b"]
+
+
+def test_apply_speaker_operations():
+    speakers_file_data = {SPEAKER_METADATA_KEY: {"a": {"gender": "female"}}}
+
+    apply_speaker_operation(speakers_file_data, add_operation("a", 1.0))
+    apply_speaker_operation(speakers_file_data, {
+        "op": OP_RENAME, "old_speaker_name": "a", "new_speaker_name": "b"})
+
+    assert "a" not in speakers_file_data
+    assert speakers_file_data["b"]["speaker_embedding"][0, 0, 0] == 1.0
+
+    apply_speaker_operation(speakers_file_data, {"op": OP_REMOVE, "speaker_name": "b"})
+
+    assert "b" not in speakers_file_data
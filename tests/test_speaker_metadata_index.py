@@ -0,0 +1,94 @@
+from services.speaker_metadata_index import SpeakerMetadataIndex
+
+METADATA = {
+    "ann": {"gender": "female", "accent": "british", "style": ["calm", "warm"]},
+    "bob": {"gender": "male", "accent": "american", "style": ["warm"]},
+    "cat": {"gender": "female", "accent": "american", "style": []},
+    "dan": {"gender": "", "accent": None},
+}
+
+
+def build_index() -> SpeakerMetadataIndex:
+    index = SpeakerMetadataIndex()
+    index.build(list(METADATA.keys()), METADATA)
+
+    return index
+
+
+def filter_names(index: SpeakerMetadataIndex, speaker_filter) -> list:
+    return index.get_names(index.filter(speaker_filter))
+
+
+def test_no_filter_matches_everyone():
+    index = build_index()
+
+    assert filter_names(index, None) == ["ann", "bob", "cat", "dan"]
+    assert filter_names(index, {"gender": []}) == ["ann", "bob", "cat", "dan"]
+
+
+def test_values_of_a_field_are_ored():
+    assert filter_names(build_index(), {"accent": ["british", "american"]}) == ["ann", "bob", "cat"]
+
+
+def test_fields_are_anded():
+    assert filter_names(build_index(), {"gender": ["female"], "accent": ["american"]}) == ["cat"]
+
+
+def test_list_values_match_any_item():
+    assert filter_names(build_index(), {"style": ["warm"]}) == ["ann", "bob"]
+
+
+def test_unknown_value_matches_nobody():
+    assert filter_names(build_index(), {"gender": ["robot"]}) == []
+
+
+def test_updating_metadata_clears_old_values():
+    index = build_index()
+    index.set_speaker_metadata("ann", {"gender": "male"})
+
+    assert filter_names(index, {"gender": ["male"]}) == ["ann", "bob"]
+    assert filter_names(index, {"accent": ["british"]}) == []
+    assert "british" not in index.get_values("accent")
+
+
+def test_removed_slots_are_reused():
+    index = build_index()
+    index.remove_speaker("bob")
+
+    assert len(index) == 3
+    assert filter_names(index, {"accent": ["american"]}) == ["cat"]
+
+    index.set_speaker_metadata("eve", {"accent": "american"})
+
+    assert index.slots["eve"] == 1
+    assert filter_names(index, {"accent": ["american"]}) == ["eve", "cat"]
+
+
+def test_rename_keeps_the_metadata():
+    index = build_index()
+    index.rename_speaker("ann", "anna")
+
+    assert filter_names(index, {"accent": ["british"]}) == ["anna"]
+    assert not index.contains(index.filter(None), "ann")
+
+
+def test_rename_onto_an_existing_speaker_keeps_its_metadata():
+    index = build_index()
+    index.rename_speaker("ann", "bob")
+
+    assert len(index) == 3
+    assert filter_names(index, {"accent": ["british"]}) == []
+    assert filter_names(index, {"accent": ["american"]}) == ["bob", "cat"]
+
+
+def test_contains():
+    index = build_index()
+    bitmap = index.filter({"gender": ["female"]})
+
+    assert index.contains(bitmap, "cat")
+    assert not index.contains(bitmap, "bob")
+    assert not index.contains(bitmap, "nobody")
+
+
+def test_get_values():
+    assert build_index().get_values("style") == ["calm", "warm"]
@@ -0,0 +1,106 @@
+import services.speaker_search_index as speaker_search_index
+from services.speaker_search_index import SpeakerSearchIndex, TermTrie
+
+
+def search_names(index: SpeakerSearchIndex, query: str, limit: int = 50) -> list:
+    return [speaker_name for speaker_name, _ in index.search(query, limit)]
+
+
+def build_index() -> SpeakerSearchIndex:
+    index = SpeakerSearchIndex()
+    index.build({
+        "Narrator Deep": "A deep, calm documentary voice",
+        "Bright Kid": "Cheerful young voice for cartoons",
+        "Old Wizard": "Raspy and deep storyteller",
+        "Newsreader": None,
+    })
+
+    return index
+
+
+def test_trie_completes_shortest_first():
+    trie = TermTrie()
+
+    for term in ["deep", "deeper", "deepest", "dog"]:
+        trie.add(term)
+
+    assert trie.complete("dee") == ["deep", "deeper", "deepest"]
+    assert trie.complete("d", limit=2) == ["dog", "deep"]
+    assert trie.complete("x") == []
+
+
+def test_trie_remove_prunes_empty_branches():
+    trie = TermTrie()
+    trie.add("deep")
+    trie.add("deeper")
+    trie.remove("deeper")
+
+    assert trie.complete("dee") == ["deep"]
+
+    trie.remove("deep")
+
+    assert trie.root == {}
+
+
+def test_name_matches_rank_above_description_matches():
+    assert search_names(build_index(), "deep") == ["Narrator Deep", "Old Wizard"]
+
+
+def test_last_term_completes_as_a_prefix():
+    index = build_index()
+
+    assert search_names(index, "wiz") == ["Old Wizard"]
+    # Only the last term is a prefix
+    assert search_names(index, "wiz deep") == ["Narrator Deep", "Old Wizard"]
+
+
+def test_typos_match_terms_one_edit_away():
+    index = build_index()
+
+    assert search_names(index, "cartons") == ["Bright Kid"]
+    assert search_names(index, "storyteler") == ["Old Wizard"]
+
+
+def test_remove_and_re_add():
+    index = build_index()
+    index.remove("Old Wizard")
+
+    assert search_names(index, "raspy") == []
+    assert "raspy" not in index.postings
+
+    index.add("Old Wizard", "Raspy voice")
+
+    assert search_names(index, "raspy") == ["Old Wizard"]
+
+
+def test_empty_queries():
+    index = build_index()
+
+    assert index.search("") == []
+    assert index.search("!!!") == []
+    assert SpeakerSearchIndex().search("deep") == []
+
+
+def test_common_term_ranks_every_posting(monkeypatch):
+    monkeypatch.setattr(speaker_search_index, "MAX_SCORED_POSTINGS", 10)
+    index = SpeakerSearchIndex()
+    # Shorter documents score higher, the best matches are the last ones added
+    index.build({f"speaker{i}": "voice " + "filler " * (50 - i) for i in range(50)})
+
+    assert search_names(index, "voice", limit=3) == ["speaker49", "speaker48", "speaker47"]
+
+
+def test_common_prefix_expansions_only_rescore_the_rarest_candidates(monkeypatch):
+    monkeypatch.setattr(speaker_search_index, "MAX_SCORED_POSTINGS", 10)
+    index = SpeakerSearchIndex()
+    index.build({
+        **{f"a{i}": "voice filler filler" for i in range(30)},
+        **{f"b{i}": "voices voice filler" for i in range(20)},
+        **{f"c{i}": "voices" for i in range(40)},
+    })
+
+    # Both completions of "voic" are too common to score in full. "voice"
+    # is the rarer one and picks the candidates, the documents only
+    # matching "voices" are never scored
+    assert all(speaker_name[0] in "ab" for speaker_name in search_names(index, "voic", limit=5))
+    assert all(speaker_name[0] == "c" for speaker_name in search_names(index, "voices", limit=5))
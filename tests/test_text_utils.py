@@ -0,0 +1,39 @@
+from utils.text_utils import segment_text
+
+
+def test_splits_sentences():
+    assert segment_text("Hello there. How are you? Fine!", "en") == [
+        "Hello there.", "How are you?", "Fine!"]
+
+
+def test_splits_after_an_ellipsis():
+    assert segment_text("Wait... what?", "en") == ["Wait...", "what?"]
+
+
+def test_ignores_blank_text():
+    assert segment_text("   ", "en") == []
+
+
+def test_splits_no_space_languages():
+    assert segment_text("你好。今天天气很好！", "zh-cn") == ["你好。", "今天天气很好！"]
+
+
+def test_long_sentence_splits_on_clauses_first():
+    text = "one two three, four five six, seven eight nine."
+
+    assert segment_text(text, "en", max_chars=20) == [
+        "one two three,", "four five six,", "seven eight nine."]
+
+
+def test_long_clause_splits_on_whitespace():
+    segments = segment_text("alpha beta gamma delta epsilon zeta", "en", max_chars=12)
+
+    assert segments == ["alpha beta", "gamma delta", "epsilon zeta"]
+
+
+def test_every_segment_fits_the_limit():
+    text = "A" * 30 + " and then, " + "b" * 7 + ". Short one."
+    segments = segment_text(text, "en", max_chars=10)
+
+    assert all(len(segment) <= 10 for segment in segments)
+    assert "".join(segments).replace(" ", "") == text.replace(" ", "")